@@ -1,4 +1,5 @@
 import streamlit as st
+from utils.helpers import recognition_pending, wait_for_recognition
 
 def render_cook_button():
     st.divider()
@@ -6,5 +7,9 @@ def render_cook_button():
         if not st.session_state.images and not st.session_state.ingredients:
             st.error("⚠️ Please add at least one ingredient or photo before cooking!")
         else:
+            # photos still being recognized feed the ingredient list → wait for those only
+            if recognition_pending():
+                with st.spinner("Finishing photo recognition..."):
+                    wait_for_recognition()
             st.session_state.cooked = True
             st.switch_page("pages/Results.py")
@@ -1,5 +1,26 @@
 import streamlit as st
-from utils.helpers import process_uploaded_files, delete_image
+from utils.helpers import (
+    process_uploaded_files,
+    delete_image,
+    collect_recognition_results,
+    recognition_pending,
+)
+
+@st.fragment(run_every=1.0)
+def _poll_recognition():
+    # re-runs alone every second; a full rerun only once results are in
+    if collect_recognition_results():
+        st.rerun()
+
+def _caption(img):
+    if img.get("status") == "pending":
+        return f"{img['name']} – ⏳ recognizing..."
+    if img.get("status") == "failed":
+        return f"{img['name']} – ⚠️ not recognized"
+    found = ", ".join(
+        f"{d['label'].title()} ({d['confidence']:.0%})" for d in img.get("detections", [])
+    )
+    return f"{img['name']} – {found}" if found else f"{img['name']} – no ingredients found"
 
 def render_image_uploader():
     st.markdown('<div class="section-title">📸 <h3>Upload ingredient photos</h3></div>', unsafe_allow_html=True)
@@ -17,6 +38,10 @@ def render_image_uploader():
         st.session_state.uploader_key += 1
         st.rerun()
 
+    collect_recognition_results()
+    if recognition_pending():
+        _poll_recognition()
+
     # Preview uploaded images
     if st.session_state.images:
         st.write("**Added photos:**")
@@ -25,7 +50,7 @@ def render_image_uploader():
             with col1:
                 st.markdown('<div class="preview-card">', unsafe_allow_html=True)
                 try:
-                    st.image(img["bytes"], caption=img["name"], use_container_width=True)
+                    st.image(img["preview"], caption=_caption(img), use_container_width=True)
                 except Exception as e:
                     st.error(f"Error displaying image {img['name']}: {str(e)}")
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -0,0 +1,126 @@
+# app/model/export_onnx.py
+"""
+Export the Keras ingredient model to ONNX, quantize it to int8 and check
+what that costs.
+
+    python app/model/export_onnx.py                          # .h5 -> int8 .onnx
+    python app/model/export_onnx.py --eval heldout.npz       # + accuracy / speed report
+
+Steps:
+  1. tf2onnx converts PantryPal_FineTuned.h5 to a float32 ONNX graph
+  2. onnxruntime.quantization.quantize_dynamic stores the weights as int8
+     (activations are quantized on the fly, so no calibration set is needed)
+  3. with --eval, both models score a held-out set and the report gives
+     binary accuracy (the notebook's metric), label agreement, load time,
+     images/sec and file size for each
+
+The held-out .npz holds 'images' (n, 64, 64, 3; uint8 pixels or float in
+[0, 1]) and 'labels' (n, n_classes multi-hot), e.g. the notebook's
+test_imgs / test_labels via np.savez.
+
+Then run the app with PANTRYPAL_MODEL_BACKEND=onnx.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from model_loader import (
+    IMG_SIZE,
+    MODEL_PATH,
+    ONNX_PATH,
+    THRESHOLD,
+    IngredientModel,
+    OnnxIngredientModel,
+)
+
+
+def export_float(h5_path: Path, out_path: Path, opset: int = 13) -> Path:
+    """Keras .h5 -> float32 ONNX with a dynamic batch dimension."""
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(h5_path, compile=False)
+    spec = (tf.TensorSpec((None, *IMG_SIZE, 3), tf.float32, name="image"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=str(out_path))
+    return out_path
+
+
+def quantize(float_path: Path, out_path: Path) -> Path:
+    """Dynamic int8 quantization of the weights."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(float_path), str(out_path), weight_type=QuantType.QInt8)
+    return out_path
+
+
+def _score(model: IngredientModel, images: np.ndarray, labels: np.ndarray, batch_size: int) -> Dict:
+    t = time.perf_counter()
+    model.load()
+    load_s = time.perf_counter() - t
+
+    probs = []
+    t = time.perf_counter()
+    for a in range(0, len(images), batch_size):
+        probs.append(model._forward(images[a:a + batch_size]))
+    secs = time.perf_counter() - t
+    probs = np.concatenate(probs)
+    pred = probs >= THRESHOLD
+    return {
+        "file": str(model.model_path),
+        "file_mb": round(model.model_path.stat().st_size / 2**20, 2),
+        "load_s": round(load_s, 3),
+        "images_per_s": round(len(images) / secs, 1),
+        "binary_accuracy": float((pred == (labels >= 0.5)).mean()),
+        "exact_match": float((pred == (labels >= 0.5)).all(axis=1).mean()),
+        "_probs": probs,
+    }
+
+
+def evaluate(h5_path: Path, onnx_path: Path, heldout: Path, batch_size: int = 32) -> Dict:
+    """Float Keras vs quantized ONNX on a held-out set."""
+    data = np.load(heldout)
+    images, labels = data["images"], data["labels"].astype(np.float32)
+    if images.dtype == np.uint8:
+        images = images.astype(np.float32) / 255.0
+
+    ref = _score(IngredientModel(h5_path), images, labels, batch_size)
+    q = _score(OnnxIngredientModel(onnx_path), images, labels, batch_size)
+    agree = float(((ref.pop("_probs") >= THRESHOLD) == (q.pop("_probs") >= THRESHOLD)).mean())
+    return {
+        "samples": int(len(images)),
+        "keras_float": ref,
+        "onnx_int8": q,
+        "accuracy_delta": q["binary_accuracy"] - ref["binary_accuracy"],
+        "label_agreement": agree,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Export the ingredient model to int8 ONNX")
+    parser.add_argument("--model", default=str(MODEL_PATH), help="Keras .h5 input")
+    parser.add_argument("--out", default=str(ONNX_PATH), help="quantized .onnx output")
+    parser.add_argument("--opset", type=int, default=13)
+    parser.add_argument("--eval", default=None, help="held-out .npz (images, labels)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    h5, out = Path(args.model), Path(args.out)
+    float_path = out.with_name(out.stem + "_float.onnx")
+    print(f"exporting {h5} -> {float_path}", file=sys.stderr)
+    export_float(h5, float_path, args.opset)
+    print(f"quantizing -> {out}", file=sys.stderr)
+    quantize(float_path, out)
+
+    if args.eval:
+        print(json.dumps(evaluate(h5, out, Path(args.eval), args.batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+# app/model/model_loader.py
+"""
+Ingredient recognition: the MobileNetV2 fine-tuned in ColabV1_70_Code.ipynb.
+
+The network is loaded once per process, lazily (first get_model() call),
+and warmed up with one dummy inference so the first real photo doesn't pay
+for graph tracing.
+
+Streamlit reruns the page script on every interaction; to keep TensorFlow
+out of the app process entirely, run the model in a local worker:
+
+    python app/model/model_loader.py serve --socket /tmp/pantrypal-model.sock
+    PANTRYPAL_MODEL_MODE=socket streamlit run app/Home.py
+
+or let the app spawn one over stdin/stdout (PANTRYPAL_MODEL_MODE=stdio).
+load_recognizer() returns the in-process model or a client with the same
+predict() / metrics() interface.
+
+PANTRYPAL_MODEL_BACKEND=onnx swaps TensorFlow for ONNX Runtime on the
+int8 export (see export_onnx.py) with the same interface.
+
+Files (next to this module unless PANTRYPAL_MODEL is set):
+  - PantryPal_FineTuned.h5 : the saved Keras model
+  - PantryPal_int8.onnx    : its quantized ONNX export (onnx backend)
+  - labels.json            : class names in training order, i.e.
+                             sorted(label_to_idx) from the notebook
+"""
+from __future__ import annotations
+
+import base64
+import io
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+MODEL_DIR = Path(__file__).resolve().parent
+MODEL_PATH = Path(os.environ.get("PANTRYPAL_MODEL", MODEL_DIR / "PantryPal_FineTuned.h5"))
+# int8 ONNX export of the same network, see export_onnx.py
+ONNX_PATH = Path(os.environ.get("PANTRYPAL_ONNX_MODEL", MODEL_DIR / "PantryPal_int8.onnx"))
+# "keras" (TensorFlow) or "onnx" (ONNX Runtime on CPU – no TensorFlow import at all)
+MODEL_BACKEND = os.environ.get("PANTRYPAL_MODEL_BACKEND", "keras")
+SOCKET_PATH = os.environ.get("PANTRYPAL_MODEL_SOCKET", "/tmp/pantrypal-model.sock")
+
+IMG_SIZE = (64, 64)  # the notebook trains on 64x64 RGB scaled to [0, 1]
+THRESHOLD = 0.5      # sigmoid multi-label head: every class above this is present
+BATCH_SIZE = int(os.environ.get("PANTRYPAL_BATCH_SIZE", 32))  # images per forward pass
+DECODE_WORKERS = int(os.environ.get("PANTRYPAL_DECODE_WORKERS", min(8, os.cpu_count() or 1)))
+
+
+def image_to_input(img) -> np.ndarray:
+    """Decoded PIL image -> (64, 64, 3) uint8 model input (scaled at predict time)."""
+    return np.asarray(img.convert("RGB").resize(IMG_SIZE), dtype=np.uint8)
+
+
+def preprocess(image_bytes: bytes) -> np.ndarray:
+    """Encoded image -> (64, 64, 3) float32 in [0, 1], like the training collages."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(image_bytes))
+    # JPEGs can be decoded at 1/2..1/8 scale directly – a big win for phone photos
+    img.draft("RGB", (IMG_SIZE[0] * 2, IMG_SIZE[1] * 2))
+    return image_to_input(img).astype(np.float32) / 255.0
+
+
+def preprocess_batch(images: Sequence[bytes], workers: int = DECODE_WORKERS) -> np.ndarray:
+    """
+    Decode + resize + normalize many images into one (n, 64, 64, 3) batch.
+
+    PIL releases the GIL while decoding and resizing, so a thread pool
+    spreads large uploads over the cores without pickling any bytes.
+    """
+    batch = np.empty((len(images), *IMG_SIZE, 3), dtype=np.float32)
+
+    def fill(i: int) -> None:
+        batch[i] = preprocess(images[i])
+
+    if workers <= 1 or len(images) <= 1:
+        for i in range(len(images)):
+            fill(i)
+    else:
+        with ThreadPoolExecutor(min(workers, len(images))) as pool:
+            list(pool.map(fill, range(len(images))))
+    return batch
+
+
+def model_version(backend: str = MODEL_BACKEND) -> str:
+    """Changes whenever the active model file is replaced (keys cached detections)."""
+    path = ONNX_PATH if backend == "onnx" else MODEL_PATH
+    try:
+        st = path.stat()
+    except OSError:
+        return f"{backend}-missing"
+    return f"{backend}-{st.st_mtime_ns}-{st.st_size}-{THRESHOLD}"
+
+
+def load_labels(path: Path, n_classes: int) -> List[str]:
+    try:
+        labels = json.loads(path.read_text())
+    except (OSError, ValueError):
+        labels = []
+    if len(labels) != n_classes:
+        # unknown label file → still usable, just not human-readable
+        return [f"class_{i}" for i in range(n_classes)]
+    return [str(x) for x in labels]
+
+
+# ----- metrics -----
+class Metrics:
+    """Load / warm-up time and per-image latency (last 256 calls)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.load_s: float | None = None
+        self.warmup_s: float | None = None
+        self.images = 0
+        self.calls = 0
+        self._per_image_ms: deque = deque(maxlen=256)
+
+    def record(self, n_images: int, seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.images += n_images
+            if n_images:
+                self._per_image_ms.append(seconds * 1000 / n_images)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lat = np.asarray(self._per_image_ms)
+            return {
+                "load_s": self.load_s,
+                "warmup_s": self.warmup_s,
+                "calls": self.calls,
+                "images": self.images,
+                "last_ms_per_image": float(lat[-1]) if len(lat) else None,
+                "p50_ms_per_image": float(np.percentile(lat, 50)) if len(lat) else None,
+                "p95_ms_per_image": float(np.percentile(lat, 95)) if len(lat) else None,
+            }
+
+
+# ----- in-process model -----
+class IngredientModel:
+    """The Keras model plus labels; loads itself on first use."""
+
+    backend = "keras"
+
+    def __init__(
+        self,
+        model_path: str | Path = MODEL_PATH,
+        labels_path: str | Path | None = None,
+        threshold: float = THRESHOLD,
+    ):
+        self.model_path = Path(model_path)
+        self.labels_path = Path(labels_path) if labels_path else self.model_path.with_name("labels.json")
+        self.threshold = threshold
+        self.labels: List[str] = []
+        self.stats = Metrics()
+        self._model = None
+        self._lock = threading.Lock()  # load once; Keras predict isn't re-entrant
+
+    def load(self) -> IngredientModel:
+        with self._lock:
+            if self._model is not None:
+                return self
+            if not self.model_path.exists():
+                raise FileNotFoundError(
+                    f"Model file not found: {self.model_path} – export it from ColabV1_70_Code.ipynb."
+                )
+            t = time.perf_counter()
+            self._model = self._open()
+            self.stats.load_s = time.perf_counter() - t
+
+            t = time.perf_counter()
+            out = self._forward(np.zeros((1, *IMG_SIZE, 3), dtype=np.float32))
+            self.stats.warmup_s = time.perf_counter() - t
+
+            self.labels = load_labels(self.labels_path, out.shape[-1])
+        return self
+
+    def _open(self):
+        import tensorflow as tf
+
+        return tf.keras.models.load_model(self.model_path, compile=False)
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self._model.predict_on_batch(batch))
+
+    def predict_arrays(self, batch: np.ndarray, batch_size: int | None = None) -> List[List[Dict]]:
+        """
+        (n, 64, 64, 3) float32 in [0, 1] (or uint8 pixels) -> per image, the
+        classes above threshold as {"label", "confidence"} dicts, most
+        confident first.
+
+        Runs one forward pass per 'batch_size' images (default BATCH_SIZE).
+        """
+        self.load()
+        if batch.dtype == np.uint8:
+            batch = batch.astype(np.float32) / 255.0
+        batch_size = batch_size or BATCH_SIZE
+        out: List[List[Dict]] = []
+        for a in range(0, len(batch), batch_size):
+            part = batch[a:a + batch_size]
+            t = time.perf_counter()
+            with self._lock:
+                probs = self._forward(part)
+            self.stats.record(len(part), time.perf_counter() - t)
+            for p in probs:
+                hits = np.flatnonzero(p >= self.threshold)
+                hits = hits[np.argsort(-p[hits], kind="stable")]
+                out.append([{"label": self.labels[j], "confidence": float(p[j])} for j in hits])
+        return out
+
+    def predict(self, images: Sequence[bytes], batch_size: int | None = None) -> List[List[Dict]]:
+        """Encoded images (png/jpg bytes) -> detections per image, see predict_arrays()."""
+        if not images:
+            return []
+        return self.predict_arrays(preprocess_batch(images), batch_size)
+
+    def metrics(self) -> Dict:
+        return {"mode": "inprocess", "backend": self.backend, **self.stats.snapshot()}
+
+
+class OnnxIngredientModel(IngredientModel):
+    """
+    Same interface, served by ONNX Runtime on CPU from the int8 export
+    (export_onnx.py). Starts faster and needs far less memory than
+    importing TensorFlow.
+    """
+
+    backend = "onnx"
+
+    def __init__(self, model_path: str | Path = ONNX_PATH, **kwargs):
+        super().__init__(model_path, **kwargs)
+        self._input_name = ""
+
+    def _open(self):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(
+            str(self.model_path), opts, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = session.get_inputs()[0].name
+        return session
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self._model.run(None, {self._input_name: batch.astype(np.float32, copy=False)})[0]
+
+
+def make_model(backend: str = MODEL_BACKEND) -> IngredientModel:
+    if backend == "onnx":
+        return OnnxIngredientModel()
+    if backend == "keras":
+        return IngredientModel()
+    raise ValueError(f"Unknown model backend: {backend!r}")
+
+
+_MODEL: IngredientModel | None = None
+_MODEL_LOCK = threading.Lock()
+
+
+def _shared_model() -> IngredientModel:
+    global _MODEL
+    with _MODEL_LOCK:
+        if _MODEL is None:
+            _MODEL = make_model()
+    return _MODEL
+
+
+def get_model() -> IngredientModel:
+    """The process-wide model, loaded (and warmed up) on first call."""
+    return _shared_model().load()
+
+
+# ----- out-of-process worker -----
+# protocol: one JSON object per line each way
+#   {"op": "predict", "images": [base64, ...], "batch_size": n}
+#       -> {"detections": [[{"label", "confidence"}, ...], ...]}
+#   {"op": "predict_arrays", "pixels": base64 uint8, "n": n, "batch_size": n}
+#       -> same, for (n, 64, 64, 3) uint8 inputs prepared by the app
+#   {"op": "metrics"}                          -> {"metrics": {...}}
+def _handle(line: str | bytes) -> Dict:
+    """One request line -> its reply; a bad line gets an error reply too."""
+    try:
+        request = json.loads(line)
+        op = request.get("op")
+        if op == "predict":
+            images = [base64.b64decode(s) for s in request.get("images", [])]
+            return {"detections": get_model().predict(images, request.get("batch_size"))}
+        if op == "predict_arrays":
+            pixels = np.frombuffer(base64.b64decode(request["pixels"]), dtype=np.uint8)
+            batch = pixels.reshape(request["n"], *IMG_SIZE, 3)
+            return {"detections": get_model().predict_arrays(batch, request.get("batch_size"))}
+        if op == "metrics":
+            return {"metrics": get_model().metrics()}
+        if op == "ping":
+            return {"ok": True}
+        return {"error": f"unknown op: {op!r}"}
+    except Exception as e:  # report to the client instead of killing the worker
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def serve_stdio() -> None:
+    """Answer requests on stdin/stdout until stdin closes."""
+    get_model()
+    for line in sys.stdin:
+        if line.strip():
+            sys.stdout.write(json.dumps(_handle(line)) + "\n")
+            sys.stdout.flush()
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write((json.dumps(_handle(line)) + "\n").encode())
+                self.wfile.flush()
+
+
+def serve_socket(path: str = SOCKET_PATH) -> None:
+    """Answer requests on a Unix socket; one thread per connected app process."""
+    get_model()
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, _LineHandler) as server:
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+# ----- clients -----
+class _RemoteModel:
+    """predict() / metrics() over a line-based JSON connection."""
+
+    mode = "remote"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _exchange(self, line: bytes) -> bytes:
+        raise NotImplementedError
+
+    def _call(self, request: Dict) -> Dict:
+        with self._lock:
+            reply = json.loads(self._exchange((json.dumps(request) + "\n").encode()))
+        if "error" in reply:
+            raise RuntimeError(f"model worker: {reply['error']}")
+        return reply
+
+    def predict(self, images: Sequence[bytes], batch_size: int | None = None) -> List[List[Dict]]:
+        if not images:
+            return []
+        encoded = [base64.b64encode(b).decode("ascii") for b in images]
+        request = {"op": "predict", "images": encoded, "batch_size": batch_size}
+        return self._call(request)["detections"]
+
+    def predict_arrays(self, batch: np.ndarray, batch_size: int | None = None) -> List[List[Dict]]:
+        """(n, 64, 64, 3) uint8 inputs -> detections; 12 KB per image on the wire."""
+        if not len(batch):
+            return []
+        if batch.dtype != np.uint8:
+            batch = np.clip(np.rint(batch * 255.0), 0, 255).astype(np.uint8)
+        request = {
+            "op": "predict_arrays",
+            "pixels": base64.b64encode(np.ascontiguousarray(batch).tobytes()).decode("ascii"),
+            "n": len(batch),
+            "batch_size": batch_size,
+        }
+        return self._call(request)["detections"]
+
+    def metrics(self) -> Dict:
+        return {**self._call({"op": "metrics"})["metrics"], "mode": self.mode}
+
+
+class SocketModel(_RemoteModel):
+    """Client for serve_socket(); reconnects if the worker restarts."""
+
+    mode = "socket"
+
+    def __init__(self, path: str = SOCKET_PATH, timeout: float = 60.0):
+        super().__init__()
+        self.path = path
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._file = None
+
+    def _connect(self) -> None:
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(self.timeout)
+        self._sock.connect(self.path)
+        self._file = self._sock.makefile("rb")
+
+    def _exchange(self, line: bytes) -> bytes:
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(line)
+                reply = self._file.readline()
+                if reply:
+                    return reply
+                raise ConnectionError("model worker closed the connection")
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+        raise ConnectionError("unreachable")
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = self._file = None
+
+
+class StdioModel(_RemoteModel):
+    """Spawns serve_stdio() as a child process and talks over its pipes."""
+
+    mode = "stdio"
+
+    def __init__(self):
+        super().__init__()
+        self._proc = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "serve", "--stdio"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def _exchange(self, line: bytes) -> bytes:
+        self._proc.stdin.write(line)
+        self._proc.stdin.flush()
+        reply = self._proc.stdout.readline()
+        if not reply:
+            raise ConnectionError(f"model worker exited with code {self._proc.poll()}")
+        return reply
+
+    def close(self) -> None:
+        self._proc.stdin.close()
+        self._proc.wait(timeout=10)
+
+
+def load_recognizer(mode: str | None = None):
+    """
+    The model for this app process, per PANTRYPAL_MODEL_MODE:
+      - "inprocess" (default) : the process-wide model, loaded by the
+                                first predict (i.e. in whichever thread
+                                runs recognition, not the page script)
+      - "socket"              : SocketModel(PANTRYPAL_MODEL_SOCKET)
+      - "stdio"               : StdioModel(), a private child worker
+
+    Keep the result behind st.cache_resource so reruns reuse it.
+    """
+    mode = mode or os.environ.get("PANTRYPAL_MODEL_MODE", "inprocess")
+    if mode == "socket":
+        return SocketModel()
+    if mode == "stdio":
+        return StdioModel()
+    if mode == "inprocess":
+        return _shared_model()
+    raise ValueError(f"Unknown model mode: {mode!r}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PantryPal ingredient recognition worker")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    srv = sub.add_parser("serve", help="load the model once and answer predict requests")
+    where = srv.add_mutually_exclusive_group()
+    where.add_argument("--socket", default=SOCKET_PATH, help="Unix socket path")
+    where.add_argument("--stdio", action="store_true", help="use stdin/stdout instead")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        if args.stdio:
+            serve_stdio()
+        else:
+            print(f"Serving PantryPal model on {args.socket}", file=sys.stderr)
+            serve_socket(args.socket)
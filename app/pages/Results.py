@@ -1,4 +1,5 @@
 import streamlit as st
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -10,7 +11,17 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..
 if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
-from scripts.recipe_search import load_recipes, match_recipes  # uses your updated file
+from scripts.match_client import MATCH_URL, MatchClient
+from scripts.metrics import profile_page, span, start_exporter
+
+if not MATCH_URL:
+    # no matching service configured → this UI process holds the catalog
+    from scripts.live_catalog import LiveCatalog
+    from scripts.recipe_search import match_recipes  # uses your updated file
+    from scripts.fdc_client import FDCClient, NutritionCache
+    from scripts.match_service import add_details
+    from scripts.match_session import MatchSession
+    from scripts.result_cache import ResultCache
 
 # -------------------------------------------------
 # PAGE CONFIG
@@ -45,6 +56,9 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# /metrics for Prometheus if PANTRYPAL_METRICS_PORT is set
+start_exporter()
+
 # -------------------------------------------------
 # HEADER
 # -------------------------------------------------
@@ -94,7 +108,7 @@ with st.expander("📦 Your ingredients", expanded=True):
             cols = st.columns(3)
             for idx, img in enumerate(imgs[:3]):
                 with cols[idx % 3]:
-                    st.image(img["bytes"], caption=img["name"], use_container_width=True)
+                    st.image(img["preview"], caption=img["name"], use_container_width=True)
             if len(imgs) > 3:
                 st.caption(f"+ {len(imgs) - 3} more photos")
         else:
@@ -105,16 +119,82 @@ st.divider()
 # -------------------------------------------------
 # LOAD DATASET
 # -------------------------------------------------
-@st.cache_data(show_spinner=False)
-def _load_df():
-    # path is relative to project root (PantryPal/)
-    return load_recipes("data/raw/recipes.csv")
+@st.cache_resource(show_spinner=False)
+def _load_catalog():
+    # path is relative to project root (PantryPal/); the compiled catalog is
+    # memory-mapped, so every app process shares one copy via the page cache;
+    # fuzzy resolution lets "tomatoes" / "garlc" still find "tomato" / "garlic";
+    # a refreshed CSV is rebuilt in the background and swapped in, no restart
+    return LiveCatalog("data/raw/recipes.csv", fuzzy=0.6).start()
+
+
+@st.cache_resource(show_spinner=False)
+def _result_cache():
+    # shared by all sessions; the SQLite tier keeps popular pantries warm across restarts
+    return ResultCache(
+        maxsize=2048,
+        ttl=24 * 3600,
+        path=os.path.join(PROJECT_ROOT, "data", "cache", "results.sqlite"),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _fdc_client():
+    # USDA lookups for ingredients the precomputed table lacks: off unless
+    # FDC_API_KEY is set (live API) or PANTRYPAL_FDC_URL points at
+    # `python -m scripts.fdc_client serve`
+    return FDCClient(
+        cache=NutritionCache(os.path.join(PROJECT_ROOT, "data", "cache", "nutrition.sqlite")),
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _match_client():
+    # one keep-alive pool per app process, shared by all sessions
+    return MatchClient(MATCH_URL, pool_size=16)
+
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _service_health():
+    return _match_client().health()
+
+
+if MATCH_URL:
+    # python -m scripts.match_service does the matching; we only render
+    has_nutrition = _service_health()["nutrition"]
+else:
+    # one snapshot for the whole run, even if a reload lands meanwhile
+    catalog = _load_catalog().current
+    has_nutrition = catalog.nutrition_score is not None
 
-df = _load_df()
+    # per-session incremental matcher: adding/removing one ingredient on Home
+    # only rescans that ingredient's recipes on the next render (and starts
+    # over after a catalog reload)
+    session = st.session_state.get("match_session")
+    if session is None or session.catalog is not catalog:
+        session = st.session_state.match_session = MatchSession(catalog)
 
 st.subheader("Recipes ranked by ingredient matches")
 
+# nutrition.npy next to the catalog (python -m scripts.nutrition) enables
+# health-aware ranking; without it results are ranked by overlap only
+nutrition_weight = 0.0
+if has_nutrition:
+    nutrition_weight = st.slider(
+        "🥦 Prefer healthier recipes", 0.0, 1.0, 0.3, 0.1,
+        help="Blend a per-recipe nutrition score (USDA FoodData Central) into the ranking.",
+    )
+
+# recipes outside the chosen diets are dropped before scoring, so the
+# 7 slots are still filled from the ones that fit
+DIET_LABELS = {"vegan": "🌱 Vegan", "vegetarian": "🥦 Vegetarian", "gluten_free": "🌾 Gluten-free"}
+diets = st.multiselect(
+    "Dietary filters",
+    list(DIET_LABELS),
+    format_func=DIET_LABELS.get,
+    key="diets",
+)
+
 # -------------------------------------------------
 # BADGE HELPER
 # -------------------------------------------------
@@ -129,39 +209,90 @@ def _badge_for_pct(p: float):
         return "Loose Match", "badge-cheat"
 
 
+def _badge_for_nutrition(score: float):
+    """Map nutrition_score (0..1 catalog percentile) → label + CSS class."""
+    if score >= 0.66:
+        return "Healthy", "badge-healthy"
+    elif score >= 0.33:
+        return "Balanced", "badge-balanced"
+    else:
+        return "Cheat Day", "badge-cheat"
+
+
 # -------------------------------------------------
 # MATCH RECIPES
 # -------------------------------------------------
 if ings:
-    # quota=7 → pick up to 7 recipes using our score + thresholds
-    results = match_recipes(ings, df, quota=7)
+    # quota=7 → pick up to 7 recipes using our score + thresholds; every
+    # result comes back with its diet tags and nutrition (one batched lookup).
+    # A sampled (PANTRYPAL_PROFILE) run, or ?profile=1 where on-demand
+    # profiling is enabled, dumps a profile of this step to data/profiles
+    with profile_page("results", force=st.query_params.get("profile") == "1"):
+        if MATCH_URL:
+            results = _match_client().match(
+                ings, quota=7, nutrition_weight=nutrition_weight, diets=diets, details=True,
+            )
+        else:
+            results = match_recipes(
+                ings, catalog, quota=7, index=session, cache=_result_cache(),
+                nutrition_weight=nutrition_weight, diets=diets,
+            )
+            results = asyncio.run(add_details(catalog, results, _fdc_client()))
 
     if not results:
         st.info("No direct matches found. Try adding more common ingredients ✨")
     else:
-        for i, rec in enumerate(results, start=1):
-            name = rec["name"]
-            hits = rec["matches"]
-            total = rec["recipe_size"]
-            pct_r = int(rec["pct_recipe"] * 100)
-            pct_u = int(rec["pct_user"] * 100)
-
-            label, badge_class = _badge_for_pct(rec["pct_recipe"])
-
-            st.markdown(
-                f"""
-            <div class="recipe-card">
-                <h3>{i}. {name}
-                    <span class="health-badge {badge_class}">{label}</span>
-                </h3>
-                <p><b>Matched ingredients:</b> {hits} / {total}
-                   (<b>{pct_r}%</b> of this recipe)</p>
-                <p><b>Of your list used:</b> {pct_u}%</p>
-                <p class="muted">Top 7 recipes chosen using overlap scoring.</p>
-            </div>
-            """,
-                unsafe_allow_html=True,
-            )
+        with span("render_results", recipes=len(results)):
+            for i, rec in enumerate(results, start=1):
+                name = rec["name"]
+                hits = rec["matches"]
+                total = rec["recipe_size"]
+                pct_r = int(rec["pct_recipe"] * 100)
+                pct_u = int(rec["pct_user"] * 100)
+
+                label, badge_class = _badge_for_pct(rec["pct_recipe"])
+                health = ""
+                if "nutrition_score" in rec:
+                    h_label, h_class = _badge_for_nutrition(rec["nutrition_score"])
+                    health = f'<span class="health-badge {h_class}">{h_label}</span>'
+                tags = " ".join(
+                    f'<span class="health-badge badge-healthy">{DIET_LABELS[d]}</span>'
+                    for d in rec["diets"]
+                )
+                nutrition = ""
+                values = rec["nutrition"] or {}
+                parts = [
+                    fmt.format(values[key])
+                    for key, fmt in [
+                        ("energy_kcal", "{:.0f} kcal"),
+                        ("protein_g", "{:.1f} g protein"),
+                        ("fiber_g", "{:.1f} g fiber"),
+                    ]
+                    if key in values
+                ]
+                if parts:
+                    nutrition = (
+                        '<p class="muted">Per 100 g (ingredient average): '
+                        + " · ".join(parts) + "</p>"
+                    )
+
+                st.markdown(
+                    f"""
+                <div class="recipe-card">
+                    <h3>{i}. {name}
+                        <span class="health-badge {badge_class}">{label}</span>
+                        {health}
+                        {tags}
+                    </h3>
+                    <p><b>Matched ingredients:</b> {hits} / {total}
+                       (<b>{pct_r}%</b> of this recipe)</p>
+                    <p><b>Of your list used:</b> {pct_u}%</p>
+                    {nutrition}
+                    <p class="muted">Top 7 recipes chosen using overlap scoring.</p>
+                </div>
+                """,
+                    unsafe_allow_html=True,
+                )
 else:
     st.info("Type some ingredients on the Home page first.")
 
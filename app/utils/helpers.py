@@ -1,4 +1,17 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
 import streamlit as st
+from model.model_loader import DECODE_WORKERS, load_recognizer, model_version
+from utils.image_cache import ImageCache, content_hash, prepare_upload
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from scripts.metrics import span, timed
 
 # Session state helper keys
 def _current_input_key() -> str:
@@ -15,6 +28,10 @@ def add_from_textbox():
     txt = _get_current_text()
     fix_case = txt.title().strip()
     st.session_state.ingredient_warning = None
+    # typed by the user → stays even if the photo that added it is deleted
+    for img in st.session_state.images:
+        if fix_case in img.get("added", []):
+            img["added"].remove(fix_case)
 
     if fix_case in st.session_state.ingredients:
         st.session_state.ingredient_warning = f"'{fix_case}' has already been added!"
@@ -24,31 +41,178 @@ def add_from_textbox():
 
 # Image helpers
 def delete_image(idx: int):
-    if 0 <= idx < len(st.session_state.images):
-        st.session_state.images.pop(idx)
+    """Remove a photo and the ingredients only it put on the list."""
+    images = st.session_state.images
+    if not 0 <= idx < len(images):
+        return
+    img = images.pop(idx)
+    for name in img.get("added", []):
+        # another photo shows it too → it stays, now on that photo's account
+        other = next((o for o in images if name in _labels(o.get("detections", []))), None)
+        if other is not None:
+            other.setdefault("added", []).append(name)
+        elif name in st.session_state.ingredients:
+            st.session_state.ingredients.remove(name)
 
+@timed("process_uploads")
 def process_uploaded_files(uploaded_files):
+    """
+    Keep only what the app needs per photo: a small WebP preview and, until
+    it is recognized, the 64x64 model input. Originals are dropped here.
+    """
     if not uploaded_files:
         return
-    existing_names = {img["name"] for img in st.session_state.images}
+    # same bytes = same photo, whatever the file is called
+    existing = {img["hash"] for img in st.session_state.images}
     duplicates = []
+    new = []
 
     for file_obj in uploaded_files:
-        if file_obj.name not in existing_names:
-            try:
-                img_bytes = file_obj.read()
-                st.session_state.images.append({
-                    "name": file_obj.name,
-                    "bytes": img_bytes,
-                    "type": file_obj.type
-                })
-            except Exception as e:
-                st.error(f"Error reading file {file_obj.name}: {str(e)}")
-        else:
+        try:
+            img_bytes = file_obj.read()
+        except Exception as e:
+            st.error(f"Error reading file {file_obj.name}: {str(e)}")
+            continue
+
+        digest = content_hash(img_bytes)
+        if digest in existing:
             duplicates.append(file_obj.name)
+            continue
+        existing.add(digest)
+        new.append(({"name": file_obj.name, "type": file_obj.type, "hash": digest}, img_bytes))
 
     if duplicates:
         if len(duplicates) == 1:
             st.error(f"This image already exists: {duplicates[0]}")
         else:
             st.error(f"These images already exist: {', '.join(duplicates)}")
+
+    # seen before → preview + detections straight from the cache, no decoding
+    cache = _image_cache()
+    to_decode = []
+    for img, img_bytes in new:
+        hit = cache.get(img["hash"])
+        if hit is None:
+            to_decode.append((img, img_bytes))
+        else:
+            img["detections"], img["preview"] = hit
+            img["status"] = "done"
+            _add_detected(img)
+
+    def decode(item):
+        img, img_bytes = item
+        try:
+            img["preview"], img["tensor"] = prepare_upload(img_bytes)
+        except Exception as e:
+            img["error"] = str(e)
+        return img
+
+    # PIL releases the GIL while decoding, so big uploads use all cores
+    if to_decode:
+        with span("decode_uploads", images=len(to_decode)):
+            with ThreadPoolExecutor(max(1, min(DECODE_WORKERS, len(to_decode)))) as pool:
+                list(pool.map(decode, to_decode))
+
+    for img, _ in new:
+        if "error" in img:
+            st.error(f"Error reading image {img['name']}: {img['error']}")
+        else:
+            st.session_state.images.append(img)
+
+    recognize_pending_images()
+
+# Recognition helpers
+@st.cache_resource(show_spinner=False)
+def _recognizer():
+    # one model (or worker client) per app process, shared by all sessions
+    return load_recognizer()
+
+@st.cache_resource(show_spinner=False)
+def _image_cache():
+    # content hash -> detections + preview; survives restarts, keyed by model version
+    return ImageCache(
+        maxsize=512,
+        path=PROJECT_ROOT / "data" / "cache" / "images.sqlite",
+        namespace=model_version(),
+    )
+
+def _labels(detections):
+    return [d["label"].title().strip() for d in detections]
+
+def _add_detected(img):
+    # remember what this photo added, so delete_image() can take it back
+    added = img.setdefault("added", [])
+    for name in _labels(img["detections"]):
+        if name not in st.session_state.ingredients:
+            st.session_state.ingredients.append(name)
+            added.append(name)
+
+@st.cache_resource(show_spinner=False)
+def _recognition_pool():
+    # shared by all sessions; the model serializes the forward passes itself
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="recognize")
+
+def _recognize(recognizer, batch):
+    # resolved here, not on the page thread: the first call loads the model
+    # or starts the worker process
+    model = recognizer()
+    with span("recognize_images", images=len(batch)):
+        return model.predict_arrays(batch)
+
+def recognize_pending_images():
+    """
+    Queue every photo still holding a model input for background
+    recognition (one batch per upload) and return immediately.
+    Results are picked up by collect_recognition_results().
+    """
+    pending = [img for img in st.session_state.images if "tensor" in img]
+    if not pending:
+        return
+
+    batch = np.stack([img["tensor"] for img in pending])
+    for img in pending:
+        del img["tensor"]
+        img["status"] = "pending"
+    # the worker thread only computes; session state is updated on the page thread
+    future = _recognition_pool().submit(_recognize, _recognizer, batch)
+    st.session_state.recognition_jobs.append(
+        {"future": future, "hashes": [img["hash"] for img in pending]}
+    )
+
+def recognition_pending() -> bool:
+    return bool(st.session_state.get("recognition_jobs"))
+
+def collect_recognition_results() -> bool:
+    """Apply finished jobs to their photos; True if any finished."""
+    jobs = st.session_state.get("recognition_jobs", [])
+    done = [job for job in jobs if job["future"].done()]
+    if not done:
+        return False
+
+    images = {img["hash"]: img for img in st.session_state.images}
+    for job in done:
+        jobs.remove(job)
+        try:
+            detections = job["future"].result()
+        except Exception as e:
+            st.warning(f"Couldn't recognize ingredients in the photos: {str(e)}")
+            detections = None
+
+        for i, digest in enumerate(job["hashes"]):
+            img = images.get(digest)
+            if img is None:  # deleted while it was being recognized
+                continue
+            if detections is None:
+                img["status"], img["detections"] = "failed", []
+                continue
+            # [{"label", "confidence"}, ...], most confident first
+            img["status"], img["detections"] = "done", detections[i]
+            _image_cache().put(digest, img["detections"], img["preview"])
+            _add_detected(img)
+    return True
+
+def wait_for_recognition(timeout: float | None = None):
+    """Block until the outstanding jobs (only) have finished, then apply them."""
+    jobs = st.session_state.get("recognition_jobs", [])
+    wait([job["future"] for job in jobs], timeout=timeout)
+    collect_recognition_results()
@@ -0,0 +1,141 @@
+# app/utils/image_cache.py
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from model.model_loader import image_to_input
+
+PREVIEW_SIZE = 512  # longest side of the preview kept for each photo
+
+
+def content_hash(data: bytes) -> str:
+    """BLAKE2b of the file bytes: same photo → same key, whatever its name."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def prepare_upload(data: bytes, size: int = PREVIEW_SIZE) -> Tuple[bytes, np.ndarray]:
+    """
+    Decode an upload once into what the app keeps instead of the original:
+    a WebP preview at most 'size' px on its longest side, and the
+    (64, 64, 3) uint8 model input.
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(io.BytesIO(data))
+    # JPEGs decode straight at reduced scale; phone photos never hit full size
+    img.draft("RGB", (size, size))
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    img.thumbnail((size, size))
+
+    out = io.BytesIO()
+    img.save(out, format="WEBP", quality=80, method=4)
+    return out.getvalue(), image_to_input(img)
+
+
+class ImageCache:
+    """
+    LRU cache: content hash -> (detections, preview bytes).
+
+      - memory tier : OrderedDict, at most 'maxsize' entries
+      - disk tier   : optional SQLite file that survives restarts, at most
+                      'disk_maxsize' entries (least recently used go first)
+      - namespace   : e.g. the model version; entries from another
+                      namespace are never returned
+
+    Safe to share between Streamlit session threads.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        path: str | Path | None = None,
+        namespace: str = "",
+        disk_maxsize: int = 10_000,
+    ):
+        self.maxsize = maxsize
+        self.disk_maxsize = disk_maxsize
+        self.namespace = namespace
+        self._mem: OrderedDict[str, Tuple[List[Dict], bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS images "
+                "(key TEXT PRIMARY KEY, detections TEXT, thumb BLOB, used REAL)"
+            )
+            self._db.commit()
+
+    def _key(self, digest: str) -> str:
+        return f"{self.namespace}:{digest}"
+
+    def get(self, digest: str) -> Tuple[List[Dict], bytes] | None:
+        key = self._key(digest)
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return entry
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT detections, thumb FROM images WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE images SET used = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    entry = (json.loads(row[0]), bytes(row[1]))
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+                    return entry
+
+            self.misses += 1
+            return None
+
+    def put(self, digest: str, detections: List[Dict], preview: bytes) -> None:
+        key = self._key(digest)
+        with self._lock:
+            self._remember(key, (detections, preview))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(detections), preview, time.time()),
+                )
+                self._db.execute(
+                    "DELETE FROM images WHERE key IN "
+                    "(SELECT key FROM images ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_maxsize,),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, entry: Tuple[List[Dict], bytes]) -> None:
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "size": len(self._mem),
+        }
@@ -0,0 +1,251 @@
+# scripts/benchmark.py
+"""
+Offline benchmark for recipe_search.
+
+    python -m scripts.benchmark                       # 10k + 100k rows
+    python -m scripts.benchmark --rows 1000000 --out bench/1m.json
+
+For each catalog size it generates a Kaggle-shaped CSV (cached under
+data/bench/), then, in a fresh process so peak RSS is per run, measures:
+
+  - cold load  : load_recipes (CSV path), compile_recipes, opening the catalog
+                 (compiled into a scratch directory under data/bench/, so a
+                 --csv run never touches the catalog next to the real CSV)
+  - warm query : p50 / p99 / mean latency and queries/s per backend
+  - batch      : match_recipes_batch pantries/s
+  - memory     : peak RSS of the run
+
+Results are written as JSON (with the git commit) so runs can be diffed
+across commits.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from scripts.recipe_search import (
+    BASE_DIR,
+    build_index,
+    build_matrix,
+    compile_recipes,
+    load_recipes,
+    match_recipes,
+    match_recipes_batch,
+)
+from scripts.catalog import CompiledCatalog
+
+# ----- synthetic catalog -----
+# pantry staples first: ingredient popularity follows a Zipf-like curve
+BASE_INGREDIENTS = [
+    "salt", "olive oil", "garlic", "onion", "butter", "black pepper", "sugar",
+    "all-purpose flour", "eggs", "water", "milk", "tomatoes", "lemon juice",
+    "vegetable oil", "parmesan cheese", "chicken breast", "ground beef",
+    "carrots", "celery", "soy sauce", "honey", "ginger", "cumin", "paprika",
+    "cilantro", "basil", "oregano", "thyme", "rosemary", "bay leaves",
+    "red bell pepper", "jalapeno", "lime", "avocado", "black beans", "rice",
+    "pasta", "spinach", "mushrooms", "zucchini", "potatoes", "sweet potato",
+    "heavy cream", "sour cream", "cheddar cheese", "mozzarella", "bacon",
+    "shrimp", "salmon", "tofu", "chickpeas", "lentils", "coconut milk",
+    "brown sugar", "vanilla extract", "baking powder", "baking soda",
+    "cinnamon", "nutmeg", "maple syrup", "dijon mustard", "mayonnaise",
+    "ketchup", "worcestershire sauce", "red wine vinegar", "balsamic vinegar",
+    "chicken broth", "beef broth", "green onions", "shallots", "leeks",
+    "cabbage", "broccoli", "cauliflower", "corn", "peas", "green beans",
+    "apples", "bananas", "strawberries", "blueberries", "walnuts", "almonds",
+    "pecans", "peanut butter", "oats", "quinoa", "yogurt", "feta cheese",
+    "goat cheese", "pork chops", "lamb", "turkey", "sausage", "ham",
+]
+QUANTITIES = ["", "", "1", "2", "1/2", "3/4", "1 1/2", "2 large", "3", "4", "1 pinch"]
+UNITS = ["", "", "cup", "cups", "tbsp", "tablespoons", "tsp", "teaspoon", "oz", "lb", "cloves", "g"]
+PREP = ["", "", "", "chopped", "minced", "diced", "fresh", "sliced", "grated", "softened"]
+
+
+def _phrase(rng: random.Random, weights: List[float]) -> str:
+    ing = rng.choices(BASE_INGREDIENTS, weights=weights)[0]
+    if rng.random() < 0.15:
+        # long tail: brand / variety words make many unique phrases
+        ing = f"{rng.choice(['organic', 'low-sodium', 'smoked', 'wild', 'baby'])} {ing}"
+    parts = [rng.choice(QUANTITIES), rng.choice(UNITS), ing]
+    prep = rng.choice(PREP)
+    phrase = " ".join(p for p in parts if p)
+    return f"{phrase}, {prep}" if prep and rng.random() < 0.5 else f"{prep} {phrase}".strip()
+
+
+def generate_catalog(path: str | Path, rows: int, fmt: str = "mixed", seed: int = 0) -> Path:
+    """
+    Write a Kaggle-shaped recipes CSV ('recipe_name', 'ingredients').
+
+    fmt: 'list'  → "['2 cups flour', 'salt']" (Python list literal)
+         'comma' → "2 cups flour, salt"
+         'mixed' → both, row by row
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(len(BASE_INGREDIENTS))]
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["recipe_name", "ingredients"])
+        for i in range(rows):
+            k = max(1, int(rng.gauss(9, 3)))
+            phrases = [_phrase(rng, weights) for _ in range(k)]
+            as_list = fmt == "list" or (fmt == "mixed" and i % 2 == 0)
+            if as_list:
+                cell = repr(phrases)
+            else:
+                # comma format can't carry inner commas
+                cell = ", ".join(p.replace(",", "") for p in phrases)
+            w.writerow([f"Recipe {i}", cell])
+    return path
+
+
+def make_workload(n: int, seed: int = 1) -> List[List[str]]:
+    """Pantries of 3–12 items, skewed to staples, with some casing noise."""
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) ** 0.7 for i in range(len(BASE_INGREDIENTS))]
+    pantries = []
+    for _ in range(n):
+        k = rng.randint(3, 12)
+        items = {rng.choices(BASE_INGREDIENTS, weights=weights)[0] for _ in range(k)}
+        pantries.append([x.title() if rng.random() < 0.5 else x for x in items])
+    return pantries
+
+
+# ----- measurement -----
+def _latency(fn, workload: List[List[str]]) -> Dict:
+    fn(workload[0])  # warm caches / page-in
+    times = []
+    t0 = time.perf_counter()
+    for q in workload:
+        t = time.perf_counter()
+        fn(q)
+        times.append(time.perf_counter() - t)
+    total = time.perf_counter() - t0
+    ms = np.asarray(times) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "qps": round(len(workload) / total, 1),
+    }
+
+
+def _timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, round(time.perf_counter() - t, 3)
+
+
+def run_scenario(csv_path: str, n_queries: int, seed: int, scratch_dir: str) -> Dict:
+    """One full measurement run (call in a fresh process for a clean RSS)."""
+    Path(scratch_dir).mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=scratch_dir) as tmp:
+        return _measure(Path(csv_path), n_queries, seed, Path(tmp) / "recipes.catalog")
+
+
+def _measure(csv_path: Path, n_queries: int, seed: int, cat_dir: Path) -> Dict:
+    out: Dict = {"csv": str(csv_path), "queries": n_queries}
+
+    df, out["cold_load_csv_s"] = _timed(lambda: load_recipes(csv_path, use_compiled=False))
+    out["recipes"] = len(df)
+    _, out["compile_s"] = _timed(lambda: compile_recipes(csv_path, cat_dir))
+    catalog, out["open_catalog_s"] = _timed(lambda: CompiledCatalog(cat_dir))
+    _, out["load_compiled_frame_s"] = _timed(catalog.to_frame)
+    index, out["build_index_s"] = _timed(lambda: build_index(df))
+    matrix, out["build_matrix_s"] = _timed(lambda: build_matrix(df))
+
+    workload = make_workload(n_queries, seed=seed + 1)
+    out["query"] = {
+        "index": _latency(lambda q: match_recipes(q, df, index=index), workload),
+        "matrix": _latency(lambda q: match_recipes(q, df, index=matrix), workload),
+        "catalog": _latency(lambda q: match_recipes(q, catalog), workload),
+        "catalog_topk": _latency(lambda q: match_recipes(q, catalog, topk=True), workload),
+    }
+
+    batch = make_workload(max(n_queries, 1000), seed=seed + 2)
+    _, secs = _timed(lambda: match_recipes_batch(batch, catalog))
+    out["batch_pantries_per_s"] = round(len(batch) / max(secs, 1e-9), 1)
+
+    # Linux reports KiB, macOS bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    out["peak_rss_mb"] = round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return out
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: List[str] | None = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Benchmark load_recipes / match_recipes")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--format", choices=["mixed", "list", "comma"], default="mixed")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", default=None, help="benchmark a real CSV instead of synthetic ones")
+    parser.add_argument("--data-dir", default=str(BASE_DIR / "data" / "bench"))
+    parser.add_argument("--out", default=None, help="write JSON results here")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        csvs = [Path(args.csv)]
+    else:
+        csvs = []
+        for rows in args.rows:
+            p = Path(args.data_dir) / f"recipes_{rows}_{args.format}_s{args.seed}.csv"
+            if not p.exists():
+                print(f"generating {p} ...", file=sys.stderr)
+                generate_catalog(p, rows, fmt=args.format, seed=args.seed)
+            csvs.append(p)
+
+    results = []
+    ctx = mp.get_context("spawn")
+    for p in csvs:
+        print(f"benchmarking {p.name} ...", file=sys.stderr)
+        with ctx.Pool(1) as pool:
+            res = pool.apply(run_scenario, (str(p), args.queries, args.seed, args.data_dir))
+        results.append(res)
+        for backend, m in res["query"].items():
+            print(
+                f"  {backend:13s} p50 {m['p50_ms']:8.3f} ms  p99 {m['p99_ms']:8.3f} ms  "
+                f"{m['qps']:9.1f} q/s",
+                file=sys.stderr,
+            )
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# scripts/canonical.py
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import List
+
+# "(about 2 cups)", "[optional]"
+_PARENS = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+# 2, 1/2, 1.5, 1-2, 2x, ½, 400g, 14oz
+_QUANTITY = re.compile(
+    r"^[\d½⅓⅔¼¾⅛⅜⅝⅞]+(?:[./-][\d½⅓⅔¼¾⅛⅜⅝⅞]+)*(?:x|g|kg|ml|l|oz|lbs?)?$"
+)
+
+UNITS = {
+    "cup", "cups", "c", "tablespoon", "tablespoons", "tbsp", "tbs", "tbl",
+    "teaspoon", "teaspoons", "tsp", "ounce", "ounces", "oz", "pound", "pounds",
+    "lb", "lbs", "gram", "grams", "g", "kg", "kilogram", "kilograms", "ml",
+    "milliliter", "milliliters", "l", "liter", "liters", "litre", "litres",
+    "pint", "pints", "pt", "quart", "quarts", "qt", "gallon", "gallons",
+    "pinch", "pinches", "dash", "dashes", "clove", "cloves", "can", "cans",
+    "package", "packages", "pkg", "jar", "jars", "bunch", "bunches", "stick",
+    "sticks", "slice", "slices", "piece", "pieces", "sprig", "sprigs",
+    "head", "heads", "handful", "handfuls", "drop", "drops", "envelope",
+    "container", "bottle", "box", "bag", "tin", "tins", "inch", "inches", "x",
+}
+PREP_WORDS = {
+    "chopped", "minced", "diced", "sliced", "grated", "shredded", "crushed",
+    "ground", "peeled", "seeded", "cored", "trimmed", "halved", "quartered",
+    "cubed", "julienned", "mashed", "melted", "softened", "beaten", "sifted",
+    "packed", "divided", "drained", "rinsed", "thawed", "cooked", "uncooked",
+    "toasted", "fresh", "freshly", "finely", "coarsely", "roughly", "thinly",
+    "lightly", "large", "medium", "small", "whole", "optional", "about",
+    "approximately", "taste", "to", "of", "for", "plus", "more", "needed",
+    "serving", "garnish", "room", "temperature",
+}
+# words whose trailing "s" is not a plural
+_KEEP_S = {
+    "molasses", "asparagus", "hummus", "couscous", "swiss", "citrus",
+    "hibiscus", "octopus", "grits", "bass", "brussels", "chips", "greens",
+}
+_IRREGULAR = {"leaves": "leaf", "halves": "half", "loaves": "loaf", "knives": "knife"}
+_EDGE_WORDS = {"and", "or", "a", "an", "the", "with", "in"}
+
+
+def singularize(word: str) -> str:
+    """Cheap English singular for a head noun: tomatoes -> tomato, berries -> berry."""
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+    if len(word) <= 3 or word in _KEEP_S or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "zes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=1 << 18)
+def canonicalize(phrase: str) -> str:
+    """
+    Normalized phrase -> canonical ingredient name.
+
+    "3 tbsp unsalted butter, softened" -> "unsalted butter"
+    "2 large tomatoes (about 1 lb)"    -> "tomato"
+
+    Drops parentheticals, anything after the first comma, quantities,
+    units and prep words, then singularizes the last word. A phrase with
+    nothing left (e.g. "1 cup") is returned unchanged.
+    """
+    text = _PARENS.sub(" ", phrase)
+    for part in text.split(","):
+        words = [w.strip(".;:*!\"'") for w in part.split()]
+        words = [
+            w for w in words
+            if w and not _QUANTITY.match(w) and w not in UNITS and w not in PREP_WORDS
+        ]
+        while words and words[0] in _EDGE_WORDS:
+            words.pop(0)
+        while words and words[-1] in _EDGE_WORDS:
+            words.pop()
+        if words:
+            words[-1] = singularize(words[-1])
+            return " ".join(words)
+    return phrase
+
+
+def canonicalize_list(phrases: List[str]) -> List[str]:
+    """canonicalize() per phrase; keeps positions, so recipe sizes are unchanged."""
+    return [canonicalize(p) for p in phrases]
+
+
+# what may surround a term in a "\n"-separated phrase list (str or bytes)
+_SEPARATORS = {"", " ", "\n", b"", b" ", b"\n"}
+# plural endings allowed on the term's last word; canonicalize() only
+# singularizes a phrase's last word ("eggs benedict")
+_PLURAL_ENDINGS = {"", "s", "es", b"", b"s", b"es"}
+
+
+def whole_words(hay: str | bytes, i: int, n: int) -> bool:
+    """
+    True if hay[i:i + n] is a run of whole words in a "\\n"-separated phrase
+    list: "egg" is in "egg white" and "eggs benedict", not in "eggplant".
+    """
+    if hay[i - 1:i] not in _SEPARATORS:
+        return False
+    end = i + n
+    return any(
+        hay[end:end + k] in _PLURAL_ENDINGS and hay[end + k:end + k + 1] in _SEPARATORS
+        for k in (0, 1, 2)
+    )
@@ -0,0 +1,935 @@
+# scripts/catalog.py
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import shutil
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.canonical import canonicalize, whole_words
+from scripts.dietary import allowed_mask, recipe_flags
+from scripts.metrics import span
+from scripts.recipe_matrix import select_matches
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, concurrent rebuilds may repeat
+    fcntl = None
+
+# bump when the on-disk layout changes; older catalogs then count as stale
+FORMAT_VERSION = 5
+
+# delta segments (scripts/segments.py) live in <catalog>/segments/, listed
+# by segments/manifest.json, which then also holds the source CSV stamp
+MANIFEST = Path("segments") / "manifest.json"
+
+
+def catalog_dir_for(csv_path: str | Path) -> Path:
+    """Default compiled location: data/raw/recipes.csv -> data/raw/recipes.catalog/"""
+    return Path(csv_path).with_suffix(".catalog")
+
+
+def _source_stamp(source: Path) -> Dict:
+    st = source.stat()
+    return {
+        "source": str(source),
+        "source_mtime_ns": st.st_mtime_ns,
+        "source_size": st.st_size,
+    }
+
+
+def source_digest(source: str | Path) -> str:
+    """Content hash of a source CSV (streamed, so any size is fine)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_keys(values: Sequence[str]) -> np.ndarray:
+    """uint64 recipe keys: 64-bit hashes of stable ids or row contents."""
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(v.encode("utf-8"), digest_size=8).digest(), "little")
+            for v in values
+        ),
+        dtype=np.uint64,
+        count=len(values),
+    )
+
+
+def _content_keys(names: Sequence[str], ingredient_lists: Sequence[List[str]]) -> np.ndarray:
+    return hash_keys([f"{n}\x1f" + "\x1f".join(ings) for n, ings in zip(names, ingredient_lists)])
+
+
+@contextmanager
+def catalog_lock(catalog_dir: str | Path) -> Iterator[None]:
+    """
+    Exclusive lock on '<catalog>.lock', held while the catalog is rebuilt,
+    extended or merged, so app processes sharing it do that work once.
+    Not reentrant (no-op without fcntl).
+    """
+    catalog_dir = Path(catalog_dir)
+    if fcntl is None:
+        yield
+        return
+    catalog_dir.parent.mkdir(parents=True, exist_ok=True)
+    with open(catalog_dir.with_name(f"{catalog_dir.name}.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _pack_strings(items: Sequence[str], sep: bytes = b"") -> Tuple[bytes, np.ndarray]:
+    """Strings -> (UTF-8 blob, int64 byte offsets) with len(items) + 1 offsets."""
+    encoded = [s.encode("utf-8") + sep for s in items]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+# postings per step when close() merges / ranks them (bounds its memory)
+POSTINGS_BLOCK = 1 << 22
+# original phrases the writer remembers for de-duplication (per generation)
+TEXT_DEDUP = 1 << 16
+
+
+def _blocks(post_offsets: np.ndarray, block: int) -> Iterator[Tuple[int, int]]:
+    """Phrase id ranges [a, b) holding at most 'block' postings (or one phrase)."""
+    n = len(post_offsets) - 1
+    a = 0
+    while a < n:
+        b = int(np.searchsorted(post_offsets, post_offsets[a] + block, side="right")) - 1
+        b = min(max(b, a + 1), n)
+        yield a, b
+        a = b
+
+
+def _open_array(path: Path, dtype, n: int) -> np.ndarray:
+    """A writable .npy of 'n' items, memory-mapped unless empty."""
+    if n == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(n,))
+
+
+def _finish_array(path: Path, arr: np.ndarray) -> None:
+    if isinstance(arr, np.memmap):
+        arr.flush()
+    else:
+        np.save(path, arr)
+
+
+def chunk_postings(
+    sizes: np.ndarray, ing_ids: np.ndarray, first: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (phrase, recipe) pairs of consecutive recipes 'first', 'first' + 1, ...
+    sorted by phrase, then recipe; a recipe listing a phrase twice is
+    posted once.
+    """
+    recipe = np.repeat(np.arange(first, first + len(sizes), dtype=np.int32), sizes)
+    order = np.lexsort((recipe, ing_ids))
+    phrase, recipe = ing_ids[order], recipe[order]
+
+    keep = np.ones(len(phrase), dtype=bool)
+    keep[1:] = (phrase[1:] != phrase[:-1]) | (recipe[1:] != recipe[:-1])
+    return phrase[keep], recipe[keep]
+
+
+def merge_postings(
+    runs: Sequence[Tuple[np.ndarray, np.ndarray]],
+    n_vocab: int,
+    out_dir: Path,
+    block: int = POSTINGS_BLOCK,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge chunk_postings() runs of consecutive chunks into the inverted
+    index: out_dir/post_offsets.npy and post_ids.npy (recipes using phrase
+    p are post_ids[post_offsets[p]:post_offsets[p+1]], ascending).
+
+    The runs stay on disk; 'block' postings are merged at a time.
+    Returns (post_offsets, memory-mapped post_ids).
+    """
+    counts = np.zeros(n_vocab, dtype=np.int64)
+    for phrase, _ in runs:
+        counts += np.bincount(phrase, minlength=n_vocab)
+    post_offsets = np.zeros(n_vocab + 1, dtype=np.int64)
+    np.cumsum(counts, out=post_offsets[1:])
+    np.save(out_dir / "post_offsets.npy", post_offsets)
+
+    post_ids = _open_array(out_dir / "post_ids.npy", np.int32, int(post_offsets[-1]))
+    for a, b in _blocks(post_offsets, block):
+        phrases: List[np.ndarray] = []
+        recipes: List[np.ndarray] = []
+        for phrase, recipe in runs:
+            lo, hi = np.searchsorted(phrase, [a, b])
+            phrases.append(phrase[lo:hi])
+            recipes.append(recipe[lo:hi])
+        # runs come in recipe order: a stable sort by phrase keeps every
+        # phrase's recipes ascending
+        order = np.argsort(np.concatenate(phrases), kind="stable")
+        post_ids[post_offsets[a]:post_offsets[b]] = np.concatenate(recipes)[order]
+    _finish_array(out_dir / "post_ids.npy", post_ids)
+    return post_offsets, np.load(out_dir / "post_ids.npy", mmap_mode="r")
+
+
+def rank_postings(
+    sizes: np.ndarray,
+    post_offsets: np.ndarray,
+    post_ids: np.ndarray,
+    out_dir: Path,
+    block: int = POSTINGS_BLOCK,
+) -> None:
+    """
+    Size-ordered copy of the postings for early-terminating top-k.
+
+    Writes out_dir/by_rank.npy (by_rank[r] is the position of the r-th
+    recipe in (recipe_size, position) order) and rank_post_ids.npy (the
+    same postings as post_ids, as ranks, ascending per phrase), 'block'
+    postings at a time.
+    """
+    by_rank = np.argsort(sizes, kind="stable").astype(np.int32)
+    rank = np.empty(len(sizes), dtype=np.int32)
+    rank[by_rank] = np.arange(len(sizes), dtype=np.int32)
+    np.save(out_dir / "by_rank.npy", by_rank)
+
+    ranked_ids = _open_array(out_dir / "rank_post_ids.npy", np.int32, len(post_ids))
+    for a, b in _blocks(post_offsets, block):
+        start, end = int(post_offsets[a]), int(post_offsets[b])
+        ranked = rank[post_ids[start:end]]
+        phrase = np.repeat(np.arange(a, b), np.diff(post_offsets[a:b + 1]))
+        ranked_ids[start:end] = ranked[np.lexsort((ranked, phrase))]
+    _finish_array(out_dir / "rank_post_ids.npy", ranked_ids)
+
+
+class CatalogWriter:
+    """
+    Streams recipes into a compiled catalog directory.
+
+    add() can be called once per CSV chunk: phrases are interned into the
+    vocabulary, names / ids / offsets are appended straight to disk and the
+    chunk's postings are spilled as a sorted run. close() merges the runs
+    on disk, a block at a time, writes meta.json and renames the directory
+    into place. Memory stays bounded by the chunk plus the canonical
+    vocabulary: original phrases are de-duplicated through two bounded
+    generations of recently seen ones (TEXT_DEDUP each; a phrase seen again
+    moves to the young one), so a rare one may be stored more than once.
+
+    Every distinct phrase is canonicalized once ("3 tbsp butter, softened"
+    -> "butter"); matching runs on the canonical ids, and the original text
+    is kept alongside for display.
+
+    Layout (all flat, memory-mappable):
+      - vocab.bin / vocab_offsets  : canonical ingredients, UTF-8, "\\n"-terminated
+      - text.bin / text_offsets    : original phrases, same encoding
+      - names.bin / names_offsets  : display names, UTF-8
+      - offsets / ing_ids / sizes  : recipe i uses ing_ids[offsets[i]:offsets[i+1]]
+      - text_ids                   : original phrase id per ing_ids entry
+      - post_offsets / post_ids    : vocab id -> recipe positions (inverted index)
+      - by_rank / rank_post_ids    : the same postings in recipe-size order (top-k)
+      - keys                       : uint64 recipe key (stable id or content hash)
+      - meta.json                  : format version, counts, source CSV stamp + digest
+
+    With a 'base' catalog the writer continues its vocabulary instead of
+    starting a new one (a delta segment, see scripts/segments.py): phrase
+    and text ids go on from the base's, the blobs hold only the new
+    phrases, and meta.json records where they start. 'meta' adds fields to
+    meta.json (a stamp to record instead of 'source', version fields).
+    """
+
+    def __init__(
+        self,
+        out_dir: str | Path,
+        source: str | Path | None = None,
+        base: CompiledCatalog | None = None,
+        meta: Dict | None = None,
+    ):
+        self.out = Path(out_dir)
+        self.source = Path(source) if source is not None else None
+        self.extra_meta = dict(meta or {})
+        self.n_recipes = 0
+
+        self._vocab: Dict[str, int] = {}
+        # recent original phrase -> (text id, vocab id), young and old generation
+        self._texts: Dict[str, Tuple[int, int]] = {}
+        self._old_texts: Dict[str, Tuple[int, int]] = {}
+        self._n_text = 0
+        if base is not None:
+            self._vocab = {p: i for i, p in enumerate(base.vocab())}
+            self._n_text = sum(len(s.text_offsets) - 1 for s in getattr(base, "segments", [base]))
+            self.extra_meta.update(vocab_start=len(self._vocab), text_start=self._n_text)
+        self._n_ids = 0
+        self._n_name_bytes = 0
+        self._n_vocab_bytes = 0
+        self._n_text_bytes = 0
+
+        self._tmp = self.out.with_name(f"{self.out.name}.tmp-{os.getpid()}")
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        self._tmp.mkdir(parents=True)
+        self._runs_dir = self._tmp / "runs"
+        self._runs_dir.mkdir()
+        self._runs: List[str] = []
+        self._files = {
+            name: open(self._tmp / name, "wb")
+            for name in [
+                "vocab.bin",
+                "text.bin",
+                "names.bin",
+                "vocab_offsets.raw",
+                "text_offsets.raw",
+                "names_offsets.raw",
+                "offsets.raw",
+                "ing_ids.raw",
+                "text_ids.raw",
+                "keys.raw",
+            ]
+        }
+        # every offsets array starts with 0
+        for name in ["vocab_offsets.raw", "text_offsets.raw", "names_offsets.raw", "offsets.raw"]:
+            self._files[name].write(np.zeros(1, dtype=np.int64).tobytes())
+
+    def add(
+        self,
+        names: Sequence[str],
+        ingredient_lists: Sequence[List[str]],
+        keys: np.ndarray | None = None,
+    ) -> None:
+        """
+        Append one batch of recipes (display names + normalized phrase lists).
+
+        'keys' (see hash_keys) identify the recipes across segments; they
+        default to a hash of the name and phrases.
+        """
+        if keys is None:
+            keys = _content_keys(names, ingredient_lists)
+        vocab = self._vocab
+        new_phrases: List[str] = []
+        new_texts: List[str] = []
+        ids: List[int] = []
+        text_ids: List[int] = []
+        sizes = np.fromiter((len(x) for x in ingredient_lists), dtype=np.int64, count=len(ingredient_lists))
+        for ings in ingredient_lists:
+            for ing in ings:
+                hit = self._texts.get(ing)
+                if hit is None:
+                    hit = self._old_texts.get(ing)
+                    if hit is None:
+                        canon = canonicalize(ing)
+                        pid = vocab.get(canon)
+                        if pid is None:
+                            pid = vocab[canon] = len(vocab)
+                            new_phrases.append(canon)
+                        hit = (self._n_text + len(new_texts), pid)
+                        new_texts.append(ing)
+                    if len(self._texts) >= TEXT_DEDUP:
+                        self._old_texts, self._texts = self._texts, {}
+                    self._texts[ing] = hit
+                text_ids.append(hit[0])
+                ids.append(hit[1])
+        offsets = self._n_ids + np.cumsum(sizes)
+        ing_ids = np.asarray(ids, dtype=np.int32)
+
+        vocab_blob, vocab_offsets = _pack_strings(new_phrases, sep=b"\n")
+        text_blob, text_offsets = _pack_strings(new_texts, sep=b"\n")
+        names_blob, names_offsets = _pack_strings([str(n) for n in names])
+
+        f = self._files
+        f["vocab.bin"].write(vocab_blob)
+        f["vocab_offsets.raw"].write((vocab_offsets[1:] + self._n_vocab_bytes).tobytes())
+        f["text.bin"].write(text_blob)
+        f["text_offsets.raw"].write((text_offsets[1:] + self._n_text_bytes).tobytes())
+        f["names.bin"].write(names_blob)
+        f["names_offsets.raw"].write((names_offsets[1:] + self._n_name_bytes).tobytes())
+        f["offsets.raw"].write(offsets.tobytes())
+        f["ing_ids.raw"].write(ing_ids.tobytes())
+        f["text_ids.raw"].write(np.asarray(text_ids, dtype=np.int32).tobytes())
+        f["keys.raw"].write(np.asarray(keys, dtype=np.uint64).tobytes())
+        self._spill(sizes, ing_ids)
+
+        self._n_vocab_bytes += len(vocab_blob)
+        self._n_text_bytes += len(text_blob)
+        self._n_name_bytes += len(names_blob)
+        self._n_text += len(new_texts)
+        self._n_ids += len(ids)
+        self.n_recipes += len(ingredient_lists)
+
+    def _spill(self, sizes: np.ndarray, ing_ids: np.ndarray) -> None:
+        """This chunk's postings as one sorted run on disk, for close() to merge."""
+        if len(ing_ids) == 0:
+            return
+        phrase, recipe = chunk_postings(sizes, ing_ids, self.n_recipes)
+        run = f"{len(self._runs):06d}"
+        np.save(self._runs_dir / f"{run}.phrase.npy", phrase)
+        np.save(self._runs_dir / f"{run}.recipe.npy", recipe)
+        self._runs.append(run)
+
+    def abort(self) -> None:
+        """Throw away a partially written catalog."""
+        for fh in self._files.values():
+            fh.close()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def close(self) -> Path:
+        """Finish the catalog and swap it into 'out_dir'."""
+        for fh in self._files.values():
+            fh.close()
+
+        tmp = self._tmp
+        raw = {
+            "vocab_offsets": np.int64,
+            "text_offsets": np.int64,
+            "names_offsets": np.int64,
+            "offsets": np.int64,
+            "ing_ids": np.int32,
+            "text_ids": np.int32,
+            "keys": np.uint64,
+        }
+        for name, dtype in raw.items():
+            path = tmp / f"{name}.raw"
+            # memmap → np.save streams from the page cache, no full copy in RAM
+            if path.stat().st_size:
+                arr = np.memmap(path, dtype=dtype, mode="r")
+            else:
+                arr = np.zeros(0, dtype=dtype)
+            np.save(tmp / f"{name}.npy", arr)
+            del arr
+            path.unlink()
+
+        offsets = np.load(tmp / "offsets.npy", mmap_mode="r")
+        sizes = np.diff(offsets).astype(np.int32)
+        np.save(tmp / "sizes.npy", sizes)
+        del offsets
+
+        def load_run(run: str, part: str) -> np.ndarray:
+            return np.load(self._runs_dir / f"{run}.{part}.npy", mmap_mode="r")
+
+        runs = [(load_run(r, "phrase"), load_run(r, "recipe")) for r in self._runs]
+        post_offsets, post_ids = merge_postings(runs, len(self._vocab), tmp)
+        del runs
+        shutil.rmtree(self._runs_dir)
+        rank_postings(sizes, post_offsets, post_ids, tmp)
+        del post_ids
+
+        meta = {
+            "format": FORMAT_VERSION,
+            "n_recipes": self.n_recipes,
+            "n_vocab": len(self._vocab),
+            "n_text": self._n_text,
+        }
+        if self.source is not None:
+            meta.update(_source_stamp(self.source))
+            meta["source_digest"] = source_digest(self.source)
+        meta.update(self.extra_meta)
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+
+        # swap in: old → .old, tmp → out, drop .old
+        out = self.out
+        old = out.with_name(f"{out.name}.old-{os.getpid()}")
+        if out.exists():
+            out.rename(old)
+        tmp.rename(out)
+        shutil.rmtree(old, ignore_errors=True)
+        return out
+
+
+def write_catalog(
+    out_dir: str | Path,
+    names: Sequence[str],
+    ingredient_lists: Sequence[List[str]],
+    source: str | Path | None = None,
+    keys: np.ndarray | None = None,
+) -> Path:
+    """
+    Write a whole normalized catalog at once (see CatalogWriter for the layout).
+
+    The directory is written next to itself and renamed into place, so a
+    reader never sees a half-written catalog.
+    """
+    writer = CatalogWriter(out_dir, source=source)
+    writer.add(names, ingredient_lists, keys)
+    return writer.close()
+
+
+def read_meta(catalog_dir: str | Path) -> Dict | None:
+    """meta.json of a compiled catalog, or None if missing/unreadable."""
+    try:
+        return json.loads((Path(catalog_dir) / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _stamp_path(catalog_dir: Path) -> Path:
+    """Where the source stamp lives: the segment manifest if any, else meta.json."""
+    manifest = catalog_dir / MANIFEST
+    return manifest if manifest.exists() else catalog_dir / "meta.json"
+
+
+def read_stamp(catalog_dir: str | Path) -> Dict | None:
+    """Source stamp (format, mtime, size, digest) the catalog currently reflects."""
+    try:
+        return json.loads(_stamp_path(Path(catalog_dir)).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path: Path, data: Dict) -> None:
+    """Replace a small JSON file atomically (readers see old or new)."""
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+
+def is_fresh(catalog_dir: str | Path, source: str | Path) -> bool:
+    """True if 'catalog_dir' was compiled from the current 'source' CSV."""
+    meta = read_stamp(catalog_dir)
+    if meta is None or meta.get("format") != FORMAT_VERSION:
+        return False
+    try:
+        stamp = _source_stamp(Path(source))
+    except OSError:
+        return False
+    return (
+        meta.get("source_mtime_ns") == stamp["source_mtime_ns"]
+        and meta.get("source_size") == stamp["source_size"]
+    )
+
+
+def set_stamp(catalog_dir: str | Path, stamp: Dict) -> None:
+    """Record that the catalog now reflects the source as of 'stamp'."""
+    catalog_dir = Path(catalog_dir)
+    meta = read_stamp(catalog_dir) or {}
+    meta.update(stamp)
+    write_json(_stamp_path(catalog_dir), meta)
+
+
+def read_appended(source: str | Path, stamp: Dict) -> Tuple[bytes, Dict] | None:
+    """
+    (bytes appended to 'source' since 'stamp', stamp of the file now) if
+    the file only grew by whole lines since then – its first stamp-size
+    bytes still hash to the recorded digest. None if it changed otherwise.
+    """
+    size = stamp.get("source_size")
+    if "source_digest" not in stamp or size is None:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    with open(source, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size <= size:
+            return None
+        last = b""
+        remaining = size
+        while remaining:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                return None
+            h.update(block)
+            remaining -= len(block)
+            last = block
+        if h.hexdigest() != stamp["source_digest"] or (size and not last.endswith(b"\n")):
+            return None
+        tail = f.read(st.st_size - size)
+    if not tail.endswith(b"\n"):
+        return None  # a row still being written
+    h.update(tail)
+    return tail, {
+        "source": str(source),
+        "source_mtime_ns": st.st_mtime_ns,
+        "source_size": st.st_size,
+        "source_digest": h.hexdigest(),
+    }
+
+
+def restamp(catalog_dir: str | Path, source: str | Path) -> bool:
+    """
+    Re-stamp a catalog whose CSV was only touched or rewritten with the same
+    bytes (new mtime, same content), so it counts as fresh again without a
+    recompile. Returns False if the content changed, or the catalog predates
+    content digests.
+    """
+    catalog_dir, source = Path(catalog_dir), Path(source)
+    meta = read_stamp(catalog_dir)
+    if meta is None or meta.get("format") != FORMAT_VERSION or "source_digest" not in meta:
+        return False
+    try:
+        stamp = _source_stamp(source)
+        if stamp["source_size"] != meta.get("source_size"):
+            return False
+        if source_digest(source) != meta["source_digest"]:
+            return False
+    except OSError:
+        return False
+    set_stamp(catalog_dir, stamp)
+    return True
+
+
+def _map_bytes(path: Path) -> mmap.mmap | bytes:
+    """Read-only mmap of a file (empty files can't be mapped → b"")."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _Names(Sequence[str]):
+    """Display names, decoded on access from the mapped names.bin."""
+
+    def __init__(self, blob: mmap.mmap | bytes, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        a, b = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[a:b].decode("utf-8")
+
+
+class CompiledCatalog:
+    """
+    Read-only, memory-mapped view over a compiled catalog directory.
+
+    Nothing is parsed at open time: the vocabulary, names, int32 id arrays
+    and postings stay in the OS page cache, so every Streamlit process that
+    opens the same directory shares one copy. It can be passed straight to
+    match_recipes() in place of a DataFrame.
+    """
+
+    def __init__(self, catalog_dir: str | Path):
+        self.path = Path(catalog_dir)
+        self.meta = read_meta(self.path) or {}
+        # a delta segment's phrase / text ids start after its base's
+        self.vocab_start = self.meta.get("vocab_start", 0)
+        self.text_start = self.meta.get("text_start", 0)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+        self.vocab_blob = _map_bytes(self.path / "vocab.bin")
+        self.vocab_offsets = load("vocab_offsets")
+        self.text_blob = _map_bytes(self.path / "text.bin")
+        self.text_offsets = load("text_offsets")
+        self.text_ids = load("text_ids")
+        self.names = _Names(_map_bytes(self.path / "names.bin"), load("names_offsets"))
+        self.offsets = load("offsets")
+        self.ing_ids = load("ing_ids")
+        self.sizes = load("sizes")
+        self.post_offsets = load("post_offsets")
+        self.post_ids = load("post_ids")
+        self.by_rank = load("by_rank")
+        self.rank_post_ids = load("rank_post_ids")
+        self.keys = load("keys")
+        self.load_nutrition()
+        self._diet_flags: np.ndarray | None = None
+
+        # user terms repeat a lot ("salt", "onion") → cache their resolution
+        self.phrase_ids = lru_cache(maxsize=4096)(self._find_phrase_ids)
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    @property
+    def version(self) -> str:
+        """
+        Changes whenever the catalog is recompiled from a different CSV;
+        recompiling the same bytes keeps it (cached results stay valid).
+        A merged catalog keeps the version it had as segments.
+        """
+        m = self.meta
+        if "version" in m:
+            return m["version"]
+        if "source_digest" in m:
+            return f"{m.get('format')}-{m['source_digest']}"
+        return f"{m.get('format')}-{m.get('source_mtime_ns')}-{m.get('source_size')}"
+
+    @property
+    def diet_flags(self) -> np.ndarray:
+        """uint8 dietary bitmask per recipe (scripts.dietary), computed once."""
+        if self._diet_flags is None:
+            post_offsets, post_ids = np.asarray(self.post_offsets), self.post_ids
+            self._diet_flags = recipe_flags(
+                self.vocab(),
+                lambda pid: post_ids[post_offsets[pid]:post_offsets[pid + 1]],
+                len(self),
+            )
+        return self._diet_flags
+
+    def load_nutrition(self) -> None:
+        """
+        Pick up nutrition.npy / nutrition_score.npy (scripts/nutrition.py)
+        if they were built for this exact catalog; None otherwise.
+        """
+        self.nutrition = self.nutrition_score = self.nutrition_vocab = None
+        try:
+            info = json.loads((self.path / "nutrition.json").read_text())
+        except (OSError, ValueError):
+            return
+        if info.get("catalog") != self.version:
+            return
+        try:
+            arrays = [
+                np.load(self.path / f"{name}.npy", mmap_mode="r")
+                for name in ("nutrition", "nutrition_score", "nutrition_vocab")
+            ]
+        except OSError:
+            return
+        self.nutrition_meta = info
+        self.nutrition, self.nutrition_score, self.nutrition_vocab = arrays
+
+    # ----- vocabulary -----
+    def vocab(self) -> List[str]:
+        """All phrases, decoded once."""
+        return self.vocab_blob[:].decode("utf-8").split("\n")[:-1]
+
+    def texts(self) -> List[str]:
+        """All distinct original phrases, decoded once."""
+        return self.text_blob[:].decode("utf-8").split("\n")[:-1]
+
+    def phrase(self, pid: int) -> str:
+        """Canonical phrase 'pid'."""
+        pid -= self.vocab_start
+        a, b = int(self.vocab_offsets[pid]), int(self.vocab_offsets[pid + 1]) - 1
+        return self.vocab_blob[a:b].decode("utf-8")
+
+    def ingredient_ids(self, pos: int) -> np.ndarray:
+        """Phrase ids of the recipe at 'pos'."""
+        return self.ing_ids[int(self.offsets[pos]):int(self.offsets[pos + 1])]
+
+    def ingredients(self, pos: int) -> List[str]:
+        """Canonical ingredient names of the recipe at 'pos'."""
+        return [self.phrase(int(i)) for i in self.ingredient_ids(pos)]
+
+    def _find_phrase_ids(self, term: str) -> np.ndarray:
+        """Ids of every vocabulary phrase containing 'term' as whole words."""
+        needle = term.encode("utf-8")
+        found: List[int] = []
+        i = self.vocab_blob.find(needle)
+        while i != -1:
+            if not whole_words(self.vocab_blob, i, len(needle)):
+                i = self.vocab_blob.find(needle, i + 1)
+                continue
+            pid = int(np.searchsorted(self.vocab_offsets, i, side="right")) - 1
+            found.append(pid)
+            # one hit per phrase is enough → jump to the next phrase
+            i = self.vocab_blob.find(needle, int(self.vocab_offsets[pid + 1]))
+        return np.asarray(found, dtype=np.int64) + self.vocab_start
+
+    def _gather(self, ids: np.ndarray, term: str) -> np.ndarray:
+        """Distinct entries of 'ids' over the postings of every phrase matching 'term'."""
+        return self._postings(ids, self.phrase_ids(term))
+
+    def _postings(self, ids: np.ndarray, pids: np.ndarray) -> np.ndarray:
+        """Distinct entries of 'ids' over the postings of phrases 'pids'."""
+        if len(pids) == 0:
+            return np.zeros(0, dtype=np.int32)
+        starts = self.post_offsets[pids]
+        lengths = self.post_offsets[pids + 1] - starts
+        # gather every posting slice in one go
+        idx = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        idx += np.arange(len(idx))
+        vals = ids[idx]
+        if len(vals) * 16 < len(self):
+            return np.unique(vals)
+        # common terms hit a large share of the catalog: a mask beats sorting
+        seen = np.zeros(len(self), dtype=bool)
+        seen[vals] = True
+        return np.flatnonzero(seen)
+
+    def recipes_for(self, term: str) -> np.ndarray:
+        """Positions (ascending) of recipes with a phrase containing 'term'."""
+        return self._gather(self.post_ids, term)
+
+    # ----- matching -----
+    def match(
+        self,
+        terms: Sequence[str],
+        quota: int = 7,
+        hi_thresh: float = 0.7,
+        lo_thresh: float = 0.4,
+        nutrition_weight: float = 0.0,
+        diet: int = 0,
+    ) -> List[Dict]:
+        """Same quota logic and result dicts as match_recipes."""
+        if not terms:
+            return []
+        with span("match.scan"):
+            hits = [self.recipes_for(t) for t in terms]
+        return self._select(hits, quota, hi_thresh, lo_thresh, nutrition_weight, diet)
+
+    def _select(
+        self,
+        hits: List[np.ndarray],
+        quota: int,
+        hi_thresh: float,
+        lo_thresh: float,
+        nutrition_weight: float = 0.0,
+        diet: int = 0,
+    ) -> List[Dict]:
+        """Fill the quota from per-term arrays of (distinct) recipe positions."""
+        counts = np.bincount(np.concatenate(hits), minlength=len(self))
+        pos = np.flatnonzero(counts)
+        if len(pos) == 0:
+            return []
+        nutrition = None
+        if nutrition_weight > 0 and self.nutrition_score is not None:
+            nutrition = self.nutrition_score[pos]
+        return select_matches(
+            pos, counts[pos], self.sizes[pos], self.names, len(hits),
+            quota, hi_thresh, lo_thresh, nutrition, nutrition_weight,
+            allowed_mask(self.diet_flags, diet) if diet else None,
+        )
+
+    def match_topk(
+        self,
+        terms: Sequence[str],
+        quota: int = 7,
+        hi_thresh: float = 0.7,
+        lo_thresh: float = 0.4,
+        budget: int = 5_000,
+        nutrition_weight: float = 0.0,
+        diet: int = 0,
+    ) -> List[Dict]:
+        """
+        match() with early termination over size-ordered postings.
+
+        Recipes are visited in (recipe_size, position) order. A recipe of
+        size s matched by at most 'active' terms (terms whose postings are
+        not exhausted yet) scores at most 0.5*active/s + 0.5*active/n, and
+        that bound only falls as s grows. We stop as soon as the candidates
+        already seen fill both quota passes with scores no unseen recipe can
+        beat – for "salt"-like terms that is after a handful of postings.
+
+        Gives the same results as match(). Queries whose postings total at
+        most 'budget' entries, or that do not stop within 'budget' visited
+        postings, are answered by the vectorized match() instead. So is
+        every nutrition-weighted query: the size-order bound does not hold
+        once the nutrition score takes part in the ranking. A 'diet' filter
+        drops excluded recipes from the postings up front; the bound holds
+        for what is left.
+        """
+        if not terms:
+            return []
+        if nutrition_weight > 0 and self.nutrition_score is not None:
+            return self.match(terms, quota, hi_thresh, lo_thresh, nutrition_weight, diet)
+        n = len(terms)
+
+        # rank-ascending, de-duplicated postings per term
+        with span("match.scan"):
+            ranks = [self._gather(self.rank_post_ids, t) for t in terms]
+        by_rank = np.asarray(self.by_rank)
+        if diet:
+            ok = allowed_mask(self.diet_flags, diet)
+            ranks = [r[ok[by_rank[r]]] for r in ranks]
+
+        def full_match() -> List[Dict]:
+            return self._select([by_rank[r] for r in ranks], quota, hi_thresh, lo_thresh)
+
+        if sum(len(r) for r in ranks) <= budget:
+            return full_match()
+
+        heads: List[Tuple[int, int, Iterator[int]]] = []
+        for t, r in enumerate(ranks):
+            it = iter(r.tolist())
+            first = next(it, None)
+            if first is not None:
+                heads.append((first, t, it))
+        heapq.heapify(heads)
+
+        # plain ndarray view: memmap item access is several times slower
+        sizes = np.asarray(self.sizes)
+        found: Dict[int, int] = {}       # position -> matches
+        hi_top: List[float] = []         # min-heap: best 'quota' strong scores
+        lo_keys: Set[Tuple] = set()      # distinct filler keys seen
+        lo_top: List[float] = []         # min-heap: best 'quota' filler scores
+        n_hi = 0
+        seen = 0
+
+        while heads:
+            rank = heads[0][0]
+            pos = int(by_rank[rank])
+            size = int(sizes[pos])
+
+            active = len(heads)
+            bound = 0.5 * (active / size) + 0.5 * (active / n)
+            hi_done = active / n < hi_thresh or (
+                len(hi_top) >= quota and hi_top[0] >= bound
+            )
+            if hi_done:
+                need = quota - min(quota, n_hi)
+                if need == 0 or active / n < lo_thresh:
+                    break
+                if len(lo_top) >= need and heapq.nlargest(need, lo_top)[-1] >= bound:
+                    break
+
+            matches = 0
+            while heads and heads[0][0] == rank:
+                _, t, it = heapq.heappop(heads)
+                matches += 1
+                nxt = next(it, None)
+                if nxt is not None:
+                    heapq.heappush(heads, (nxt, t, it))
+
+            seen += matches
+            if seen > budget:
+                return full_match()
+
+            found[pos] = matches
+            pct_user = matches / n
+            score = 0.5 * (matches / size) + 0.5 * pct_user
+            if pct_user >= hi_thresh:
+                n_hi += 1
+                if len(hi_top) < quota:
+                    heapq.heappush(hi_top, score)
+                elif score > hi_top[0]:
+                    heapq.heapreplace(hi_top, score)
+            elif pct_user >= lo_thresh:
+                # equal rows of the same recipe count once as fillers
+                key = (self.names[pos], matches, size)
+                if key not in lo_keys:
+                    lo_keys.add(key)
+                    if len(lo_top) < quota:
+                        heapq.heappush(lo_top, score)
+                    elif score > lo_top[0]:
+                        heapq.heapreplace(lo_top, score)
+
+        if not found:
+            return []
+        pos = np.fromiter(sorted(found), dtype=np.int64, count=len(found))
+        matches = np.fromiter((found[p] for p in pos.tolist()), dtype=np.int64, count=len(pos))
+        return select_matches(
+            pos, matches, self.sizes[pos], self.names, n,
+            quota, hi_thresh, lo_thresh,
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Same frame as load_recipes() builds from the CSV."""
+        return self._frame(self.texts(), self.vocab())
+
+    def _frame(self, texts: List[str], vocab: List[str]) -> pd.DataFrame:
+        """to_frame() with the (global) text and phrase lists given."""
+        offs = self.offsets.tolist()
+
+        def lists(strings: List[str], ids: np.ndarray) -> List[List[str]]:
+            # the lists share the interned strings
+            ids = ids.tolist()
+            return [[strings[j] for j in ids[a:b]] for a, b in zip(offs, offs[1:])]
+
+        return pd.DataFrame({
+            "display_name": self.names[:],
+            "ingredients_norm": lists(texts, self.text_ids),
+            "ingredients_canon": lists(vocab, self.ing_ids),
+        })
@@ -0,0 +1,128 @@
+# scripts/dietary.py
+"""
+Dietary flags per recipe, as one uint8 bitmask per catalog position.
+
+A canonical ingredient "breaks" a diet if one of its words is on the
+diet's exclusion list ("chicken breast" breaks vegetarian and vegan,
+"flour" breaks gluten-free) unless a known exception covers it first
+("peanut butter", "rice flour", "coconut milk"). A recipe keeps a diet's
+bit only if none of its ingredients breaks it.
+
+The flags are computed once per backend from its distinct vocabulary and
+postings – not per recipe row – and a filtered query only masks the
+candidate positions before scoring, so the quota is still filled from
+recipes that pass the filter.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+VEGETARIAN = 1
+VEGAN = 2
+GLUTEN_FREE = 4
+DIETS: Dict[str, int] = {"vegetarian": VEGETARIAN, "vegan": VEGAN, "gluten_free": GLUTEN_FREE}
+ALL_DIETS = VEGETARIAN | VEGAN | GLUTEN_FREE
+
+_MEAT = {
+    "beef", "steak", "veal", "pork", "ham", "bacon", "pancetta", "prosciutto",
+    "sausage", "chorizo", "salami", "pepperoni", "lamb", "mutton",
+    "venison", "chicken", "turkey", "duck", "goose", "meat", "meatball",
+    "brisket", "gelatin", "lard", "suet", "fish", "salmon",
+    "tuna", "cod", "tilapia", "halibut", "trout", "haddock", "mackerel",
+    "anchovy", "anchovie", "sardine", "shrimp", "prawn", "crab", "lobster",
+    "clam", "mussel", "oyster", "scallop", "squid", "calamari", "octopus",
+    "worcestershire", "bouillon", "stock", "broth", "drippings",
+}
+_ANIMAL = {
+    "milk", "buttermilk", "butter", "ghee", "cream", "cheese", "yogurt",
+    "whey", "casein", "parmesan", "mozzarella", "cheddar", "ricotta", "feta",
+    "mascarpone", "brie", "gouda", "gruyere", "halloumi", "custard", "egg",
+    "mayonnaise", "mayo", "meringue", "honey",
+}
+_GLUTEN = {
+    "wheat", "flour", "bread", "breadcrumb", "crumb", "panko", "crouton",
+    "pasta", "spaghetti", "macaroni", "noodle", "lasagna", "penne",
+    "fettuccine", "linguine", "ravioli", "tortellini", "orzo", "couscous",
+    "barley", "rye", "malt", "semolina", "bulgur", "farro", "spelt", "seitan",
+    "tortilla", "pita", "bagel", "bun", "biscuit", "cracker", "cookie",
+    "pastry", "crust", "dough", "beer",
+}
+_GLUTEN_PHRASES = {"soy sauce", "teriyaki sauce", "hoisin sauce"}
+
+# removed from a phrase before the word check
+_EXCEPTIONS = [
+    "peanut butter", "almond butter", "cashew butter", "cocoa butter",
+    "apple butter", "sunflower butter", "nut butter", "coconut milk",
+    "almond milk", "soy milk", "oat milk", "rice milk", "coconut cream",
+    "cream of tartar", "vegetable stock", "vegetable broth", "vegetable bouillon",
+    "rice flour", "almond flour", "coconut flour", "corn flour", "cornflour",
+    "chickpea flour", "buckwheat flour", "tapioca flour", "potato flour",
+    "rice noodle", "corn tortilla", "gluten-free", "gluten free", "vegan",
+    "dairy-free", "eggplant", "egg replacer",
+]
+_EXCEPTION_RE = re.compile("|".join(re.escape(e) for e in sorted(_EXCEPTIONS, key=len, reverse=True)))
+_WORD = re.compile(r"[a-z]+")
+
+
+@lru_cache(maxsize=1 << 18)
+def broken_diets(phrase: str) -> int:
+    """Bits of the diets the canonical ingredient 'phrase' is not allowed in."""
+    gluten = any(p in phrase for p in _GLUTEN_PHRASES)
+    words = set(_WORD.findall(_EXCEPTION_RE.sub(" ", phrase)))
+    # plural words inside a phrase are not singularized by canonicalize()
+    words |= {w[:-1] for w in words if w.endswith("s")}
+
+    bits = 0
+    if words & _MEAT:
+        bits |= VEGETARIAN | VEGAN
+    if words & _ANIMAL:
+        bits |= VEGAN
+    if gluten or words & _GLUTEN:
+        bits |= GLUTEN_FREE
+    return bits
+
+
+def recipe_flags(
+    vocab: Sequence[str],
+    postings: Callable[[int], Sequence[int]],
+    n_recipes: int,
+) -> np.ndarray:
+    """
+    uint8 per recipe: bit set = the recipe fits that diet.
+
+    'postings(pid)' gives the positions of the recipes using phrase 'pid'.
+    """
+    broken = np.zeros(n_recipes, dtype=np.uint8)
+    for pid, phrase in enumerate(vocab):
+        bits = broken_diets(phrase)
+        if bits:
+            pos = np.asarray(postings(pid), dtype=np.int64)
+            broken[pos] |= np.uint8(bits)
+    return ~broken & np.uint8(ALL_DIETS)
+
+
+def diet_mask(diets: Iterable[str] | None) -> int:
+    """["vegan", "gluten-free"] -> bitmask; unknown names raise ValueError."""
+    mask = 0
+    for name in diets or ():
+        key = name.strip().lower().replace("-", "_").replace(" ", "_")
+        if key not in DIETS:
+            raise ValueError(f"unknown diet {name!r}; expected one of {sorted(DIETS)}")
+        mask |= DIETS[key]
+    return mask
+
+
+def diet_names(flags: int) -> List[str]:
+    """Bitmask -> diet names, e.g. for result tags."""
+    return [name for name, bit in DIETS.items() if flags & bit]
+
+
+def allowed_mask(flags: np.ndarray, mask: int) -> np.ndarray | None:
+    """Boolean per recipe fitting every diet in 'mask'; None if no filter."""
+    if not mask:
+        return None
+    return (flags & np.uint8(mask)) == mask
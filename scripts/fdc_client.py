@@ -0,0 +1,347 @@
+# scripts/fdc_client.py
+"""
+USDA FoodData Central lookups for ingredients the precomputed nutrition
+table (scripts/nutrition.py) does not cover.
+
+  - FDCClient       : keep-alive HTTP connection pool, de-duplicated and
+                      cached batch lookups, sync and asyncio entry points
+  - NutritionCache  : persistent SQLite cache with a TTL (misses included,
+                      so an unknown ingredient is not searched every rerun)
+  - StandInServer   : local server answering the same /v1/foods/search
+                      requests from an FDC dump, for tests and offline use
+
+    python -m scripts.fdc_client serve --fdc data/fdc/ --port 8765
+    PANTRYPAL_FDC_URL=http://127.0.0.1:8765 streamlit run app/Home.py
+
+The live USDA API is only queried with your own FDC_API_KEY set; with
+neither that nor PANTRYPAL_FDC_URL the client answers from its cache and
+never opens a connection.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from scripts.catalog import CompiledCatalog
+from scripts.http_pool import ConnectionPool, HTTPError
+from scripts.nutrition import NUTRIENTS, food_table, lookup, nutrient_vector
+
+FDC_API_URL = "https://api.nal.usda.gov/fdc"
+FDC_API_KEY = os.environ.get("FDC_API_KEY") or None
+# a stand-in server, else the live API only with a key of your own
+FDC_URL = os.environ.get("PANTRYPAL_FDC_URL") or (FDC_API_URL if FDC_API_KEY else None)
+DATA_TYPES = "Foundation,SR Legacy"
+
+
+# ----- cache -----
+class NutritionCache:
+    """
+    Canonical ingredient -> per-100 g vector, or None for "FDC has nothing".
+
+      - memory tier : plain dict in front of the file
+      - disk tier   : optional SQLite file shared by processes and restarts
+      - ttl         : seconds an entry stays valid (None = forever)
+
+    get_many / put_many touch the file once per batch, not once per name.
+    Safe to share between Streamlit session threads.
+    """
+
+    def __init__(self, path: str | Path | None = None, ttl: float | None = 30 * 24 * 3600):
+        self.ttl = ttl
+        self._mem: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS nutrition "
+                "(name TEXT PRIMARY KEY, expires REAL, vector TEXT)"
+            )
+            self._db.commit()
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, np.ndarray | None]:
+        """Cached entries among 'names'; names not in the result are unknown."""
+        now = time.time()
+        out: Dict[str, np.ndarray | None] = {}
+        with self._lock:
+            rest = []
+            for name in names:
+                entry = self._mem.get(name)
+                if entry is not None and entry[0] > now:
+                    out[name] = entry[1]
+                else:
+                    rest.append(name)
+
+            if self._db is not None and rest:
+                marks = ",".join("?" * len(rest))
+                rows = self._db.execute(
+                    f"SELECT name, expires, vector FROM nutrition WHERE name IN ({marks})", rest
+                ).fetchall()
+                for name, expires, vector in rows:
+                    if expires > now:
+                        vec = None if vector is None else np.asarray(json.loads(vector), dtype=np.float32)
+                        self._mem[name] = (expires, vec)
+                        out[name] = vec
+        return out
+
+    def put_many(self, entries: Dict[str, np.ndarray | None]) -> None:
+        expires = float("inf") if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            for name, vec in entries.items():
+                self._mem[name] = (expires, vec)
+            if self._db is not None and entries:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO nutrition VALUES (?, ?, ?)",
+                    [
+                        (name, expires, None if vec is None else json.dumps(vec.tolist()))
+                        for name, vec in entries.items()
+                    ],
+                )
+                self._db.commit()
+
+
+# ----- HTTP -----
+def _search_foods(payload: Dict) -> Dict[str, np.ndarray]:
+    """/v1/foods/search response -> {description: nutrient vector}."""
+    foods = {}
+    for food in payload.get("foods", []):
+        amounts = {
+            int(n["nutrientId"]): float(n["value"])
+            for n in food.get("foodNutrients", [])
+            if n.get("nutrientId") is not None and n.get("value") is not None
+        }
+        if food.get("description"):
+            foods[food["description"]] = nutrient_vector(amounts)
+    return foods
+
+
+class FDCClient:
+    """
+    Per-100 g nutrient vectors for canonical ingredient names.
+
+    Every batch is de-duplicated, answered from the cache where possible,
+    and the remaining names are searched concurrently over the pool. After
+    a connection failure, a 429 or a 5xx the service is left alone for its
+    Retry-After or 'backoff' seconds, so an offline or rate-limited
+    deployment does not query every miss again on every rerun.
+
+    With no 'base_url' (see FDC_URL) nothing is fetched: misses stay None.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = FDC_URL,
+        api_key: str | None = FDC_API_KEY,
+        cache: NutritionCache | None = None,
+        pool_size: int = 8,
+        timeout: float = 5.0,
+        backoff: float = 60.0,
+    ):
+        self.api_key = api_key
+        self.cache = cache or NutritionCache()
+        self.pool = ConnectionPool(base_url, pool_size, timeout) if base_url else None
+        self.backoff = backoff
+        self._down_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def _fetch(self, name: str) -> np.ndarray | None:
+        """One search; raises on transport / HTTP errors."""
+        self.requests += 1
+        params = {"query": name, "dataType": DATA_TYPES, "pageSize": 5}
+        if self.api_key:
+            params["api_key"] = self.api_key
+        payload = self.pool.get_json("/v1/foods/search", params)
+        foods = _search_foods(payload)
+        if not foods:
+            return None
+        # same join as the offline table; else FDC's best hit
+        vec = lookup(name, food_table(foods))
+        return vec if vec is not None else next(iter(foods.values()))
+
+    def _try_fetch(self, name: str) -> np.ndarray | None | Exception:
+        if time.monotonic() < self._down_until:
+            return ConnectionError("FDC marked unavailable")
+        try:
+            return self._fetch(name)
+        except (OSError, HTTPError, ValueError) as e:
+            self.errors += 1
+            if isinstance(e, HTTPError):
+                # rate-limited / failing: honor Retry-After; other statuses
+                # are about this one request
+                if e.status == 429 or e.status >= 500:
+                    wait = e.retry_after if e.retry_after is not None else self.backoff
+                    self._down_until = max(self._down_until, time.monotonic() + wait)
+            else:
+                self._down_until = time.monotonic() + self.backoff
+            return e
+
+    async def alookup_many(self, names: Iterable[str]) -> Dict[str, np.ndarray | None]:
+        """Vectors for 'names' (None = unknown or FDC unreachable)."""
+        wanted = list(dict.fromkeys(names))
+        found = self.cache.get_many(wanted)
+        misses = [n for n in wanted if n not in found]
+        if misses and self.pool is not None:
+            slots = asyncio.Semaphore(self.pool.size)
+
+            async def one(name: str):
+                async with slots:
+                    return await asyncio.to_thread(self._try_fetch, name)
+
+            fetched = dict(zip(misses, await asyncio.gather(*(one(n) for n in misses))))
+            # errors are not cached: the next batch tries again
+            fresh = {n: v for n, v in fetched.items() if not isinstance(v, Exception)}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        return {n: found.get(n) for n in wanted}
+
+    def lookup_many(self, names: Iterable[str]) -> Dict[str, np.ndarray | None]:
+        """Blocking alookup_many()."""
+        return asyncio.run(self.alookup_many(names))
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+
+
+async def recipe_profiles(
+    catalog: CompiledCatalog, positions: Sequence[int | None], client: FDCClient
+) -> List[np.ndarray | None]:
+    """
+    Mean per-100 g profile of each recipe: catalog.nutrition_vocab first,
+    one concurrent FDC batch for every ingredient it lacks across all
+    recipes. None where nothing is known.
+    """
+    table = catalog.nutrition_vocab
+    per_recipe: List[Dict[str, np.ndarray | None]] = []
+    missing: List[str] = []
+    for pos in positions:
+        known: Dict[str, np.ndarray | None] = {}
+        if pos is not None:
+            for i in catalog.ingredient_ids(pos):
+                name = catalog.phrase(int(i))
+                vec = None if table is None else np.asarray(table[int(i)])
+                if vec is None or np.isnan(vec).all():
+                    missing.append(name)
+                    vec = None
+                known[name] = vec
+        per_recipe.append(known)
+
+    fetched = await client.alookup_many(missing) if missing else {}
+    profiles: List[np.ndarray | None] = []
+    for known in per_recipe:
+        vecs = [v if v is not None else fetched.get(n) for n, v in known.items()]
+        vecs = [v for v in vecs if v is not None]
+        if not vecs:
+            profiles.append(None)
+            continue
+        stacked = np.vstack(vecs)
+        with np.errstate(invalid="ignore"):
+            profiles.append(np.nanmean(stacked, axis=0) if (~np.isnan(stacked)).any() else None)
+    return profiles
+
+
+# ----- stand-in server -----
+class StandInServer(ThreadingHTTPServer):
+    """
+    Answers GET /v1/foods/search?query=... from an in-memory FDC dump
+    (scripts.nutrition.load_fdc) in the shape of the real API.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, foods: Dict[str, np.ndarray], host: str = "127.0.0.1", port: int = 0):
+        self.foods = foods
+        self.table = food_table(foods)
+        super().__init__((host, port), _StandInHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        vec = lookup(query, self.table)
+        hits = [("", vec)] if vec is not None else []
+        q = query.lower()
+        hits += [(d, v) for d, v in self.foods.items() if q in d.lower()][:limit]
+        return [
+            {
+                "description": desc or query,
+                "foodNutrients": [
+                    {"nutrientId": ids[0], "nutrientName": col, "value": float(v[j])}
+                    for j, (col, ids) in enumerate(NUTRIENTS)
+                    if not np.isnan(v[j])
+                ],
+            }
+            for desc, v in hits[:limit]
+        ]
+
+    def start(self) -> "StandInServer":
+        """Serve from a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if not url.path.endswith("/v1/foods/search"):
+            self.send_error(404)
+            return
+        params = parse_qs(url.query)
+        query = params.get("query", [""])[0]
+        limit = int(params.get("pageSize", ["5"])[0])
+        foods = self.server.search(query, limit)
+        body = json.dumps({"totalHits": len(foods), "foods": foods}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from scripts.nutrition import load_fdc
+
+    parser = argparse.ArgumentParser(description="FoodData Central client / local stand-in")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve", help="serve /v1/foods/search from an FDC dump")
+    serve.add_argument("--fdc", required=True, help="FDC CSV directory or JSON file")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    get = sub.add_parser("lookup", help="look ingredients up through the client")
+    get.add_argument("names", nargs="+")
+    get.add_argument("--url", default=FDC_URL, help="FDC API or stand-in (default: PANTRYPAL_FDC_URL)")
+    get.add_argument("--cache", default=None, help="SQLite cache file")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        server = StandInServer(load_fdc(args.fdc), args.host, args.port)
+        print(f"FDC stand-in on {server.url}")
+        server.serve_forever()
+    else:
+        client = FDCClient(args.url, cache=NutritionCache(args.cache))
+        for name, vec in client.lookup_many(args.names).items():
+            row = "not found" if vec is None else ", ".join(
+                f"{col}={v:.1f}" for (col, _), v in zip(NUTRIENTS, vec) if not np.isnan(v)
+            )
+            print(f"{name}: {row}")
@@ -0,0 +1,99 @@
+# scripts/fuzzy.py
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Set
+
+import numpy as np
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of every word, padded: "onion" -> " on", "oni", ..., "on "."""
+    grams: Set[str] = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FuzzyResolver:
+    """
+    Resolves a user ingredient to vocabulary phrase ids, tolerating plurals
+    and typos ("tomatoes" ≈ "1 tomato", "garlc" ≈ "garlic, minced").
+
+    Terms the exact matcher resolves keep its (whole-word) hits; only a
+    term it finds nowhere falls back to every phrase containing at least
+    'threshold' of the term's word trigrams. So fuzzy mode never adds
+    "eggplant" to "egg", and only ever adds hits to the exact matcher.
+    Candidates come from a trigram -> phrase id index, so a lookup touches
+    the postings of the term's few trigrams instead of scanning the whole
+    vocabulary.
+
+    The index is built on first use and every term's resolution is cached,
+    so after warm-up fuzzy queries cost the same as exact ones.
+
+    Plug it in with use_fuzzy(); it stands in for the backend's phrase_ids.
+    """
+
+    def __init__(
+        self,
+        vocab: Sequence[str],
+        exact: Callable[[str], Sequence[int]],
+        threshold: float = 0.6,
+        maxsize: int = 4096,
+    ):
+        self.vocab = vocab
+        self.exact = exact
+        self.threshold = threshold
+        self._postings: Dict[str, np.ndarray] | None = None
+        self._resolve_cached = lru_cache(maxsize=maxsize)(self._resolve)
+
+    @property
+    def tag(self) -> str:
+        """Part of result-cache keys: fuzzy and exact results differ."""
+        return f"fuzzy{self.threshold}"
+
+    def _index(self) -> Dict[str, np.ndarray]:
+        if self._postings is None:
+            postings: Dict[str, List[int]] = {}
+            for pid, phrase in enumerate(self.vocab):
+                for g in trigrams(phrase):
+                    postings.setdefault(g, []).append(pid)
+            self._postings = {g: np.asarray(p, dtype=np.int64) for g, p in postings.items()}
+        return self._postings
+
+    def similar(self, term: str) -> np.ndarray:
+        """Phrase ids (ascending) sharing >= threshold of the term's trigrams."""
+        grams = trigrams(term)
+        postings = self._index()
+        lists = [postings[g] for g in grams if g in postings]
+        if not lists:
+            return np.zeros(0, dtype=np.int64)
+        pids, shared = np.unique(np.concatenate(lists), return_counts=True)
+        return pids[shared >= self.threshold * len(grams)]
+
+    def _resolve(self, term: str) -> np.ndarray:
+        exact = np.asarray(self.exact(term), dtype=np.int64)
+        if len(exact):
+            return np.unique(exact)
+        return self.similar(term)
+
+    def __call__(self, term: str) -> np.ndarray:
+        return self._resolve_cached(term)
+
+
+def use_fuzzy(index, threshold: float = 0.6, vocab: Sequence[str] | None = None):
+    """
+    Switch an IngredientIndex or CompiledCatalog (or a RecipeMatrix, given
+    its 'vocab') to fuzzy term resolution. Returns the same object.
+
+    Build a RecipeMatrix *after* this call on its index and it inherits the
+    resolver: RecipeMatrix.from_index(use_fuzzy(build_index(df))).
+    """
+    exact = index.phrase_ids
+    if isinstance(exact, FuzzyResolver):
+        exact = exact.exact
+    if vocab is None:
+        vocab = index.vocab() if callable(index.vocab) else index.vocab
+    index.phrase_ids = FuzzyResolver(vocab, exact, threshold)
+    return index
@@ -0,0 +1,128 @@
+# scripts/http_pool.py
+from __future__ import annotations
+
+import http.client
+import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator
+from urllib.parse import urlencode, urlsplit
+
+
+class HTTPError(RuntimeError):
+    """
+    The server answered with a non-200 status. 'retry_after' is the
+    Retry-After header in seconds, if it sent one.
+    """
+
+    def __init__(self, status: int, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _retry_after(value: str | None) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds or an HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class ConnectionPool:
+    """
+    At most 'size' keep-alive HTTP(S) connections to one host, reused LIFO.
+
+    Thread-safe; callers beyond 'size' wait for a free connection instead
+    of opening more sockets.
+    """
+
+    def __init__(self, base_url: str, size: int = 8, timeout: float = 5.0):
+        url = urlsplit(base_url)
+        self.https = url.scheme == "https"
+        self.host = url.hostname
+        self.port = url.port
+        self.prefix = url.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    @contextmanager
+    def connection(self) -> Iterator[http.client.HTTPConnection]:
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            self._idle.put(conn)
+
+    def request_json(
+        self,
+        method: str,
+        path: str,
+        params: Dict | None = None,
+        body: Dict | None = None,
+    ) -> Dict:
+        """One JSON request; raises HTTPError on a non-200 answer."""
+        url = f"{self.prefix}{path}" + (f"?{urlencode(params)}" if params else "")
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        # an idle keep-alive connection may have been closed by the server:
+        # retry once on a fresh one
+        for attempt in (0, 1):
+            with self.connection() as conn:
+                try:
+                    conn.request(method, url, body=payload, headers=headers)
+                    resp = conn.getresponse()
+                    data = resp.read()
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    conn.close()
+                    if attempt:
+                        raise
+                    continue
+            if resp.status != 200:
+                try:
+                    detail = json.loads(data).get("error", "")
+                except (ValueError, AttributeError):
+                    detail = ""
+                raise HTTPError(
+                    resp.status,
+                    f"{method} {path}: HTTP {resp.status} {detail}".rstrip(),
+                    _retry_after(resp.getheader("Retry-After")),
+                )
+            return json.loads(data)
+        raise AssertionError("unreachable")
+
+    def get_json(self, path: str, params: Dict | None = None) -> Dict:
+        return self.request_json("GET", path, params)
+
+    def post_json(self, path: str, body: Dict) -> Dict:
+        return self.request_json("POST", path, body=body)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
@@ -0,0 +1,164 @@
+# scripts/live_catalog.py
+"""
+A compiled catalog that follows its CSV without a restart.
+
+    live = LiveCatalog("data/raw/recipes.csv", fuzzy=0.6).start()
+    catalog = live.current          # take one snapshot per request
+    match_recipes(ings, catalog, cache=cache)
+
+A daemon thread polls the CSV (and the catalog's own stamp files, so
+ingest_recipes() and merges show up too) every PANTRYPAL_RELOAD_INTERVAL
+seconds (30; 0 turns polling off). When something moved it runs
+refresh_catalog(): same bytes → the catalog is only re-stamped; appended
+rows → a delta segment; other edits → a full recompile. A changed catalog
+is opened and warmed up (fuzzy resolver, diet flags, nutrition) on that thread, then swapped in with a single reference
+assignment.
+
+Readers never wait for a rebuild and never see a half-built catalog: a
+request that took the old snapshot finishes on it (its files stay mapped
+after the directory is replaced), the next one gets the new one. The
+catalog version is part of every ResultCache key, so results cached for
+the old CSV are simply never looked up again.
+
+App processes sharing one catalog directory rebuild it once (see
+catalog_lock); the others wait and then open the result.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from scripts.catalog import MANIFEST, CompiledCatalog, catalog_dir_for, catalog_lock, read_stamp
+from scripts.metrics import span
+from scripts.recipe_search import load_catalog, refresh_catalog
+
+RELOAD_INTERVAL = float(os.environ.get("PANTRYPAL_RELOAD_INTERVAL", 30))
+
+
+def _identity(stamp: Dict) -> Tuple:
+    """What a catalog's stamp says about its recipes (not about file times)."""
+    return stamp.get("source_digest"), stamp.get("generation"), stamp.get("version")
+
+
+class LiveCatalog:
+    """
+    The current CompiledCatalog for a CSV, rebuilt in the background when
+    the CSV changes. See the module docstring.
+
+    'on_swap' callbacks get (old, new) after every swap, on the watcher
+    thread.
+    """
+
+    def __init__(
+        self,
+        csv_path: str | Path,
+        fuzzy: float | None = None,
+        interval: float = RELOAD_INTERVAL,
+    ):
+        self.fuzzy = fuzzy
+        self.interval = interval
+        self.on_swap: List[Callable[[CompiledCatalog, CompiledCatalog], None]] = []
+        self.last_error: BaseException | None = None
+        self.reloads = 0
+
+        self._current = self._warm(load_catalog(csv_path, fuzzy))
+        self.source = Path(self._current.meta["source"])
+        self.catalog_dir = catalog_dir_for(self.source)
+        self._seen = self._observe()  # what the last check settled on
+        self._check_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def current(self) -> CompiledCatalog:
+        """The latest complete catalog. Never blocks."""
+        return self._current
+
+    @property
+    def version(self) -> str:
+        return self._current.version
+
+    def _observe(self) -> Tuple:
+        """mtime / size of the CSV and the catalog's stamp files."""
+        seen = []
+        for path in (self.source, self.catalog_dir / "meta.json", self.catalog_dir / MANIFEST):
+            try:
+                st = path.stat()
+                seen += [st.st_mtime_ns, st.st_size]
+            except OSError:
+                seen += [None, None]
+        return tuple(seen)
+
+    def _changed(self) -> bool:
+        """Cheap test: has anything moved since the last check?"""
+        if not self.source.exists():
+            return False  # mid-replace or gone: keep serving what we have
+        return self._observe() != self._seen
+
+    def _warm(self, catalog: CompiledCatalog, previous: CompiledCatalog | None = None) -> CompiledCatalog:
+        """Do the lazy first-use work now, so no request pays for it."""
+        catalog.diet_flags
+        if previous is not None and previous.nutrition is not None and catalog.nutrition is None:
+            # same FDC source as before, recomputed for the new recipes
+            fdc = Path(previous.nutrition_meta["source"])
+            if fdc.exists():
+                from scripts.nutrition import build_nutrition
+
+                with catalog_lock(self.catalog_dir):
+                    catalog.load_nutrition()  # another process may have built it
+                    if catalog.nutrition is None:
+                        build_nutrition(catalog, fdc)
+        return catalog
+
+    def check(self) -> bool:
+        """
+        Poll once, refreshing the catalog and swapping in the new one if its
+        recipes changed.
+        Returns True if a new catalog was swapped in.
+        """
+        if not self._changed():
+            return False
+        with self._check_lock, span("catalog.reload") as s:
+            if not self._changed():
+                return False
+            old = self._current
+            refresh_catalog(self.source)
+            seen = self._observe()
+            stamp = read_stamp(self.catalog_dir) or {}
+            if stamp.get("source_digest") is not None and _identity(stamp) == _identity(old.meta):
+                # touched / rewritten with the same bytes: nothing to swap
+                self._seen = seen
+                s["rebuilt"] = 0
+                return False
+            new = self._warm(load_catalog(self.source, self.fuzzy), old)
+            self._current = new
+            self._seen = seen
+            self.reloads += 1
+            s["rebuilt"] = 1
+            s["recipes"] = len(new)
+        for callback in self.on_swap:
+            callback(old, new)
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+                self.last_error = None
+            except Exception as e:  # bad CSV etc.: keep the old catalog, retry next poll
+                self.last_error = e
+
+    def start(self) -> LiveCatalog:
+        """Start the watcher thread (once; no-op with interval <= 0)."""
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="catalog-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,123 @@
+# scripts/match_client.py
+"""
+Thin client for scripts/match_service.py, plus a load generator.
+
+    python -m scripts.match_client bench --url http://127.0.0.1:8600 \\
+        --requests 5000 --concurrency 32
+
+Only the standard library is imported at module level, so a UI process
+using MatchClient never loads pandas, scipy or the catalog.
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Dict, List, Sequence
+
+from scripts.http_pool import ConnectionPool
+
+MATCH_URL = os.environ.get("PANTRYPAL_MATCH_URL")
+
+
+class MatchClient:
+    """match_recipes() over HTTP, on a pool of keep-alive connections."""
+
+    def __init__(self, base_url: str, pool_size: int = 8, timeout: float = 10.0):
+        self.base_url = base_url
+        self.pool = ConnectionPool(base_url, pool_size, timeout)
+
+    def health(self) -> Dict:
+        return self.pool.get_json("/health")
+
+    def match(self, ingredients: Sequence[str], **options) -> List[Dict]:
+        """
+        Same arguments and result dicts as match_recipes (quota, hi_thresh,
+        lo_thresh, topk, nutrition_weight, diets); details=True adds
+        'diets' and 'nutrition' to every result.
+        """
+        body = {"ingredients": list(ingredients), **options}
+        return self.pool.post_json("/match", body)["results"]
+
+    def match_batch(self, pantries: Sequence[Sequence[str]], **options) -> List[List[Dict]]:
+        body = {"pantries": [list(p) for p in pantries], **options}
+        return self.pool.post_json("/match/batch", body)["results"]
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+# ----- load generator -----
+def bench(url: str, n_requests: int, concurrency: int, seed: int = 1, batch: int = 0) -> Dict:
+    """
+    Fire benchmark.make_workload() pantries at the service from
+    'concurrency' threads; 'batch' > 0 sends /match/batch of that size.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+
+    from scripts.benchmark import make_workload
+
+    client = MatchClient(url, pool_size=concurrency)
+    workload = make_workload(n_requests * max(batch, 1), seed)
+    calls = (
+        [lambda q=q: client.match(q) for q in workload]
+        if not batch
+        else [
+            lambda c=workload[i:i + batch]: client.match_batch(c)
+            for i in range(0, len(workload), batch)
+        ]
+    )
+    calls[0]()  # warm up
+
+    def timed(call) -> float | None:
+        t = time.perf_counter()
+        try:
+            call()
+        except Exception:
+            return None
+        return time.perf_counter() - t
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        times = list(pool.map(timed, calls))
+    wall = time.perf_counter() - t0
+    client.close()
+
+    ok = np.asarray([t for t in times if t is not None]) * 1000
+    return {
+        "url": url,
+        "requests": len(calls),
+        "pantries_per_request": max(batch, 1),
+        "concurrency": concurrency,
+        "errors": sum(t is None for t in times),
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(len(calls) / wall, 1),
+        "p50_ms": round(float(np.percentile(ok, 50)), 3) if len(ok) else None,
+        "p95_ms": round(float(np.percentile(ok, 95)), 3) if len(ok) else None,
+        "p99_ms": round(float(np.percentile(ok, 99)), 3) if len(ok) else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Match service client / load generator")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("bench", help="load-test a running service")
+    b.add_argument("--url", default=MATCH_URL or "http://127.0.0.1:8600")
+    b.add_argument("--requests", type=int, default=2_000)
+    b.add_argument("--concurrency", type=int, default=16)
+    b.add_argument("--batch", type=int, default=0, help="pantries per /match/batch request")
+    b.add_argument("--seed", type=int, default=1)
+    m = sub.add_parser("match", help="one query")
+    m.add_argument("ingredients", nargs="+")
+    m.add_argument("--url", default=MATCH_URL or "http://127.0.0.1:8600")
+    args = parser.parse_args()
+
+    if args.cmd == "bench":
+        print(json.dumps(bench(args.url, args.requests, args.concurrency, args.seed, args.batch), indent=2))
+    else:
+        for rec in MatchClient(args.url).match(args.ingredients):
+            print(f"{rec['score']:.2f}  {rec['name']}  ({rec['matches']}/{rec['recipe_size']})")
@@ -0,0 +1,286 @@
+# scripts/match_service.py
+"""
+Recipe matching as a standalone HTTP/JSON service (ASGI).
+
+    python -m scripts.match_service --workers 4 --port 8600
+    PANTRYPAL_MATCH_URL=http://127.0.0.1:8600 streamlit run app/Home.py
+
+Every worker process opens the same memory-mapped catalog, so N workers
+share one page-cached copy; results are cached per worker in memory and
+across workers in one SQLite file. Matching runs on a thread pool so the
+event loop keeps accepting keep-alive requests while numpy works. A changed
+CSV is picked up without a restart (scripts/live_catalog.py); each request
+is answered from one catalog snapshot, whose version it reports.
+
+  GET  /health        catalog version, size, nutrition availability, reloads
+  POST /match         {"ingredients": [...], "quota": 7, "hi_thresh": 0.7,
+                       "lo_thresh": 0.4, "topk": false, "nutrition_weight": 0,
+                       "diets": [], "details": false}
+                      -> {"results": [...], "version": ...}
+                      details=true adds "diets" and "nutrition" per result
+  POST /match/batch   {"pantries": [[...], ...], "quota", "hi_thresh", "lo_thresh"}
+                      -> {"results": [[...], ...]}
+  GET  /metrics       Prometheus text (scripts.metrics)
+
+Any ASGI server works (uvicorn scripts.match_service:app); main() runs
+uvicorn with the catalog compiled once before the workers start.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+from scripts.catalog import CompiledCatalog
+from scripts.dietary import diet_names
+from scripts.fdc_client import FDCClient, NutritionCache, recipe_profiles
+from scripts.live_catalog import LiveCatalog
+from scripts.metrics import REGISTRY, span
+from scripts.nutrition import NUTRIENT_NAMES
+from scripts.recipe_search import load_catalog, match_recipes, match_recipes_batch
+from scripts.result_cache import ResultCache
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CSV_PATH = os.environ.get("PANTRYPAL_CSV", "data/raw/recipes.csv")
+FUZZY = os.environ.get("PANTRYPAL_FUZZY", "0.6")
+MAX_BODY = 1 << 20       # bytes per request
+MAX_PANTRIES = 1_000     # per /match/batch request
+
+
+class BadRequest(ValueError):
+    """Malformed request body; answered with HTTP 400."""
+
+
+async def add_details(catalog: CompiledCatalog, results: List[Dict], fdc: FDCClient) -> List[Dict]:
+    """
+    Copies of 'results' with 'diets' (names) and 'nutrition' (per-100 g
+    nutrients, or None). All recipes' nutrition is fetched in one batch.
+    """
+    positions = [r["position"] for r in results]
+    with span("nutrition_lookup", recipes=len(results)):
+        profiles = await recipe_profiles(catalog, positions, fdc)
+
+    out = []
+    for rec, pos, profile in zip(results, positions, profiles):
+        rec = dict(rec)
+        rec["diets"] = diet_names(int(catalog.diet_flags[pos])) if pos is not None else []
+        rec["nutrition"] = None if profile is None else {
+            name: float(v) for name, v in zip(NUTRIENT_NAMES, profile) if v == v  # skip NaN
+        }
+        out.append(rec)
+    return out
+
+
+def _options(body: Dict) -> Dict:
+    """Validated match_recipes keyword arguments from a request body."""
+    try:
+        opts = {
+            "quota": int(body.get("quota", 7)),
+            "hi_thresh": float(body.get("hi_thresh", 0.7)),
+            "lo_thresh": float(body.get("lo_thresh", 0.4)),
+        }
+    except (TypeError, ValueError) as e:
+        raise BadRequest(f"bad quota / threshold: {e}")
+    if not 1 <= opts["quota"] <= 100:
+        raise BadRequest("quota must be between 1 and 100")
+    return opts
+
+
+def _weight(body: Dict) -> float:
+    """'nutrition_weight': a number from 0 to 1 (null, strings, NaN are rejected)."""
+    value = body.get("nutrition_weight", 0.0)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+        raise BadRequest("'nutrition_weight' must be a number between 0 and 1")
+    return float(value)
+
+
+def _string_list(value, field: str) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(x, str) for x in value):
+        raise BadRequest(f"'{field}' must be a list of strings")
+    return value
+
+
+class MatchService:
+    """The catalog, caches and nutrition client of one worker process."""
+
+    def __init__(self, csv_path: str | Path = CSV_PATH, fuzzy: float | None = None):
+        self.live = LiveCatalog(csv_path, fuzzy=fuzzy).start()
+        cache_dir = BASE_DIR / "data" / "cache"
+        self.cache = ResultCache(maxsize=4096, ttl=24 * 3600, path=cache_dir / "results.sqlite")
+        self.fdc = FDCClient(cache=NutritionCache(cache_dir / "nutrition.sqlite"))
+
+    @property
+    def catalog(self) -> CompiledCatalog:
+        """The current catalog snapshot; take it once per request."""
+        return self.live.current
+
+    def health(self) -> Dict:
+        catalog = self.catalog
+        return {
+            "status": "ok",
+            "version": catalog.version,
+            "recipes": len(catalog),
+            "nutrition": catalog.nutrition_score is not None,
+            "reloads": self.live.reloads,
+            "reload_error": repr(self.live.last_error) if self.live.last_error else None,
+            "pid": os.getpid(),
+        }
+
+    def match(self, body: Dict, catalog: CompiledCatalog) -> List[Dict]:
+        opts = _options(body)
+        ingredients = _string_list(body.get("ingredients"), "ingredients")
+        diets = _string_list(body.get("diets") or [], "diets")
+        weight = _weight(body)
+        try:
+            return match_recipes(
+                ingredients, catalog, cache=self.cache,
+                topk=bool(body.get("topk", False)),
+                nutrition_weight=weight,
+                diets=diets, **opts,
+            )
+        except ValueError as e:  # unknown diet
+            raise BadRequest(str(e))
+
+    def match_batch(self, body: Dict, catalog: CompiledCatalog) -> List[List[Dict]]:
+        opts = _options(body)
+        pantries = body.get("pantries")
+        if not isinstance(pantries, list) or len(pantries) > MAX_PANTRIES:
+            raise BadRequest(f"'pantries' must be a list of at most {MAX_PANTRIES} lists")
+        pantries = [_string_list(p, "pantries") for p in pantries]
+        return match_recipes_batch(pantries, catalog, **opts)
+
+
+# ----- ASGI -----
+_service: MatchService | None = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> MatchService:
+    """This worker's MatchService, opened on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = MatchService(CSV_PATH, float(FUZZY) if FUZZY else None)
+        return _service
+
+
+async def _read_body(receive) -> bytes:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise BadRequest("request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send(send, status: int, payload, content_type: str = "application/json") -> None:
+    if isinstance(payload, str):
+        body = payload.encode("utf-8")
+    else:
+        body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, get_service)
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _service is not None:
+                _service.live.stop()
+                _service.fdc.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    """ASGI entry point."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"].rstrip("/") or "/"
+    loop = asyncio.get_running_loop()
+    try:
+        if path == "/health" and method == "GET":
+            service = await loop.run_in_executor(None, get_service)
+            await _send(send, 200, service.health())
+        elif path == "/metrics" and method == "GET":
+            await _send(send, 200, REGISTRY.render(), "text/plain; version=0.0.4")
+        elif path in ("/match", "/match/batch"):
+            if method != "POST":
+                await _send(send, 405, {"error": "use POST"})
+                return
+            try:
+                body = json.loads(await _read_body(receive) or b"{}")
+            except ValueError:
+                raise BadRequest("body is not valid JSON")
+            if not isinstance(body, dict):
+                raise BadRequest("body must be a JSON object")
+
+            service = await loop.run_in_executor(None, get_service)
+            catalog = service.catalog
+            if path == "/match":
+                results = await loop.run_in_executor(None, service.match, body, catalog)
+                if body.get("details"):
+                    results = await add_details(catalog, results, service.fdc)
+            else:
+                results = await loop.run_in_executor(None, service.match_batch, body, catalog)
+            await _send(send, 200, {"results": results, "version": catalog.version})
+        else:
+            await _send(send, 404, {"error": f"no route {method} {path}"})
+    except BadRequest as e:
+        await _send(send, 400, {"error": str(e)})
+
+
+def main(argv=None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PantryPal matching service")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--fuzzy", default=FUZZY, help="trigram threshold, '' to disable")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    # compile (if stale) once here, so workers only ever open the catalog
+    load_catalog(args.csv)
+    os.environ["PANTRYPAL_CSV"] = str(args.csv)
+    os.environ["PANTRYPAL_FUZZY"] = str(args.fuzzy)
+    uvicorn.run(
+        "scripts.match_service:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
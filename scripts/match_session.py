@@ -0,0 +1,97 @@
+# scripts/match_session.py
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Sequence, Set
+
+import numpy as np
+
+from scripts.dietary import allowed_mask
+from scripts.metrics import span
+from scripts.recipe_matrix import select_matches
+
+
+class MatchSession:
+    """
+    Incremental matcher for one user's pantry.
+
+    Keeps, for the current ingredient set, the recipes hit by at least one
+    ingredient and their match counts. Adding or removing one ingredient
+    applies a +1 / -1 delta to the recipes in that ingredient's posting
+    list only; the quota is then re-derived from those candidates. Only
+    the running counts are kept per session: a removed ingredient's
+    postings are looked up again (its phrase ids are cached by the
+    catalog, the postings are memory-mapped).
+
+    Works on anything with recipes_for(term), sizes and names – a
+    CompiledCatalog or an IngredientIndex. Pass it to
+    match_recipes(..., index=session) and it syncs itself to the query.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._sizes = np.asarray(catalog.sizes)  # a view for mmap'd catalogs
+        self.terms: Set[str] = set()
+        # recipes with >= 1 match (ascending) and their match counts
+        self._pos = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def _recipes(self, term: str) -> np.ndarray:
+        hits = self.catalog.recipes_for(term)
+        if isinstance(hits, np.ndarray):
+            return hits.astype(np.int64)
+        return np.fromiter(sorted(hits), dtype=np.int64, count=len(hits))
+
+    def add(self, term: str) -> None:
+        """Count one more (normalized) ingredient."""
+        if term in self.terms:
+            return
+        hits = self._recipes(term)
+        self.terms.add(term)
+
+        pos = np.union1d(self._pos, hits)
+        counts = np.zeros(len(pos), dtype=np.int64)
+        counts[np.searchsorted(pos, self._pos)] = self._counts
+        counts[np.searchsorted(pos, hits)] += 1
+        self._pos, self._counts = pos, counts
+
+    def remove(self, term: str) -> None:
+        """Drop one (normalized) ingredient."""
+        if term not in self.terms:
+            return
+        hits = self._recipes(term)
+        self.terms.discard(term)
+
+        self._counts[np.searchsorted(self._pos, hits)] -= 1
+        keep = self._counts > 0
+        self._pos, self._counts = self._pos[keep], self._counts[keep]
+
+    def sync(self, terms: Iterable[str]) -> None:
+        """Apply only the difference between the current and new term set."""
+        wanted = set(terms)
+        for term in self.terms - wanted:
+            self.remove(term)
+        for term in wanted - self.terms:
+            self.add(term)
+
+    def match(
+        self,
+        terms: Sequence[str],
+        quota: int = 7,
+        hi_thresh: float = 0.7,
+        lo_thresh: float = 0.4,
+        nutrition_weight: float = 0.0,
+        diet: int = 0,
+    ) -> List[Dict]:
+        """Same quota logic and result dicts as match_recipes."""
+        with span("match.scan"):
+            self.sync(terms)
+        if not self.terms or len(self._pos) == 0:
+            return []
+        scores = getattr(self.catalog, "nutrition_score", None)  # IngredientIndex has none
+        nutrition = scores[self._pos] if nutrition_weight > 0 and scores is not None else None
+        return select_matches(
+            self._pos, self._counts, self._sizes[self._pos],
+            self.catalog.names, len(self.terms),
+            quota, hi_thresh, lo_thresh, nutrition, nutrition_weight,
+            allowed_mask(self.catalog.diet_flags, diet) if diet else None,
+        )
@@ -0,0 +1,267 @@
+# scripts/metrics.py
+"""
+Lightweight timing spans, metric export and an opt-in request profiler.
+
+    with span("match_recipes", terms=3) as s:
+        ...
+        s["candidates"] = 812          # numeric fields are aggregated too
+
+Every span lands in the process-wide REGISTRY (count, sum and a latency
+histogram per span name, count and sum per numeric field). Export is
+chosen by environment, so production needs no code change:
+
+  - PANTRYPAL_METRICS_PORT=9464        Prometheus text on :9464/metrics
+  - PANTRYPAL_METRICS_LOG=spans.jsonl  one JSON line per finished span
+  - PANTRYPAL_PROFILE=cprofile         profile requests (or "pyinstrument")
+  - PANTRYPAL_PROFILE_SAMPLE=0.05      ... only this share of them
+  - PANTRYPAL_PROFILE_DIR=...          where the dumps go (data/profiles)
+  - PANTRYPAL_PROFILE_ON_DEMAND=1      let callers force a profile (?profile=1)
+
+Spans nest: a span opened inside another is logged with its parent's
+name, e.g. match_recipes > match.scan.
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+METRICS_PORT = os.environ.get("PANTRYPAL_METRICS_PORT")
+METRICS_LOG = os.environ.get("PANTRYPAL_METRICS_LOG")
+PROFILE = os.environ.get("PANTRYPAL_PROFILE", "").lower()
+PROFILE_SAMPLE = float(os.environ.get("PANTRYPAL_PROFILE_SAMPLE", 1.0))
+# off by default: anyone who can reach the app could otherwise make it
+# profile itself and write dumps
+PROFILE_ON_DEMAND = os.environ.get("PANTRYPAL_PROFILE_ON_DEMAND", "") == "1"
+PROFILE_DIR = Path(
+    os.environ.get("PANTRYPAL_PROFILE_DIR", Path(__file__).resolve().parents[1] / "data" / "profiles")
+)
+
+# seconds; Prometheus-style cumulative buckets (+Inf implied)
+BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current: contextvars.ContextVar[str | None] = contextvars.ContextVar("pantrypal_span", default=None)
+
+
+class Registry:
+    """Per-span latency histograms and numeric field totals. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[str, List] = {}              # name -> [count, sum, per-bucket counts]
+        self._fields: Dict[Tuple[str, str], List] = {}  # (name, field) -> [count, sum]
+
+    def record(self, name: str, seconds: float, fields: Dict) -> None:
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                entry = self._spans[name] = [0, 0.0, [0] * (len(BUCKETS) + 1)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2][bisect_left(BUCKETS, seconds)] += 1
+            for key, value in fields.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    acc = self._fields.setdefault((name, key), [0, 0.0])
+                    acc[0] += 1
+                    acc[1] += value
+
+    def snapshot(self) -> Dict:
+        """{span: {count, total_s, mean_ms, fields: {field: mean}}}"""
+        with self._lock:
+            out = {
+                name: {"count": c, "total_s": s, "mean_ms": 1000 * s / c if c else 0.0, "fields": {}}
+                for name, (c, s, _) in self._spans.items()
+            }
+            for (name, key), (c, s) in self._fields.items():
+                out[name]["fields"][key] = s / c if c else 0.0
+        return out
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP pantrypal_span_seconds Time spent in instrumented spans.",
+            "# TYPE pantrypal_span_seconds histogram",
+        ]
+        with self._lock:
+            for name, (count, total, buckets) in sorted(self._spans.items()):
+                running = 0
+                for le, n in zip(BUCKETS, buckets):
+                    running += n
+                    lines.append(f'pantrypal_span_seconds_bucket{{span="{name}",le="{le}"}} {running}')
+                lines.append(f'pantrypal_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+                lines.append(f'pantrypal_span_seconds_sum{{span="{name}"}} {total}')
+                lines.append(f'pantrypal_span_seconds_count{{span="{name}"}} {count}')
+            lines += [
+                "# HELP pantrypal_span_field Numeric fields recorded on spans (e.g. candidates).",
+                "# TYPE pantrypal_span_field summary",
+            ]
+            for (name, key), (count, total) in sorted(self._fields.items()):
+                labels = f'span="{name}",field="{key}"'
+                lines.append(f"pantrypal_span_field_sum{{{labels}}} {total}")
+                lines.append(f"pantrypal_span_field_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._fields.clear()
+
+
+REGISTRY = Registry()
+_log_lock = threading.Lock()
+
+
+def _log(entry: Dict) -> None:
+    line = json.dumps(entry, default=str)
+    with _log_lock, open(METRICS_LOG, "a") as f:
+        f.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, **fields) -> Iterator[Dict]:
+    """Time the block; the yielded dict collects extra fields."""
+    parent = _current.get()
+    token = _current.set(name)
+    t0 = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        seconds = time.perf_counter() - t0
+        _current.reset(token)
+        REGISTRY.record(name, seconds, fields)
+        if METRICS_LOG:
+            _log({"ts": time.time(), "span": name, "parent": parent, "ms": seconds * 1000, **fields})
+
+
+def timed(name: str):
+    """Decorator form of span() for whole functions."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+# ----- export -----
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+_exporter: ThreadingHTTPServer | None = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(port: int | str | None = METRICS_PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer | None:
+    """
+    Serve /metrics from a daemon thread (once per process). No-op without a
+    port, or when another app process already holds it.
+    """
+    global _exporter
+    if port is None or port == "":
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            try:
+                _exporter = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError:
+                return None
+            _exporter.daemon_threads = True
+            threading.Thread(target=_exporter.serve_forever, daemon=True).start()
+        return _exporter
+
+
+# ----- profiling -----
+class RequestProfiler:
+    """cProfile or pyinstrument around one request; stop() writes the dump."""
+
+    def __init__(self, name: str, kind: str = "cprofile"):
+        self.name = name
+        self.kind = kind
+        self._prof = None
+
+    def start(self) -> RequestProfiler:
+        if self.kind == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self._prof = Profiler()
+            self._prof.start()
+        else:
+            import cProfile
+
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        return self
+
+    def stop(self) -> Path | None:
+        """Write data/profiles/<name>-<time>-<pid>.prof (.html for pyinstrument)."""
+        if self._prof is None:
+            return None
+        prof, self._prof = self._prof, None
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stem = PROFILE_DIR / f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        if self.kind == "pyinstrument":
+            prof.stop()
+            path = stem.with_suffix(".html")
+            path.write_text(prof.output_html())
+        else:
+            prof.disable()
+            path = stem.with_suffix(".prof")
+            prof.dump_stats(str(path))  # snakeviz / pstats
+        return path
+
+
+def profile_request(name: str, force: bool = False) -> RequestProfiler | None:
+    """
+    A started profiler if profiling is on for this request, else None.
+
+    On when PANTRYPAL_PROFILE is set (for a PANTRYPAL_PROFILE_SAMPLE share
+    of requests), or when 'force' is true (e.g. from a ?profile=1 URL) and
+    PANTRYPAL_PROFILE_ON_DEMAND=1 allows that. Stop it in a finally block,
+    or use profile_page().
+    """
+    force = force and PROFILE_ON_DEMAND
+    if not force and (not PROFILE or random.random() >= PROFILE_SAMPLE):
+        return None
+    kind = "pyinstrument" if PROFILE == "pyinstrument" else "cprofile"
+    try:
+        return RequestProfiler(name, kind).start()
+    except (ImportError, ValueError):
+        # pyinstrument missing, or another profiler already active here
+        return None
+
+
+@contextmanager
+def profile_page(name: str, force: bool = False) -> Iterator[RequestProfiler | None]:
+    """profile_request() around a block, stopped even if it raises (st.stop(), a rerun)."""
+    profiler = profile_request(name, force)
+    try:
+        yield profiler
+    finally:
+        if profiler is not None:
+            profiler.stop()
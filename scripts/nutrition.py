@@ -0,0 +1,260 @@
+# scripts/nutrition.py
+"""
+Offline nutrition table for a compiled catalog.
+
+    python -m scripts.nutrition data/raw/recipes.csv --fdc data/fdc/
+
+Joins every canonical ingredient of the catalog against a local USDA
+FoodData Central dump (no network): either the CSV download (a directory
+with food.csv, food_nutrient.csv) or a JSON download (Foundation / SR
+Legacy foods). Per recipe it stores, next to the catalog:
+
+  - nutrition.npy        : (n_recipes, len(NUTRIENTS)) mean per-100 g profile
+                           of the ingredients found in FDC (NaN if none)
+  - nutrition_score.npy  : 0..1 health score (catalog percentile)
+  - nutrition_vocab.npy  : (n_vocab, len(NUTRIENTS)) per canonical ingredient
+                           (NaN rows were not found, see scripts/fdc_client.py)
+  - nutrition.json       : nutrient names, coverage, source, catalog version,
+                           and a build id (digest of the scores) that goes
+                           into result-cache keys of weighted queries
+
+match_recipes(..., nutrition_weight=w) then blends the score into the
+ranking as one array operation over the candidates.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.canonical import canonicalize
+from scripts.catalog import CompiledCatalog, catalog_lock, write_json
+
+# (column, FDC nutrient ids in order of preference)
+NUTRIENTS: List[Tuple[str, Tuple[int, ...]]] = [
+    ("energy_kcal", (1008, 2047, 2048)),
+    ("protein_g", (1003,)),
+    ("fat_g", (1004,)),
+    ("saturated_fat_g", (1258,)),
+    ("carbs_g", (1005, 1050)),
+    ("sugars_g", (2000, 1063)),
+    ("fiber_g", (1079,)),
+    ("sodium_mg", (1093,)),
+]
+NUTRIENT_NAMES = [name for name, _ in NUTRIENTS]
+
+# per-100 g daily-value style weights: + is good, - is bad
+_SCORE_WEIGHTS = {
+    "protein_g": 1 / 50,
+    "fiber_g": 1 / 28,
+    "sugars_g": -1 / 50,
+    "saturated_fat_g": -1 / 20,
+    "sodium_mg": -1 / 2300,
+    "energy_kcal": -1 / 2000,
+}
+
+
+# ----- FDC dump -----
+def nutrient_vector(amounts: Dict[int, float]) -> np.ndarray:
+    vec = np.full(len(NUTRIENTS), np.nan, dtype=np.float32)
+    for j, (_, ids) in enumerate(NUTRIENTS):
+        for nid in ids:
+            if nid in amounts:
+                vec[j] = amounts[nid]
+                break
+    return vec
+
+
+def _load_fdc_json(path: Path) -> Dict[str, np.ndarray]:
+    data = json.loads(path.read_text())
+    foods = []
+    for value in data.values() if isinstance(data, dict) else [data]:
+        if isinstance(value, list):
+            foods.extend(value)
+
+    out: Dict[str, np.ndarray] = {}
+    for food in foods:
+        amounts = {}
+        for fn in food.get("foodNutrients", []):
+            nid = (fn.get("nutrient") or {}).get("id")
+            if nid is not None and fn.get("amount") is not None:
+                amounts[int(nid)] = float(fn["amount"])
+        if food.get("description"):
+            out[food["description"]] = nutrient_vector(amounts)
+    return out
+
+
+def _load_fdc_csv(folder: Path) -> Dict[str, np.ndarray]:
+    wanted = {nid for _, ids in NUTRIENTS for nid in ids}
+    food = pd.read_csv(folder / "food.csv", usecols=["fdc_id", "description"])
+    amounts = pd.read_csv(
+        folder / "food_nutrient.csv", usecols=["fdc_id", "nutrient_id", "amount"]
+    )
+    amounts = amounts[amounts["nutrient_id"].isin(wanted)]
+
+    per_food: Dict[int, Dict[int, float]] = {}
+    for fdc_id, nid, amount in amounts.itertuples(index=False):
+        per_food.setdefault(int(fdc_id), {})[int(nid)] = float(amount)
+
+    return {
+        str(desc): nutrient_vector(per_food.get(int(fdc_id), {}))
+        for fdc_id, desc in food.itertuples(index=False)
+        if isinstance(desc, str)
+    }
+
+
+def load_fdc(path: str | Path) -> Dict[str, np.ndarray]:
+    """FDC description -> per-100 g nutrient vector (NUTRIENTS order)."""
+    path = Path(path)
+    if path.is_dir():
+        return _load_fdc_csv(path)
+    return _load_fdc_json(path)
+
+
+def food_table(foods: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Canonical ingredient name -> nutrient vector.
+
+    FDC descriptions read "Onions, raw" / "Oil, olive, salad or cooking", so
+    each food is keyed by its canonical first segment ("onion") and by the
+    first two segments swapped ("olive oil"). Plain "raw" entries and short
+    descriptions win when several foods share a key.
+    """
+    best: Dict[str, Tuple[Tuple, np.ndarray]] = {}
+    for desc, vec in foods.items():
+        parts = [" ".join(p.lower().split()) for p in desc.split(",")]
+        parts = [p for p in parts if p]
+        if not parts or np.isnan(vec).all():
+            continue
+        keys = [(0, canonicalize(parts[0]))]
+        if len(parts) > 1:
+            keys.append((1, canonicalize(f"{parts[1]} {parts[0]}")))
+        for alt, key in keys:
+            rank = (alt, "raw" not in parts, len(desc))
+            if key not in best or rank < best[key][0]:
+                best[key] = (rank, vec)
+    return {key: vec for key, (_, vec) in best.items()}
+
+
+def lookup(canon: str, table: Dict[str, np.ndarray]) -> np.ndarray | None:
+    """Exact name, then its head noun phrases ("unsalted butter" -> "butter")."""
+    words = canon.split()
+    for i in range(len(words)):
+        vec = table.get(" ".join(words[i:]))
+        if vec is not None:
+            return vec
+    for i in range(len(words) - 1, 0, -1):
+        vec = table.get(" ".join(words[:i]))
+        if vec is not None:
+            return vec
+    return None
+
+
+# ----- per-recipe vectors -----
+def health_scores(profiles: np.ndarray) -> np.ndarray:
+    """Per-100 g profiles -> 0..1 percentile of a daily-value style score (0.5 if unknown)."""
+    raw = np.zeros(len(profiles), dtype=np.float64)
+    for name, weight in _SCORE_WEIGHTS.items():
+        col = profiles[:, NUTRIENT_NAMES.index(name)]
+        raw += weight * np.nan_to_num(col, nan=0.0)
+
+    known = ~np.isnan(profiles).all(axis=1)
+    score = np.full(len(profiles), 0.5, dtype=np.float32)
+    if known.any():
+        ranks = raw[known].argsort(kind="stable").argsort(kind="stable")
+        score[known] = ranks / max(int(known.sum()) - 1, 1)
+    return score
+
+
+def _save(path: Path, arr: np.ndarray) -> None:
+    """
+    np.save via a temp file renamed over 'path': processes that have the
+    old file mapped keep reading it, and nobody sees a half-written one.
+    """
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def build_nutrition(catalog: CompiledCatalog, fdc_path: str | Path) -> Dict:
+    """
+    Compute and store the nutrition arrays in the catalog directory.
+    Hold catalog_lock() (files are replaced atomically, nutrition.json last).
+    """
+    base = getattr(catalog, "base", None)
+    if base is not None:
+        # segmented (scripts/segments.py): nutrition belongs to the base;
+        # delta recipes get theirs when they are merged into it
+        meta = build_nutrition(base, fdc_path)
+        catalog.load_nutrition()
+        return meta
+
+    table = food_table(load_fdc(fdc_path))
+
+    vocab = catalog.vocab()
+    k = len(NUTRIENTS)
+    by_vocab = np.full((len(vocab), k), np.nan, dtype=np.float32)
+    for i, canon in enumerate(vocab):
+        vec = lookup(canon, table)
+        if vec is not None:
+            by_vocab[i] = vec
+
+    # recipe i's entries are ing_ids[offsets[i]:offsets[i+1]]
+    sizes = np.asarray(catalog.sizes, dtype=np.int64)
+    recipe = np.repeat(np.arange(len(sizes)), sizes)
+    entries = by_vocab[np.asarray(catalog.ing_ids)]
+    found = ~np.isnan(entries)
+
+    sums = np.zeros((len(sizes), k), dtype=np.float64)
+    counts = np.zeros((len(sizes), k), dtype=np.float64)
+    for j in range(k):
+        sums[:, j] = np.bincount(recipe, np.where(found[:, j], entries[:, j], 0), minlength=len(sizes))
+        counts[:, j] = np.bincount(recipe, found[:, j], minlength=len(sizes))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        profiles = (sums / counts).astype(np.float32)
+
+    matched = np.bincount(recipe, found.any(axis=1), minlength=len(sizes))
+    coverage = np.divide(matched, sizes, out=np.zeros(len(sizes)), where=sizes > 0)
+    scores = health_scores(profiles)
+
+    _save(catalog.path / "nutrition.npy", profiles)
+    _save(catalog.path / "nutrition_score.npy", scores)
+    _save(catalog.path / "nutrition_vocab.npy", by_vocab)
+    meta = {
+        "nutrients": NUTRIENT_NAMES,
+        "source": str(fdc_path),
+        "catalog": catalog.version,
+        # a merge can rebuild the scores under the same catalog version
+        "build": hashlib.sha1(scores.tobytes()).hexdigest()[:16],
+        "vocab_matched": int((~np.isnan(by_vocab).all(axis=1)).sum()),
+        "n_vocab": len(vocab),
+        "mean_coverage": float(coverage.mean()) if len(coverage) else 0.0,
+    }
+    write_json(catalog.path / "nutrition.json", meta)
+    catalog.load_nutrition()
+    return meta
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from scripts.recipe_search import load_catalog
+
+    parser = argparse.ArgumentParser(description="Precompute per-recipe nutrition from a USDA FDC dump")
+    parser.add_argument("csv", nargs="?", default="data/raw/recipes.csv")
+    parser.add_argument("--fdc", required=True, help="FDC CSV directory or JSON file")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.csv)
+    with catalog_lock(catalog.path):
+        meta = build_nutrition(catalog, args.fdc)
+    print(
+        f"{meta['vocab_matched']:,} / {meta['n_vocab']:,} ingredients matched, "
+        f"mean recipe coverage {meta['mean_coverage']:.0%}"
+    )
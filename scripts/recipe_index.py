@@ -0,0 +1,94 @@
+# scripts/recipe_index.py
+from __future__ import annotations
+
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Sequence, Set
+
+import numpy as np
+
+from scripts.canonical import whole_words
+from scripts.dietary import recipe_flags
+
+
+class IngredientIndex:
+    """
+    Inverted index: normalized ingredient phrase -> recipe positions.
+
+    Built once from the 'ingredients_canon' lists that load_recipes produces:
+      - vocab     : every distinct phrase (first-seen order)
+      - postings  : phrase id -> recipe positions using that phrase
+      - sizes     : len(ingredients_norm) per recipe
+      - names     : display name per recipe
+      - diet_flags: uint8 dietary bitmask per recipe (scripts.dietary),
+                    computed on first use
+
+    A user ingredient is resolved to every phrase that contains it as whole
+    words, so "chicken" still hits "chicken breast" (but "egg" not
+    "eggplant") – and the scan runs once over the distinct vocabulary
+    instead of over every recipe row.
+    """
+
+    def __init__(self, names: Sequence[str], ingredient_lists: Sequence[List[str]]):
+        ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        sizes: List[int] = []
+
+        for pos, ings in enumerate(ingredient_lists):
+            sizes.append(len(ings))
+            # dict.fromkeys → dedupe but keep a deterministic order
+            for ing in dict.fromkeys(ings):
+                pid = ids.setdefault(ing, len(ids))
+                if pid == len(postings):
+                    postings.append([])
+                postings[pid].append(pos)
+
+        self.names: List[str] = list(names)
+        self.sizes: List[int] = sizes
+        self.vocab: List[str] = list(ids)
+        self.postings: List[List[int]] = postings
+
+        # all phrases in one string; phrases never contain "\n" after _normalize
+        self._haystack = "\n".join(self.vocab) + "\n"
+        self._starts: List[int] = []
+        offset = 0
+        for phrase in self.vocab:
+            self._starts.append(offset)
+            offset += len(phrase) + 1
+        self._starts.append(offset)
+
+        self._diet_flags: np.ndarray | None = None
+
+        # user terms repeat a lot ("salt", "onion") → cache their resolution
+        self.phrase_ids = lru_cache(maxsize=4096)(self._find_phrase_ids)
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    @property
+    def diet_flags(self) -> np.ndarray:
+        if self._diet_flags is None:
+            self._diet_flags = recipe_flags(self.vocab, self.postings.__getitem__, len(self))
+        return self._diet_flags
+
+    def _find_phrase_ids(self, term: str) -> List[int]:
+        """Ids of every vocabulary phrase containing 'term' as whole words."""
+        found: List[int] = []
+        hay, starts = self._haystack, self._starts
+        i = hay.find(term)
+        while i != -1:
+            if not whole_words(hay, i, len(term)):
+                i = hay.find(term, i + 1)
+                continue
+            pid = bisect_right(starts, i) - 1
+            found.append(pid)
+            # one hit per phrase is enough → jump to the next phrase
+            i = hay.find(term, starts[pid + 1])
+        return found
+
+    def recipes_for(self, term: str) -> Set[int]:
+        """Positions of recipes with at least one phrase containing 'term'."""
+        out: Set[int] = set()
+        for pid in self.phrase_ids(term):
+            out.update(self.postings[pid])
+        return out
@@ -0,0 +1,223 @@
+# scripts/recipe_matrix.py
+from __future__ import annotations
+
+from itertools import chain
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+import scipy.sparse as sp
+
+from scripts.dietary import allowed_mask
+from scripts.metrics import span
+from scripts.recipe_index import IngredientIndex
+
+
+def _top(sel: np.ndarray, score: np.ndarray, size: np.ndarray, k: int) -> np.ndarray:
+    """
+    Best 'k' of the candidate slots in 'sel', ordered by
+    (-score, recipe_size, catalog position) like the Python sort.
+    """
+    if k <= 0:
+        return sel[:0]
+    if len(sel) > k:
+        part = sel[np.argpartition(-score[sel], k - 1)[:k]]
+        kth = score[part].min()
+        # keep everything tied with the k-th score so the tie-break stays exact
+        sel = sel[score[sel] >= kth]
+    order = np.lexsort((sel, size[sel], -score[sel]))
+    return sel[order[:k]]
+
+
+def same_recipe(result: Dict) -> Dict:
+    """A result without its position: equal for duplicate rows of one recipe."""
+    return {k: v for k, v in result.items() if k != "position"}
+
+
+def select_matches(
+    pos: np.ndarray,
+    matches: np.ndarray,
+    size: np.ndarray,
+    names: Sequence[str],
+    n_terms: int,
+    quota: int = 7,
+    hi_thresh: float = 0.7,
+    lo_thresh: float = 0.4,
+    nutrition: np.ndarray | None = None,
+    nutrition_weight: float = 0.0,
+    allowed: np.ndarray | None = None,
+) -> List[Dict]:
+    """
+    Score candidates and fill the quota exactly like match_recipes.
+
+    'pos' are catalog positions (ascending) of recipes with >= 1 match,
+    'matches' / 'size' their match counts and recipe sizes. Every result
+    carries its catalog 'position', so callers never look a recipe up by
+    its (not necessarily unique) name. With a
+    'nutrition' score per candidate (0..1) and a weight > 0, each pass
+    ranks by (1 - w) * score + w * nutrition instead of the match score.
+    'allowed' (bool per catalog position, see scripts.dietary) drops
+    candidates before anything is scored.
+    """
+    with span("match.select", candidates=len(pos)):
+        if allowed is not None:
+            keep = allowed[pos]
+            pos, matches, size = pos[keep], matches[keep], size[keep]
+            if nutrition is not None:
+                nutrition = nutrition[keep]
+            if len(pos) == 0:
+                return []
+        pct_recipe = matches / size
+        pct_user = matches / n_terms
+        score = 0.5 * pct_recipe + 0.5 * pct_user
+        blend = nutrition is not None and nutrition_weight > 0
+        rank = (1 - nutrition_weight) * score + nutrition_weight * nutrition if blend else score
+
+        def result(i: int) -> Dict:
+            out = {
+                "name": names[pos[i]],
+                "position": int(pos[i]),
+                "matches": int(matches[i]),
+                "pct_recipe": float(pct_recipe[i]),
+                "pct_user": float(pct_user[i]),
+                "score": float(score[i]),
+                "recipe_size": int(size[i]),
+            }
+            if blend:
+                out["nutrition_score"] = float(nutrition[i])
+                out["combined_score"] = float(rank[i])
+            return out
+
+        # Pass 1: strong matches based on pct_user
+        strong = pct_user >= hi_thresh
+        selected = [result(i) for i in _top(np.flatnonzero(strong), rank, size, quota)]
+        if len(selected) >= quota:
+            return selected
+
+        # Pass 2: fill remaining quota with okay matches. match_recipes skips
+        # a filler equal to one already picked (duplicate rows of the same
+        # recipe), so widen the window until enough distinct ones are found.
+        okay = np.flatnonzero(~strong & (pct_user >= lo_thresh))
+        need = quota - len(selected)
+        k = need
+        while True:
+            filler: List[Dict] = []
+            seen = [same_recipe(c) for c in selected]
+            for i in _top(okay, rank, size, k):
+                c = result(i)
+                if same_recipe(c) in seen:
+                    continue
+                seen.append(same_recipe(c))
+                filler.append(c)
+                if len(filler) >= need:
+                    break
+            if len(filler) >= need or k >= len(okay):
+                return selected + filler
+            k *= 2
+
+
+class RecipeMatrix:
+    """
+    Vectorized scoring backend: the catalog as a sparse incidence matrix.
+
+      - incidence : CSR recipe × phrase matrix (1 = recipe uses the phrase)
+      - sizes     : recipe_size per row (len(ingredients_norm))
+      - names     : display name per row
+
+    A query becomes a sparse term × phrase matrix (one row per user
+    ingredient, 1 for every phrase containing it). One sparse product with
+    the phrase × recipe transpose gives, per term, the recipes it hits;
+    'matches', 'pct_recipe', 'pct_user' and 'score' are then array math and
+    the quota is filled with argpartition instead of a full sort.
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        incidence: sp.csr_matrix,
+        sizes: np.ndarray,
+        phrase_ids: Callable[[str], Sequence[int]],
+        diet_flags: np.ndarray | None = None,
+    ):
+        self.names = names
+        self.incidence = incidence
+        self.sizes = sizes
+        self.phrase_ids = phrase_ids
+        self.diet_flags = diet_flags
+        # queries walk phrase rows, so keep the transpose in CSR too
+        self._by_phrase = incidence.T.tocsr()
+
+    @classmethod
+    def from_index(cls, index: IngredientIndex) -> RecipeMatrix:
+        """Reuse an IngredientIndex's vocabulary, postings and sizes."""
+        lengths = np.fromiter(
+            (len(p) for p in index.postings), dtype=np.int64, count=len(index.postings)
+        )
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter(
+            chain.from_iterable(index.postings), dtype=np.int32, count=int(indptr[-1])
+        )
+        by_phrase = sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.int8), indices, indptr),
+            shape=(len(index.vocab), len(index)),
+        )
+        return cls(
+            index.names,
+            by_phrase.T.tocsr(),
+            np.asarray(index.sizes, dtype=np.int64),
+            index.phrase_ids,
+            index.diet_flags,
+        )
+
+    def __len__(self) -> int:
+        return self.incidence.shape[0]
+
+    def recipes_for(self, term: str) -> np.ndarray:
+        """Positions (ascending) of recipes with a phrase containing 'term'."""
+        return np.unique(self._by_phrase[self.phrase_ids(term)].indices)
+
+    def match_counts(self, terms: Sequence[str]) -> np.ndarray:
+        """Per-recipe number of 'terms' found (whole words) in its phrases."""
+        rows: List[int] = []
+        cols: List[int] = []
+        for t, term in enumerate(terms):
+            pids = self.phrase_ids(term)
+            cols.extend(pids)
+            rows.extend([t] * len(pids))
+
+        if not cols:
+            return np.zeros(len(self), dtype=np.int64)
+
+        query = sp.csr_matrix(
+            (np.ones(len(cols), dtype=np.int32), (rows, cols)),
+            shape=(len(terms), self._by_phrase.shape[0]),
+        )
+        # term × recipe; a stored entry means "this term hits this recipe"
+        hits = query @ self._by_phrase
+        return np.bincount(hits.indices, minlength=len(self))
+
+    def match(
+        self,
+        terms: Sequence[str],
+        quota: int = 7,
+        hi_thresh: float = 0.7,
+        lo_thresh: float = 0.4,
+        diet: int = 0,
+    ) -> List[Dict]:
+        """Same quota logic and result dicts as match_recipes, vectorized."""
+        if not terms:
+            return []
+        if diet and self.diet_flags is None:
+            raise ValueError("this RecipeMatrix was built without dietary flags")
+
+        with span("match.scan"):
+            counts = self.match_counts(terms)
+            pos = np.flatnonzero(counts)
+        if len(pos) == 0:
+            return []
+
+        return select_matches(
+            pos, counts[pos], self.sizes[pos], self.names, len(terms),
+            quota, hi_thresh, lo_thresh,
+            allowed=allowed_mask(self.diet_flags, diet) if diet else None,
+        )
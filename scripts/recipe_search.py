@@ -125,15 +125,50 @@
 # scripts/recipe_search.py
 from __future__ import annotations
 
+import io
 from ast import literal_eval
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, Iterator, List, Dict, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+
+from scripts.canonical import canonicalize_list
+from scripts.catalog import (
+    FORMAT_VERSION,
+    CatalogWriter,
+    CompiledCatalog,
+    catalog_dir_for,
+    catalog_lock,
+    hash_keys,
+    is_fresh,
+    read_appended,
+    read_stamp,
+    restamp,
+    set_stamp,
+    write_catalog,
+)
+from scripts.dietary import allowed_mask, diet_mask
+from scripts.fuzzy import use_fuzzy
+from scripts.match_session import MatchSession
+from scripts.metrics import span, timed
+from scripts.recipe_index import IngredientIndex
+from scripts.recipe_matrix import RecipeMatrix, same_recipe, select_matches
+from scripts.result_cache import ResultCache
+from scripts.segments import SegmentedCatalog, append_segment, compact, open_catalog
 
 # Project root: PantryPal/
 BASE_DIR = Path(__file__).resolve().parents[1]
 
+# part of every result-cache key; bump when term resolution or the result
+# dicts change, so results cached under the old rules (e.g. on disk) are
+# never served
+MATCH_RULES = 3
+
 
 def _normalize(s: str) -> str:
     """Lowercase + trim + collapse inner spaces."""
@@ -145,14 +180,29 @@ def _normalize_list(xs: List[str]) -> List[str]:
     return [_normalize(x) for x in xs if isinstance(x, str) and x.strip()]
 
 
-def load_recipes(csv_path: str | Path) -> pd.DataFrame:
-    """
-    Loads your Kaggle-style recipe CSV.
+def parse_ings(x) -> List[str]:
+    """One raw 'ingredients' cell -> list of normalized phrases."""
+    if not isinstance(x, str):
+        return []
 
-    We expect columns:
-      - 'ingredients'  : long string ("3 tbsp butter, 2 apples, ...")
-      - 'recipe_name'  : recipe title  (or 'title' / 'name' as fallback)
-    """
+    x = x.strip()
+
+    # Case 1: looks like "['salt', 'pepper']" → try literal_eval
+    if x.startswith("[") and x.endswith("]"):
+        try:
+            val = literal_eval(x)
+            if isinstance(val, list):
+                return _normalize_list(val)
+        except Exception:
+            pass
+
+    # Case 2: treat as comma-separated string
+    parts = [p.strip() for p in x.split(",")]
+    return _normalize_list(parts)
+
+
+def _resolve_csv(csv_path: str | Path) -> Path:
+    """Make 'csv_path' absolute (project root) and try the usual fallbacks."""
     # 1) Resolve the main path relative to project root
     p = Path(csv_path)
     if not p.is_absolute():
@@ -169,34 +219,16 @@ def load_recipes(csv_path: str | Path) -> pd.DataFrame:
                 p = alt
                 break
 
-    df = pd.read_csv(p)
-
-    # ----- ingredients: convert big string -> list of tokens -----
-    def parse_ings(x):
-        if not isinstance(x, str):
-            return []
-
-        x = x.strip()
-
-        # Case 1: looks like "['salt', 'pepper']" → try literal_eval
-        if x.startswith("[") and x.endswith("]"):
-            try:
-                val = literal_eval(x)
-                if isinstance(val, list):
-                    return _normalize_list(val)
-            except Exception:
-                pass
+    return p
 
-        # Case 2: treat as comma-separated string
-        parts = [p.strip() for p in x.split(",")]
-        return _normalize_list(parts)
 
+def _check_columns(df: pd.DataFrame) -> None:
     if "ingredients" not in df.columns:
         raise ValueError("CSV has no 'ingredients' column – check the file format.")
 
-    df["ingredients_norm"] = df["ingredients"].apply(parse_ings)
 
-    # ----- pick a display name -----
+def _display_names(df: pd.DataFrame) -> pd.Series:
+    """recipe_name / title / name column, else the row index as text."""
     name_col = None
     for col in ["recipe_name", "title", "name"]:
         if col in df.columns:
@@ -204,26 +236,325 @@ def load_recipes(csv_path: str | Path) -> pd.DataFrame:
             break
 
     if name_col is not None:
-        df["display_name"] = df[name_col].fillna("").astype(str)
+        return df[name_col].fillna("").astype(str)
+    # final fallback: use row index as name
+    return df.index.astype(str).to_series(index=df.index)
+
+
+# a stable recipe id, if the CSV has one; else rows are keyed by content
+ID_COLUMNS = ["recipe_id", "id"]
+
+
+def _id_column(df: pd.DataFrame) -> str | None:
+    return next((c for c in ID_COLUMNS if c in df.columns), None)
+
+
+def _recipe_keys(df: pd.DataFrame, names: Sequence[str]) -> np.ndarray:
+    """
+    Catalog keys (see catalog.hash_keys) of CSV rows: the id column, or the
+    name plus the raw ingredients cell – computable without parsing. Rows
+    with a blank id fall back to the latter, so they don't all share "id:nan".
+    """
+    cells = df["ingredients"].fillna("").astype(str).tolist()
+    col = _id_column(df)
+    ids = df[col].tolist() if col is not None else [None] * len(cells)
+    return hash_keys([
+        f"{n}\x1f{c}" if pd.isna(v) or str(v).strip() == "" else f"id:{v}"
+        for v, n, c in zip(ids, names, cells)
+    ])
+
+
+def _read_csv(p: Path, keys: bool = False) -> pd.DataFrame:
+    """
+    The slow path: pd.read_csv + parse_ings on every row. 'keys' adds a
+    'recipe_key' column for the compiled catalog.
+    """
+    with span("read_csv") as s:
+        df = pd.read_csv(p)
+        s["rows"] = len(df)
+
+    # ----- ingredients: convert big string -> list of tokens -----
+    _check_columns(df)
+    with span("parse_ings", rows=len(df)):
+        df["ingredients_norm"] = df["ingredients"].apply(parse_ings)
+        # canonical names ("butter") are what we match on; the text is for display
+        df["ingredients_canon"] = df["ingredients_norm"].apply(canonicalize_list)
+
+    # ----- pick a display name -----
+    df["display_name"] = _display_names(df)
+
+    columns = ["display_name", "ingredients_norm", "ingredients_canon"]
+    if keys:
+        df["recipe_key"] = _recipe_keys(df, df["display_name"].tolist())
+        columns.append("recipe_key")
+    return df[columns].copy()
+
+
+def _parse_cells(cells: List) -> List[List[str]]:
+    """parse_ings over one chunk of raw 'ingredients' cells (pool worker)."""
+    return [parse_ings(x) for x in cells]
+
+
+def _iter_parsed_chunks(
+    p: Path, chunksize: int, processes: int | None
+) -> Iterator[Tuple[List[str], List[List[str]], np.ndarray]]:
+    """
+    Yield (display names, parsed ingredient lists, keys) per CSV chunk, in order.
+
+    With processes > 1 the parsing runs in a process pool; at most two
+    chunks per worker are in flight, so memory stays bounded by chunksize.
+    """
+    reader = pd.read_csv(p, chunksize=chunksize)
+
+    if processes is None or processes <= 1:
+        for chunk in reader:
+            _check_columns(chunk)
+            names = _display_names(chunk).tolist()
+            yield names, _parse_cells(chunk["ingredients"].tolist()), _recipe_keys(chunk, names)
+        return
+
+    with ProcessPoolExecutor(processes) as pool:
+        pending: deque = deque()
+        for chunk in reader:
+            _check_columns(chunk)
+            fut = pool.submit(_parse_cells, chunk["ingredients"].tolist())
+            names = _display_names(chunk).tolist()
+            pending.append((names, fut, _recipe_keys(chunk, names)))
+            if len(pending) >= 2 * processes:
+                names, fut, keys = pending.popleft()
+                yield names, fut.result(), keys
+        while pending:
+            names, fut, keys = pending.popleft()
+            yield names, fut.result(), keys
+
+
+@timed("load_recipes")
+def load_recipes(csv_path: str | Path, use_compiled: bool = True) -> pd.DataFrame:
+    """
+    Loads your Kaggle-style recipe CSV.
+
+    We expect columns:
+      - 'ingredients'  : long string ("3 tbsp butter, 2 apples, ...")
+      - 'recipe_name'  : recipe title  (or 'title' / 'name' as fallback)
+
+    If compile_recipes() has written a catalog for this CSV and the CSV has
+    not changed since, the memory-mapped catalog is loaded instead of
+    re-parsing every row.
+    """
+    p = _resolve_csv(csv_path)
+
+    compiled = catalog_dir_for(p)
+    if use_compiled and (is_fresh(compiled, p) or restamp(compiled, p)):
+        return open_catalog(compiled).to_frame()
+
+    return _read_csv(p)
+
+
+def compile_recipes(
+    csv_path: str | Path,
+    out_dir: str | Path | None = None,
+    chunksize: int | None = None,
+    processes: int | None = None,
+    progress: Callable[[int], None] | None = None,
+) -> Path:
+    """
+    Parse the CSV once and write the compiled catalog load_recipes() prefers.
+
+    Default output: next to the CSV (data/raw/recipes.csv -> recipes.catalog/).
+
+    With 'chunksize' the CSV is streamed instead of read whole: chunks are
+    parsed (in a pool of 'processes' workers if > 1) and appended to the
+    catalog as they arrive, and 'progress' is called with the running row
+    count. Peak memory then depends on chunksize, not on the file size.
+    """
+    p = _resolve_csv(csv_path)
+    out = Path(out_dir) if out_dir is not None else catalog_dir_for(p)
+
+    if chunksize is None:
+        df = _read_csv(p, keys=True)
+        return write_catalog(
+            out,
+            df["display_name"].tolist(),
+            df["ingredients_norm"].tolist(),
+            source=p,
+            keys=df["recipe_key"].to_numpy(),
+        )
+
+    writer = CatalogWriter(out, source=p)
+    try:
+        for names, ings, keys in _iter_parsed_chunks(p, chunksize, processes):
+            writer.add(names, ings, keys)
+            if progress is not None:
+                progress(writer.n_recipes)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+# ----- delta ingestion (scripts/segments.py) -----
+def _append_rows(
+    compiled: Path, df: pd.DataFrame, stamp: Dict | None = None, upsert: bool = True
+) -> int:
+    """
+    Add CSV rows as a delta segment; returns how many were written.
+
+    upsert=True (ingest_recipes): rows are keyed first and parsed only if
+    they are new: one row per key (the last), and for content keys none the
+    catalog already has. Rows with an id the catalog has replace that recipe.
+
+    upsert=False (rows appended to the CSV): every row goes in and replaces
+    nothing, duplicates included, so the catalog holds what a full compile
+    of the grown CSV would. Hold catalog_lock().
+    """
+    _check_columns(df)
+    names = _display_names(df).tolist()
+    keys = _recipe_keys(df, names)
+    keep = np.arange(len(keys))
+    if upsert:
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = np.sort(len(keys) - 1 - last)
+    if upsert and _id_column(df) is None:
+        current = open_catalog(compiled)
+        known = np.asarray(current.keys)
+        if isinstance(current, SegmentedCatalog):
+            known = known[current.live]
+        keep = keep[~np.isin(keys[keep], known)]
+
+    if len(keep) == 0:
+        if stamp is not None:
+            set_stamp(compiled, stamp)
+        return 0
+    with span("parse_ings", rows=len(keep)):
+        ings = _parse_cells(df["ingredients"].iloc[keep].tolist())
+    append_segment(
+        compiled, [names[i] for i in keep.tolist()], ings, keys[keep], stamp, replace=upsert
+    )
+    return len(keep)
+
+
+def _ingest_appended(p: Path, compiled: Path) -> bool:
+    """If the CSV only grew by appended rows, add just those. Hold catalog_lock()."""
+    stamp = read_stamp(compiled)
+    if stamp is None or stamp.get("format") != FORMAT_VERSION:
+        return False
+    appended = read_appended(p, stamp)
+    if appended is None:
+        return False
+    tail, new_stamp = appended
+    with open(p, "rb") as f:
+        header = f.readline()
+    with span("read_csv") as s:
+        df = pd.read_csv(io.BytesIO(header + tail))
+        s["rows"] = len(df)
+    _append_rows(compiled, df, new_stamp, upsert=False)
+    return True
+
+
+def refresh_catalog(csv_path: str | Path) -> Path:
+    """
+    Bring the compiled catalog of 'csv_path' up to date and return its
+    directory: nothing if it is fresh, a new stamp if the CSV was only
+    touched, a delta segment with just the new rows if rows were appended,
+    else a full compile. Processes sharing it do the work once.
+    """
+    p = _resolve_csv(csv_path)
+    compiled = catalog_dir_for(p)
+    if is_fresh(compiled, p):
+        return compiled
+    with catalog_lock(compiled):
+        # another process may have done it while we waited
+        if is_fresh(compiled, p) or restamp(compiled, p) or _ingest_appended(p, compiled):
+            return compiled
+        compile_recipes(p, compiled)
+    return compiled
+
+
+def ingest_recipes(csv_path: str | Path, rows: pd.DataFrame | str | Path) -> int:
+    """
+    Add recipes to the catalog of 'csv_path' without recompiling it.
+
+    'rows' (a frame, or a CSV file, with the main CSV's columns) are keyed
+    by id / content and only new ones are parsed; they land in a delta
+    segment that match_recipes sees right away (see scripts/segments.py).
+    Returns the number of recipes added or replaced.
+
+    The rows live in the catalog only: if the CSV is later edited other
+    than by appending, the full recompile starts from the CSV again.
+    Appending them to the CSV instead keeps both in sync – load_catalog()
+    then adds just the appended rows, but as a full compile would: a row
+    repeating an id or an existing row is kept next to it, not upserted.
+    """
+    compiled = refresh_catalog(csv_path)
+    df = rows if isinstance(rows, pd.DataFrame) else pd.read_csv(_resolve_csv(rows))
+    with catalog_lock(compiled):
+        return _append_rows(compiled, df)
+
+
+@timed("load_catalog")
+def load_catalog(csv_path: str | Path, fuzzy: float | None = None) -> CompiledCatalog:
+    """
+    Open the shared, memory-mapped catalog for 'csv_path'.
+
+    Compiles it first if it is missing or the CSV's content changed (rows
+    appended to the CSV are added as a delta segment instead). Unlike a
+    load_recipes() frame, the result holds no per-recipe Python objects, so
+    any number of app processes share one page-cached copy.
+
+    With 'fuzzy' (a trigram similarity threshold, see scripts/fuzzy.py)
+    user ingredients also match near-miss phrases ("tomatoes" ≈ "tomato").
+    """
+    catalog = open_catalog(refresh_catalog(csv_path))
+    return use_fuzzy(catalog, fuzzy) if fuzzy is not None else catalog
+
+
+def build_index(df: pd.DataFrame, fuzzy: float | None = None) -> IngredientIndex:
+    """
+    Build the phrase -> recipe inverted index for a load_recipes() frame.
+
+    Do this once per catalog (e.g. behind st.cache_resource) and pass it to
+    match_recipes(..., index=...) so a query never walks the whole frame.
+    'fuzzy' is a trigram similarity threshold, as in load_catalog().
+    """
+    if "ingredients_canon" in df.columns:
+        ings = df["ingredients_canon"].tolist()
     else:
-        # final fallback: use row index as name
-        df["display_name"] = df.index.astype(str)
+        ings = [canonicalize_list(x) for x in df["ingredients_norm"]]
+    index = IngredientIndex(df["display_name"].tolist(), ings)
+    return use_fuzzy(index, fuzzy) if fuzzy is not None else index
+
+
+def build_matrix(df: pd.DataFrame, fuzzy: float | None = None) -> RecipeMatrix:
+    """Sparse-matrix scoring backend for a load_recipes() frame."""
+    return RecipeMatrix.from_index(build_index(df, fuzzy))
+
 
-    return df[["display_name", "ingredients_norm"]].copy()
+def _resolver_tag(index) -> str | None:
+    """Identifies a non-default term resolver (e.g. fuzzy) for cache keys."""
+    # a MatchSession resolves through its catalog
+    index = getattr(index, "catalog", index)
+    return getattr(getattr(index, "phrase_ids", None), "tag", None)
 
 
+@timed("match_recipes")
 def match_recipes(
     user_ings: List[str],
-    df: pd.DataFrame,
+    df: pd.DataFrame | CompiledCatalog,
     quota: int = 7,
     hi_thresh: float = 0.7,   # ≥ 70% of *your* ingredients used
     lo_thresh: float = 0.4,   # ≥ 40% of your ingredients used (for filling quota)
+    index: IngredientIndex | RecipeMatrix | MatchSession | None = None,
+    cache: ResultCache | None = None,
+    topk: bool = False,
+    nutrition_weight: float = 0.0,
+    diets: Sequence[str] | None = None,
 ) -> List[Dict]:
     """
     Quota-based matcher.
 
     For each recipe we compute:
-      - matches     : how many user ingredients appear (substring match)
+      - matches     : how many user ingredients appear (whole-word match
+                      on canonical names – "3 tbsp butter, softened" is "butter")
       - pct_recipe  : matches / recipe_size
       - pct_user    : matches / number_of_user_ingredients
       - score       : 0.5 * pct_recipe + 0.5 * pct_user
@@ -232,33 +563,97 @@ def match_recipes(
       1) Take recipes with pct_user >= hi_thresh, sorted by score, up to 'quota'.
       2) If still short, fill with recipes pct_user >= lo_thresh.
     Returns list of dicts:
-      'name', 'matches', 'pct_recipe', 'pct_user', 'score', 'recipe_size'
+      'name', 'position', 'matches', 'pct_recipe', 'pct_user', 'score', 'recipe_size'
+    ('position' is the recipe's row in the catalog / frame; names may repeat)
+
+    Only recipes sharing at least one phrase with the query are scored.
+    Pass a prebuilt 'index' (see build_index) to skip building it per call,
+    or a RecipeMatrix (see build_matrix) to score everything vectorized, or
+    a MatchSession to rescore incrementally as one pantry changes.
+    'df' may also be a CompiledCatalog (see load_catalog), queried directly.
+
+    With topk=True a CompiledCatalog visits recipes smallest-first and stops
+    once nothing unseen can enter the quota (same results, near-constant
+    time for very common ingredients).
+
+    With a 'cache', results are reused for the same normalized ingredient
+    set, quota and thresholds. Only versioned catalogs (CompiledCatalog) are
+    cached, so a recompiled CSV never serves old results.
+
+    Terms are resolved by the backend's phrase_ids: phrases containing the
+    term as whole words by default ("egg" hits "egg white", not "eggplant"),
+    near misses for otherwise unknown terms after use_fuzzy() / fuzzy=...
+
+    With nutrition_weight=w > 0 and a CompiledCatalog that has nutrition
+    data (python -m scripts.nutrition), both passes rank by
+    (1 - w) * score + w * nutrition_score, and each dict also carries
+    'nutrition_score' and 'combined_score'. Other backends ignore it.
+
+    diets=["vegan", "gluten_free", ...] (see scripts.dietary) keeps only
+    recipes fitting every listed diet. Excluded recipes are masked out
+    before scoring, so the quota is still filled from the ones that pass.
     """
     if not user_ings:
         return []
+    diet = diet_mask(diets)
 
-    user_norm_list = _normalize_list(user_ings)
+    user_norm_list = canonicalize_list(_normalize_list(user_ings))
     user_norm = set(user_norm_list)
     if not user_norm:
         return []
 
-    candidates: List[Dict] = []
-
-    for _, row in df.iterrows():
-        recipe_ings = row["ingredients_norm"]
-        if not recipe_ings:
-            continue
+    version = getattr(df, "version", None)
+    if version is not None:
+        tag = _resolver_tag(index if index is not None else df)
+        version = f"{version}-m{MATCH_RULES}"
+        version = f"{version}-{tag}" if tag else version
+        if nutrition_weight > 0 and getattr(df, "nutrition_score", None) is not None:
+            build = df.nutrition_meta.get("build", "")
+            version = f"{version}-n{nutrition_weight:g}-{build}"
+        if diet:
+            version = f"{version}-d{diet}"
+    if cache is not None and version is not None:
+        key = ResultCache.make_key(user_norm, quota, hi_thresh, lo_thresh, version)
+        with span("match.cache") as s:
+            results = cache.get(key)
+            s["hit"] = int(results is not None)
+        if results is None:
+            # unwrapped: the outer call's span already covers this one
+            results = match_recipes.__wrapped__(
+                user_ings, df, quota, hi_thresh, lo_thresh, index,
+                topk=topk, nutrition_weight=nutrition_weight, diets=diets,
+            )
+            cache.put(key, results)
+        return results
+
+    if index is None:
+        index = df if isinstance(df, CompiledCatalog) else build_index(df)
+    if topk and isinstance(index, CompiledCatalog):
+        return index.match_topk(
+            sorted(user_norm), quota, hi_thresh, lo_thresh,
+            nutrition_weight=nutrition_weight, diet=diet,
+        )
+    if isinstance(index, (CompiledCatalog, MatchSession)):
+        return index.match(sorted(user_norm), quota, hi_thresh, lo_thresh, nutrition_weight, diet)
+    if isinstance(index, RecipeMatrix):
+        return index.match(sorted(user_norm), quota, hi_thresh, lo_thresh, diet)
 
-        recipe_size = len(recipe_ings)
+    ok = allowed_mask(index.diet_flags, diet) if diet else None
 
-        # substring-based matching: "chicken" matches "1 lb chicken breast"
-        matches = 0
+    # recipe position -> how many user ingredients it contains
+    hits: Dict[int, int] = {}
+    with span("match.scan"):
         for u in user_norm:
-            if any(u in ing for ing in recipe_ings):
-                matches += 1
+            for pos in index.recipes_for(u):
+                if ok is None or ok[pos]:
+                    hits[pos] = hits.get(pos, 0) + 1
 
-        if matches == 0:
-            continue
+    candidates: List[Dict] = []
+
+    # walk in catalog order so score ties break exactly like a full scan
+    for pos in sorted(hits):
+        matches = hits[pos]
+        recipe_size = index.sizes[pos]
 
         pct_recipe = matches / recipe_size
         pct_user = matches / len(user_norm)
@@ -266,7 +661,8 @@ def match_recipes(
 
         candidates.append(
             {
-                "name": row["display_name"],
+                "name": index.names[pos],
+                "position": pos,
                 "matches": matches,
                 "pct_recipe": pct_recipe,
                 "pct_user": pct_user,
@@ -279,7 +675,8 @@ def match_recipes(
         return []
 
     # sort best → worst; ties broken by shorter recipes
-    candidates.sort(key=lambda c: (-c["score"], c["recipe_size"]))
+    with span("match.select", candidates=len(candidates)):
+        candidates.sort(key=lambda c: (-c["score"], c["recipe_size"]))
 
     selected: List[Dict] = []
 
@@ -291,13 +688,180 @@ def match_recipes(
             return selected
 
     # Pass 2: fill remaining quota with okay matches
+    seen = [same_recipe(c) for c in selected]
     for c in candidates:
-        if c in selected:
+        if same_recipe(c) in seen:
             continue
         if c["pct_user"] >= lo_thresh:
             selected.append(c)
+            seen.append(same_recipe(c))
         if len(selected) >= quota:
             break
 
     return selected
 
+
+# ----- batch matching (offline jobs) -----
+# set per worker process by _init_batch_worker
+_BATCH_INDEX = None
+
+
+def _recipes_array(index, term: str) -> np.ndarray:
+    hits = index.recipes_for(term)
+    if isinstance(hits, np.ndarray):
+        return hits
+    return np.fromiter(sorted(hits), dtype=np.int64, count=len(hits))
+
+
+def _match_chunk(
+    pantries: List[List[str]],
+    index,
+    quota: int,
+    hi_thresh: float,
+    lo_thresh: float,
+) -> List[List[Dict]]:
+    """
+    Score a chunk of normalized pantries with one sparse product:
+    (pantry × term) @ (term × recipe) -> per-pantry match counts.
+    """
+    terms = sorted({t for p in pantries for t in p})
+    if not terms:
+        return [[] for _ in pantries]
+
+    # term × recipe: each distinct term is resolved once for the whole chunk
+    hits = [_recipes_array(index, t) for t in terms]
+    lengths = np.fromiter((len(h) for h in hits), dtype=np.int64, count=len(hits))
+    indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    by_term = sp.csr_matrix(
+        (np.ones(int(indptr[-1]), dtype=np.int32), np.concatenate(hits), indptr),
+        shape=(len(terms), len(index.sizes)),
+    )
+
+    # pantry × term
+    col = {t: j for j, t in enumerate(terms)}
+    p_cols = [col[t] for p in pantries for t in p]
+    p_ptr = np.zeros(len(pantries) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in pantries], out=p_ptr[1:])
+    query = sp.csr_matrix(
+        (np.ones(len(p_cols), dtype=np.int32), p_cols, p_ptr),
+        shape=(len(pantries), len(terms)),
+    )
+
+    counts = query @ by_term
+    counts.sort_indices()
+
+    sizes = np.asarray(index.sizes)
+    out: List[List[Dict]] = []
+    for i, p in enumerate(pantries):
+        a, b = counts.indptr[i], counts.indptr[i + 1]
+        if not p or a == b:
+            out.append([])
+            continue
+        pos = counts.indices[a:b]
+        out.append(
+            select_matches(
+                pos, counts.data[a:b], sizes[pos], index.names, len(p),
+                quota, hi_thresh, lo_thresh,
+            )
+        )
+    return out
+
+
+def _init_batch_worker(source, fuzzy: float | None = None) -> None:
+    """Process-pool initializer: open (catalog path) or index (frame) once."""
+    global _BATCH_INDEX
+    if isinstance(source, (str, Path)):
+        _BATCH_INDEX = open_catalog(source)
+        if fuzzy is not None:
+            use_fuzzy(_BATCH_INDEX, fuzzy)
+    else:
+        _BATCH_INDEX = build_index(source, fuzzy)
+
+
+def _match_chunk_in_worker(pantries, quota, hi_thresh, lo_thresh):
+    return _match_chunk(pantries, _BATCH_INDEX, quota, hi_thresh, lo_thresh)
+
+
+def match_recipes_batch(
+    pantries: List[List[str]],
+    df: pd.DataFrame | CompiledCatalog,
+    quota: int = 7,
+    hi_thresh: float = 0.7,
+    lo_thresh: float = 0.4,
+    index: IngredientIndex | RecipeMatrix | None = None,
+    processes: int | None = None,
+    chunksize: int = 256,
+) -> List[List[Dict]]:
+    """
+    match_recipes() for many pantries at once (nightly emails, log replays).
+
+    Pantries are scored 'chunksize' at a time: every distinct ingredient in
+    a chunk is resolved once and all its pantries are counted with a single
+    sparse product. With processes > 1 the chunks are spread over a process
+    pool (each worker maps the compiled catalog, or indexes the frame, once).
+
+    Returns one result list per pantry, identical to match_recipes().
+    """
+    norm = [sorted(set(canonicalize_list(_normalize_list(p)))) if p else [] for p in pantries]
+    chunks = [norm[i:i + chunksize] for i in range(0, len(norm), chunksize)]
+
+    if processes is not None and processes > 1 and len(chunks) > 1:
+        source = df.path if isinstance(df, CompiledCatalog) else df
+        # workers rebuild the resolver from its threshold
+        resolver = index if index is not None else df
+        fuzzy = getattr(getattr(resolver, "phrase_ids", None), "threshold", None)
+        with ProcessPoolExecutor(
+            processes, initializer=_init_batch_worker, initargs=(source, fuzzy)
+        ) as pool:
+            parts = list(
+                pool.map(
+                    _match_chunk_in_worker,
+                    chunks,
+                    repeat(quota),
+                    repeat(hi_thresh),
+                    repeat(lo_thresh),
+                )
+            )
+    else:
+        if index is None:
+            index = df if isinstance(df, CompiledCatalog) else build_index(df)
+        parts = [_match_chunk(c, index, quota, hi_thresh, lo_thresh) for c in chunks]
+
+    return [res for part in parts for res in part]
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="PantryPal recipe catalog tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    comp = sub.add_parser("compile", help="parse the CSV once into a compiled catalog")
+    comp.add_argument("csv", nargs="?", default="data/raw/recipes.csv")
+    comp.add_argument("-o", "--out", default=None, help="output directory")
+    comp.add_argument("--chunksize", type=int, default=None, help="stream the CSV N rows at a time")
+    comp.add_argument("--processes", type=int, default=None, help="parse chunks in N processes")
+    ing = sub.add_parser("ingest", help="add new / changed rows as a delta segment")
+    ing.add_argument("rows", help="CSV with the new rows (same columns)")
+    ing.add_argument("--csv", default="data/raw/recipes.csv")
+    mrg = sub.add_parser("merge", help="merge all delta segments into the base catalog")
+    mrg.add_argument("csv", nargs="?", default="data/raw/recipes.csv")
+    args = parser.parse_args()
+
+    if args.cmd == "compile":
+        out = compile_recipes(
+            args.csv,
+            args.out,
+            chunksize=args.chunksize,
+            processes=args.processes,
+            progress=lambda n: print(f"  {n:,} recipes", file=sys.stderr, flush=True),
+        )
+        print(f"Compiled catalog written to {out}")
+    elif args.cmd == "ingest":
+        n = ingest_recipes(args.csv, args.rows)
+        print(f"{n:,} recipes added or replaced")
+    else:
+        compiled = refresh_catalog(args.csv)
+        with catalog_lock(compiled):
+            catalog = compact(compiled, force=True)
+        print(f"{len(catalog):,} recipes in {compiled}")
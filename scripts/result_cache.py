@@ -0,0 +1,155 @@
+# scripts/result_cache.py
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+
+class ResultCache:
+    """
+    LRU + TTL cache for match_recipes() results.
+
+    Keys are built from the *normalized* ingredient set, so
+    "Onion, Garlic" and "garlic, ONION" share an entry, plus the quota,
+    thresholds and catalog version (a recompiled catalog never serves
+    stale matches).
+
+      - memory tier : OrderedDict, at most 'maxsize' entries
+      - disk tier   : optional SQLite file that survives restarts, at most
+                      about 'max_rows' entries (the soonest-expiring go)
+      - ttl         : seconds an entry stays valid in either tier (None = forever)
+
+    The disk tier is pruned (expired rows, then the row cap) on the first
+    put, then every 'prune_interval' seconds or 'prune_every' puts,
+    whichever comes first – not on every write.
+
+    Counters: hits (memory), disk_hits, misses – see stats().
+    Safe to share between Streamlit session threads.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float | None = 3600.0,
+        path: str | Path | None = None,
+        max_rows: int = 100_000,
+        prune_interval: float = 300.0,
+        prune_every: int = 1_000,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.prune_interval = prune_interval
+        self.prune_every = prune_every
+        self._next_prune = 0.0  # time.monotonic() of the next disk prune
+        self._puts = 0          # puts since the last prune
+        self._mem: OrderedDict[str, Tuple[float, List[Dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, expires REAL, payload TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_expires ON results (expires)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(
+        user_norm: Iterable[str],
+        quota: int,
+        hi_thresh: float,
+        lo_thresh: float,
+        version: str,
+    ) -> str:
+        return json.dumps([sorted(set(user_norm)), quota, hi_thresh, lo_thresh, version])
+
+    def _expiry(self) -> float:
+        return float("inf") if self.ttl is None else time.time() + self.ttl
+
+    def get(self, key: str) -> List[Dict] | None:
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return [dict(r) for r in entry[1]]
+                del self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires, payload FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[0] > now:
+                    results = json.loads(row[1])
+                    self._remember(key, row[0], results)
+                    self.disk_hits += 1
+                    return [dict(r) for r in results]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, results: List[Dict]) -> None:
+        expires = self._expiry()
+        results = [dict(r) for r in results]
+        with self._lock:
+            self._remember(key, expires, results)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    (key, expires, json.dumps(results)),
+                )
+                self._puts += 1
+                if self._puts >= self.prune_every or time.monotonic() >= self._next_prune:
+                    self._prune()
+                self._db.commit()
+
+    def _prune(self) -> None:
+        """Drop expired disk rows, then the soonest-expiring beyond max_rows."""
+        db = self._db
+        db.execute("DELETE FROM results WHERE expires <= ?", (time.time(),))
+        excess = db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_rows
+        if excess > 0:
+            db.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY expires LIMIT ?)",
+                (excess,),
+            )
+        self._puts = 0
+        self._next_prune = time.monotonic() + self.prune_interval
+
+    def _remember(self, key: str, expires: float, results: List[Dict]) -> None:
+        self._mem[key] = (expires, results)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "size": len(self._mem),
+        }
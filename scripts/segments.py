@@ -0,0 +1,398 @@
+# scripts/segments.py
+"""
+Delta segments: add recipes to a compiled catalog without recompiling it.
+
+The compiled catalog (<csv>.catalog/) is the base segment. append_segment()
+writes new recipes as a small delta next to it:
+
+  <catalog>/segments/000001/     catalog layout, but the vocabulary goes on
+                                 from the segments before it (new phrases
+                                 only), so phrase ids are global
+  <catalog>/segments/manifest.json
+                                 segment list, generation, source CSV stamp,
+                                 which segments are plain appends
+
+The manifest is replaced atomically once the segment is in place, so a
+reader sees the old segment list or the new one, never a partial one.
+
+Every recipe carries a key: a hashed stable id, or a hash of the raw
+row. A key in a newer segment hides the same key in older segments, so
+re-ingesting a recipe under its id replaces it (upsert). Rows appended to
+the CSV go in as plain appends instead (replace=False): they hide nothing
+and keep duplicates, as a full compile of the grown CSV would.
+
+open_catalog() gives a SegmentedCatalog over base + deltas, which matches
+like one CompiledCatalog (positions run through the segments in order).
+compact() merges them, LSM-style, after every append:
+
+  - more than MAX_SEGMENTS deltas       → the deltas become one delta
+                                          (everything, if appends and
+                                          upserts are mixed)
+  - deltas over MERGE_RATIO × the base  → everything becomes a new base
+
+A merge keeps the catalog version (cached results stay valid) unless it
+drops replaced recipes: positions then move, and results carry positions.
+A merge into a new base rebuilds its nutrition table from the same FDC
+dump (scripts/nutrition.py), if the old base had one. That changes the
+scores but not the version: weighted queries key their cached results
+by the nutrition build id instead.
+
+Writers hold catalog_lock(). The CSV side lives in scripts/recipe_search.py:
+load_catalog() ingests appended CSV rows this way, ingest_recipes() adds
+rows from elsewhere.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import shutil
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scripts.catalog import MANIFEST, CatalogWriter, CompiledCatalog, write_json
+from scripts.dietary import recipe_flags
+from scripts.nutrition import build_nutrition
+
+MAX_SEGMENTS = 8
+MERGE_RATIO = 0.25
+MERGE_CHUNK = 50_000  # recipes per CatalogWriter.add() while merging
+OPEN_TIMEOUT = 2.0   # seconds open_catalog() waits out a merge swapping files
+
+# manifest / meta.json fields describing the source CSV
+_STAMP_KEYS = ("source", "source_mtime_ns", "source_size", "source_digest")
+
+
+def read_manifest(catalog_dir: str | Path) -> Dict | None:
+    """segments/manifest.json of a catalog, or None if it has no deltas."""
+    try:
+        return json.loads((Path(catalog_dir) / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+class _ChainedNames(Sequence[str]):
+    """Display names of consecutive segments as one sequence."""
+
+    def __init__(self, parts: List[Sequence[str]], starts: np.ndarray):
+        self._parts = parts
+        self._starts = starts.tolist()
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        k = bisect.bisect_right(self._starts, i) - 1
+        return self._parts[k][i - self._starts[k]]
+
+
+class SegmentedCatalog(CompiledCatalog):
+    """
+    A base catalog plus delta segments, matched as one CompiledCatalog.
+
+    Position p of segment k is global position starts[k] + p. Recipes a
+    newer segment replaced (same key) stay in the position space but are
+    never returned: recipes_for() drops them, so match(), MatchSession and
+    batch matching skip them too. sizes, the live mask and nutrition
+    scores are held in RAM (about 9 bytes per recipe); the rest stays
+    memory-mapped per segment.
+    """
+
+    def __init__(self, catalog_dir: str | Path, manifest: Dict):
+        self.path = Path(catalog_dir)
+        self.meta = manifest
+        self.base = CompiledCatalog(self.path)
+        self.segments = [self.base] + [
+            CompiledCatalog(self.path / MANIFEST.parent / name) for name in manifest["segments"]
+        ]
+        self.vocab_start = self.text_start = 0
+        self.starts = np.cumsum([0] + [len(s) for s in self.segments])
+        self.n_vocab = len(self.segments[-1].post_offsets) - 1
+        self._vocab_starts = [s.vocab_start for s in self.segments]
+        self.sizes = np.concatenate([np.asarray(s.sizes) for s in self.segments])
+        self.names = _ChainedNames([s.names for s in self.segments], self.starts)
+        self.live = self._live_mask()
+        self.load_nutrition()
+        self._diet_flags: np.ndarray | None = None
+
+        self.phrase_ids = lru_cache(maxsize=4096)(self._find_phrase_ids)
+
+    def _live_mask(self) -> np.ndarray:
+        """False for recipes whose key reappears in a newer, non-append segment."""
+        appends = set(self.meta.get("appends", []))
+        masks: List[np.ndarray] = []
+        newer = np.zeros(0, dtype=np.uint64)
+        for name, seg in zip(reversed(self.meta["segments"]), reversed(self.segments[1:])):
+            keys = np.asarray(seg.keys)
+            masks.append(~np.isin(keys, newer))
+            if name not in appends:
+                newer = np.union1d(newer, keys)
+        masks.append(~np.isin(np.asarray(self.base.keys), newer))
+        return np.concatenate(masks[::-1])
+
+    @property
+    def version(self) -> str:
+        """The version of the last full compile plus the manifest generation."""
+        root = self.base.meta.get("root", self.base.version)
+        return f"{root}+{self.meta['generation']}"
+
+    @property
+    def keys(self) -> np.ndarray:
+        return np.concatenate([np.asarray(s.keys) for s in self.segments])
+
+    def _segment(self, pos: int) -> Tuple[CompiledCatalog, int]:
+        k = int(np.searchsorted(self.starts, pos, side="right")) - 1
+        return self.segments[k], int(pos) - int(self.starts[k])
+
+    @property
+    def diet_flags(self) -> np.ndarray:
+        if self._diet_flags is None:
+            segs = list(zip(self.segments, self.starts.tolist()))
+
+            def postings(pid: int) -> np.ndarray:
+                return np.concatenate([
+                    np.asarray(s.post_ids[s.post_offsets[pid]:s.post_offsets[pid + 1]], dtype=np.int64) + start
+                    for s, start in segs
+                    if pid < len(s.post_offsets) - 1
+                ])
+
+            self._diet_flags = recipe_flags(self.vocab(), postings, len(self))
+        return self._diet_flags
+
+    def load_nutrition(self) -> None:
+        """
+        The base's nutrition data. Delta recipes score 0.5 ("unknown", as in
+        health_scores) until a merge folds them into a new base.
+        """
+        base = self.base
+        self.nutrition = self.nutrition_score = self.nutrition_vocab = None
+        if base.nutrition is None:
+            return
+        self.nutrition_meta = base.nutrition_meta
+        self.nutrition = base.nutrition  # base recipes only
+        n_new = len(self) - len(base)
+        self.nutrition_score = np.concatenate([
+            base.nutrition_score, np.full(n_new, 0.5, dtype=base.nutrition_score.dtype)
+        ])
+        table = base.nutrition_vocab
+        self.nutrition_vocab = np.concatenate([
+            table, np.full((self.n_vocab - len(table), table.shape[1]), np.nan, dtype=table.dtype)
+        ])
+
+    # ----- vocabulary -----
+    def vocab(self) -> List[str]:
+        return [p for s in self.segments for p in s.vocab()]
+
+    def texts(self) -> List[str]:
+        return [t for s in self.segments for t in s.texts()]
+
+    def phrase(self, pid: int) -> str:
+        k = bisect.bisect_right(self._vocab_starts, pid) - 1
+        return self.segments[k].phrase(pid)
+
+    def ingredient_ids(self, pos: int) -> np.ndarray:
+        seg, local = self._segment(pos)
+        return seg.ingredient_ids(local)
+
+    def _find_phrase_ids(self, term: str) -> np.ndarray:
+        return np.concatenate([s._find_phrase_ids(term) for s in self.segments])
+
+    def recipes_for(self, term: str) -> np.ndarray:
+        """Live positions (ascending) of recipes with a phrase containing 'term'."""
+        pids = self.phrase_ids(term)
+        parts = []
+        for seg, start in zip(self.segments, self.starts.tolist()):
+            own = pids[pids < len(seg.post_offsets) - 1]
+            parts.append(seg._postings(seg.post_ids, own).astype(np.int64) + start)
+        pos = np.concatenate(parts)
+        return pos[self.live[pos]]
+
+    # ----- matching -----
+    def match_topk(
+        self,
+        terms: Sequence[str],
+        quota: int = 7,
+        hi_thresh: float = 0.7,
+        lo_thresh: float = 0.4,
+        budget: int = 5_000,
+        nutrition_weight: float = 0.0,
+        diet: int = 0,
+    ) -> List[Dict]:
+        """Same as match(): size-ordered postings exist per segment only."""
+        return self.match(terms, quota, hi_thresh, lo_thresh, nutrition_weight, diet)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Live recipes of every segment, in position order."""
+        texts, vocab = self.texts(), self.vocab()
+        frame = pd.concat([s._frame(texts, vocab) for s in self.segments], ignore_index=True)
+        return frame[self.live].reset_index(drop=True)
+
+
+def open_catalog(catalog_dir: str | Path, timeout: float = OPEN_TIMEOUT) -> CompiledCatalog:
+    """
+    The catalog at 'catalog_dir': a SegmentedCatalog if it has deltas.
+
+    Readers take no lock. If a merge swaps the directory or drops segments
+    while we open them, retry with backoff; give up (FileNotFoundError)
+    after 'timeout' seconds, e.g. if there is no catalog at all.
+    """
+    catalog_dir = Path(catalog_dir)
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while True:
+        manifest = read_manifest(catalog_dir)
+        try:
+            if manifest is None or not manifest["segments"]:
+                return CompiledCatalog(catalog_dir)
+            return SegmentedCatalog(catalog_dir, manifest)
+        except FileNotFoundError:
+            if time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+            delay = min(2 * delay, 0.1)
+
+
+def _live_rows(
+    catalog: SegmentedCatalog, segments: Sequence[CompiledCatalog]
+) -> Iterator[Tuple[List[str], List[List[str]], np.ndarray]]:
+    """(names, phrase lists, keys) of the live recipes of 'segments', in chunks."""
+    texts = catalog.texts()
+    for seg in segments:
+        start = int(catalog.starts[catalog.segments.index(seg)])
+        live = np.flatnonzero(catalog.live[start:start + len(seg)])
+        offsets, text_ids, keys = np.asarray(seg.offsets), seg.text_ids, np.asarray(seg.keys)
+        for i in range(0, len(live), MERGE_CHUNK):
+            idx = live[i:i + MERGE_CHUNK].tolist()
+            yield (
+                [seg.names[j] for j in idx],
+                [[texts[t] for t in text_ids[offsets[j]:offsets[j + 1]].tolist()] for j in idx],
+                keys[idx],
+            )
+
+
+def append_segment(
+    catalog_dir: str | Path,
+    names: Sequence[str],
+    ingredient_lists: Sequence[List[str]],
+    keys: np.ndarray | None = None,
+    stamp: Dict | None = None,
+    replace: bool = True,
+) -> CompiledCatalog:
+    """
+    Write recipes (normalized phrase lists, as for CatalogWriter.add) as a
+    new delta segment and publish it. With replace=False it hides no older
+    recipe with the same key. 'stamp' is the source CSV stamp the catalog
+    reflects afterwards; without one it stays as it was. Runs compact() and
+    returns the reopened catalog. Hold catalog_lock().
+    """
+    catalog_dir = Path(catalog_dir)
+    current = open_catalog(catalog_dir)
+    manifest = read_manifest(catalog_dir) or {
+        **{k: current.meta[k] for k in _STAMP_KEYS if k in current.meta},
+        "format": current.meta.get("format"),
+        "generation": current.meta.get("generation", 0),
+        "next": 1,
+        "segments": [],
+    }
+
+    name = f"{manifest['next']:06d}"
+    writer = CatalogWriter(catalog_dir / MANIFEST.parent / name, base=current)
+    try:
+        writer.add(names, ingredient_lists, keys)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    manifest.update(stamp or {})
+    manifest["segments"] = manifest["segments"] + [name]
+    if not replace:
+        manifest["appends"] = manifest.get("appends", []) + [name]
+    manifest["next"] += 1
+    manifest["generation"] += 1
+    write_json(catalog_dir / MANIFEST, manifest)
+    return compact(catalog_dir)
+
+
+def _merge_all(catalog: SegmentedCatalog) -> None:
+    """Major compaction: every live recipe into a new base."""
+    m = catalog.meta
+    meta = {k: m[k] for k in _STAMP_KEYS if k in m}
+    root = catalog.base.meta.get("root", catalog.base.version)
+    # same recipes at the same positions, same version: cached results stay valid
+    generation = m["generation"] + (0 if catalog.live.all() else 1)
+    meta.update(version=f"{root}+{generation}", root=root, generation=generation)
+    writer = CatalogWriter(catalog.path, meta=meta)
+    try:
+        for names, lists, keys in _live_rows(catalog, catalog.segments):
+            writer.add(names, lists, keys)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()  # replaces the whole directory, segments/ included
+
+    # the new base dropped the old nutrition*.npy: rebuild them from the same
+    # FDC dump, now covering the merged delta recipes too
+    if catalog.base.nutrition is not None:
+        fdc = Path(catalog.base.nutrition_meta["source"])
+        if fdc.exists():
+            build_nutrition(CompiledCatalog(catalog.path), fdc)
+
+
+def _merge_deltas(catalog: SegmentedCatalog) -> None:
+    """Minor compaction: the live delta recipes into one delta."""
+    m = dict(catalog.meta)
+    appends = [seg for seg in m["segments"] if seg in m.get("appends", [])]
+    if appends and len(appends) < len(m["segments"]):
+        # one delta can't both hide base recipes and keep duplicates of others
+        _merge_all(catalog)
+        return
+    name = f"{m['next']:06d}"
+    writer = CatalogWriter(catalog.path / MANIFEST.parent / name, base=catalog.base)
+    try:
+        for names, lists, keys in _live_rows(catalog, catalog.segments[1:]):
+            writer.add(names, lists, keys)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    old = m["segments"]
+    m["segments"] = [name]
+    m["appends"] = [name] if appends else []
+    m["next"] += 1
+    if not catalog.live[len(catalog.base):].all():
+        m["generation"] += 1  # replaced delta recipes dropped: positions moved
+    write_json(catalog.path / MANIFEST, m)
+    for seg in old:
+        shutil.rmtree(catalog.path / MANIFEST.parent / seg, ignore_errors=True)
+
+
+def compact(
+    catalog_dir: str | Path,
+    max_segments: int = MAX_SEGMENTS,
+    ratio: float = MERGE_RATIO,
+    force: bool = False,
+) -> CompiledCatalog:
+    """
+    Merge segments when the policy above says so; 'force' merges everything
+    into the base. Returns the (re)opened catalog. Hold catalog_lock().
+    """
+    catalog = open_catalog(catalog_dir)
+    if not isinstance(catalog, SegmentedCatalog):
+        return catalog
+    n_delta = len(catalog) - len(catalog.base)
+    if force or n_delta > ratio * len(catalog.base):
+        _merge_all(catalog)
+    elif len(catalog.segments) - 1 > max_segments:
+        _merge_deltas(catalog)
+    else:
+        return catalog
+    return open_catalog(catalog_dir)
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+
+def _food(description: str, **amounts: float) -> dict:
+    ids = {"kcal": 1008, "protein": 1003, "sugars": 2000, "fiber": 1079, "sodium": 1093}
+    return {
+        "description": description,
+        "foodNutrients": [{"nutrient": {"id": ids[k]}, "amount": v} for k, v in amounts.items()],
+    }
+
+
+@pytest.fixture
+def fdc_json(tmp_path):
+    """A tiny FoodData Central JSON dump (see scripts/nutrition.py)."""
+    path = tmp_path / "fdc.json"
+    path.write_text(json.dumps({"FoundationFoods": [
+        _food("Rice, white, raw", kcal=360, protein=7, fiber=1),
+        _food("Beans, black, raw", kcal=340, protein=21, fiber=15),
+        _food("Sugar, granulated", kcal=390, sugars=100),
+        _food("Eggs, whole, raw", kcal=140, protein=12, sodium=140),
+        _food("Spinach, raw", kcal=23, protein=3, fiber=2),
+        _food("Butter, salted", kcal=717, sodium=640),
+    ]}))
+    return path
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pytest
+
+from scripts.benchmark import generate_catalog, make_workload
+from scripts.catalog import CompiledCatalog
+from scripts.recipe_search import (
+    build_index,
+    build_matrix,
+    compile_recipes,
+    load_recipes,
+    match_recipes,
+    match_recipes_batch,
+)
+
+PANTRIES = make_workload(60, seed=7) + [["salt"], ["xyz"], ["Eggs", "Peas"], ["1 cup"]]
+SETTINGS = [
+    {},
+    {"quota": 3},
+    {"quota": 50, "hi_thresh": 0.5, "lo_thresh": 0.1},
+    {"quota": 1000, "lo_thresh": 0.0},
+    {"quota": 20, "diets": ["vegetarian"]},
+]
+
+
+@pytest.fixture(scope="module")
+def recipes(tmp_path_factory):
+    """(DataFrame from the CSV path, compiled catalog) of one synthetic CSV."""
+    csv = generate_catalog(tmp_path_factory.mktemp("recipes") / "recipes.csv", 400, seed=3)
+    df = load_recipes(csv, use_compiled=False)
+    return csv, df, CompiledCatalog(compile_recipes(csv))
+
+
+@pytest.mark.parametrize("settings", SETTINGS)
+def test_catalog_matches_the_dataframe_path(recipes, settings):
+    _, df, catalog = recipes
+    index, matrix = build_index(df), build_matrix(df)
+    for pantry in PANTRIES:
+        expected = match_recipes(pantry, df, **settings)
+        assert match_recipes(pantry, catalog, **settings) == expected
+        assert match_recipes(pantry, df, index=index, **settings) == expected
+        assert match_recipes(pantry, df, index=matrix, **settings) == expected
+
+
+def test_batch_matches_one_by_one(recipes):
+    _, df, catalog = recipes
+    batch = match_recipes_batch(PANTRIES, catalog, quota=10)
+    assert batch == [match_recipes(p, df, quota=10) for p in PANTRIES]
+
+
+def test_compiled_frame_equals_the_csv_frame(recipes):
+    csv, df, catalog = recipes
+    frame = catalog.to_frame()
+    assert frame["display_name"].tolist() == df["display_name"].tolist()
+    assert frame["ingredients_norm"].tolist() == df["ingredients_norm"].tolist()
+    # load_recipes() now prefers the fresh compiled catalog
+    assert load_recipes(csv)["display_name"].tolist() == df["display_name"].tolist()
+
+
+def test_streamed_compile_equals_a_whole_compile(recipes, tmp_path):
+    csv, _, catalog = recipes
+    streamed = CompiledCatalog(compile_recipes(csv, tmp_path / "streamed.catalog", chunksize=57))
+    assert streamed.to_frame().equals(catalog.to_frame())
+    for pantry in PANTRIES:
+        assert match_recipes(pantry, streamed) == match_recipes(pantry, catalog)
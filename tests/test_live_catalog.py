@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from scripts.catalog import catalog_lock
+from scripts.live_catalog import LiveCatalog
+from scripts.nutrition import build_nutrition
+from scripts.recipe_search import ingest_recipes, match_recipes
+
+RECIPES = pd.DataFrame({
+    "id": range(1, 21),
+    "name": [f"Recipe {i}" for i in range(1, 21)],
+    "ingredients": ["1 cup rice, 2 eggs", "1 cup spinach, 1 cup black beans"] * 10,
+})
+
+
+def _write(csv, df):
+    df.to_csv(csv, index=False)
+    # a rewrite within the same mtime tick must still look like a change
+    st = csv.stat()
+    os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "recipes.csv"
+    RECIPES.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def live(csv):
+    live = LiveCatalog(csv, interval=0)
+    yield live
+    live.stop()
+
+
+def test_unchanged_recipes_are_not_swapped(csv, live):
+    old = live.current
+    _write(csv, RECIPES)  # same bytes, new mtime
+    assert not live.check()
+    assert not live.check()
+    assert live.current is old
+    assert live.reloads == 0
+
+
+def test_edited_csv_is_swapped_in(csv, live):
+    swaps = []
+    live.on_swap.append(lambda old, new: swaps.append((old, new)))
+    old = live.current
+    _write(csv, RECIPES.assign(ingredients=RECIPES["ingredients"].str.replace("eggs", "tofu")))
+
+    assert live.check()
+    new = live.current
+    assert new is not old and new.version != old.version
+    assert swaps == [(old, new)]
+    assert live.reloads == 1
+    assert [r["name"] for r in match_recipes(["rice", "tofu"], new, quota=1)] == ["Recipe 1"]
+    # a request still holding the old snapshot finishes on it
+    assert [r["name"] for r in match_recipes(["rice", "eggs"], old, quota=1)] == ["Recipe 1"]
+    assert not live.check()
+
+
+def test_appended_and_ingested_rows_are_swapped_in(csv, live):
+    more = pd.DataFrame({"id": [21], "name": ["Recipe 21"], "ingredients": ["1 lb lamb"]})
+    _write(csv, pd.concat([RECIPES, more]))
+    assert live.check()
+    assert len(live.current) == 21
+
+    # ingest_recipes() touches the catalog's stamp files, not the CSV
+    ingest_recipes(csv, more.assign(id=[22], name=["Recipe 22"], ingredients=["1 cup quinoa"]))
+    assert live.check()
+    assert len(live.current) == 22
+    assert [r["name"] for r in match_recipes(["quinoa"], live.current)] == ["Recipe 22"]
+    assert live.reloads == 2
+
+
+def test_swapped_catalog_keeps_its_nutrition(csv, live, fdc_json):
+    with catalog_lock(live.current.path):
+        build_nutrition(live.current, fdc_json)
+    _write(csv, RECIPES.assign(name=RECIPES["name"].str.upper()))
+    assert live.check()
+    assert live.current.nutrition_score is not None
+    assert live.current.nutrition_meta["catalog"] == live.version
+
+
+def test_watcher_swaps_in_the_background_and_survives_a_bad_csv(csv):
+    live = LiveCatalog(csv, interval=0.02).start()
+    try:
+        _write(csv, RECIPES.iloc[:10])
+        deadline = time.monotonic() + 10
+        while live.reloads == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert len(live.current) == 10
+
+        good = live.current
+        _write(csv, pd.DataFrame({"title": ["no ingredients column"]}))
+        while live.last_error is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert live.last_error is not None
+        assert live.current is good
+    finally:
+        live.stop()
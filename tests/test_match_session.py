@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from scripts.catalog import CompiledCatalog, catalog_lock, write_catalog
+from scripts.match_session import MatchSession
+from scripts.nutrition import build_nutrition
+from scripts.recipe_search import build_index, match_recipes, parse_ings
+
+RECIPES = {
+    "Rice Bowl": "1 cup rice, 1 cup black beans, 1 cup spinach",
+    "Fried Rice": "2 cups rice, 2 eggs, 1 tbsp butter",
+    "Omelette": "3 eggs, 1 tbsp butter",
+    "Sweet Rice": "1 cup rice, 1/2 cup sugar",
+    "Bean Salad": "1 cup black beans, 1 cup spinach",
+}
+PANTRIES = [["rice"], ["rice", "eggs"], ["eggs", "butter", "spinach"], ["rice"], ["black beans"]]
+
+
+@pytest.fixture(params=["index", "catalog"])
+def backend(request, tmp_path, fdc_json):
+    """(df, session source) for match_recipes(..., index=MatchSession(source))."""
+    lists = [parse_ings(x) for x in RECIPES.values()]
+    if request.param == "index":
+        df = pd.DataFrame({"display_name": list(RECIPES), "ingredients_norm": lists})
+        return df, build_index(df)
+    catalog = CompiledCatalog(write_catalog(tmp_path / "recipes.catalog", list(RECIPES), lists))
+    with catalog_lock(catalog.path):
+        build_nutrition(catalog, fdc_json)
+    return catalog, catalog
+
+
+@pytest.mark.parametrize("weight", [0.0, 0.5])
+def test_session_matches_a_fresh_query(backend, weight):
+    df, source = backend
+    session = MatchSession(source)
+    for pantry in PANTRIES:
+        expected = match_recipes(pantry, df, index=None if df is source else source, nutrition_weight=weight)
+        assert match_recipes(pantry, df, index=session, nutrition_weight=weight) == expected
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.catalog import catalog_lock
+from scripts.nutrition import build_nutrition, health_scores
+from scripts.recipe_search import load_catalog, match_recipes
+from scripts.result_cache import ResultCache
+
+RECIPES = pd.DataFrame({
+    "id": [1, 2, 3, 4],
+    "name": ["Bean Salad", "Fudge", "Egg Fried Rice", "Mystery Stew"],
+    "ingredients": [
+        "1 cup black beans, 2 cups spinach",
+        "1 cup sugar, 1/2 cup butter",
+        "2 cups rice, 2 eggs",
+        "1 lb unobtainium, 2 cups moonwater",
+    ],
+})
+
+
+@pytest.fixture
+def catalog(tmp_path, fdc_json):
+    csv = tmp_path / "recipes.csv"
+    RECIPES.to_csv(csv, index=False)
+    catalog = load_catalog(csv)
+    with catalog_lock(catalog.path):
+        build_nutrition(catalog, fdc_json)
+    return catalog
+
+
+def _rebuild(catalog, fdc_json, **spinach):
+    # same foods, spinach's nutrients replaced
+    data = json.loads(fdc_json.read_text())
+    for food in data["FoundationFoods"]:
+        if food["description"].startswith("Spinach"):
+            ids = {"kcal": 1008, "protein": 1003, "sugars": 2000, "fiber": 1079}
+            food["foodNutrients"] = [{"nutrient": {"id": ids[k]}, "amount": v} for k, v in spinach.items()]
+    fdc_json.write_text(json.dumps(data))
+    with catalog_lock(catalog.path):
+        return build_nutrition(catalog, fdc_json)
+
+
+def test_health_scores_rank_known_profiles_and_leave_unknown_at_half():
+    profiles = np.full((3, 8), np.nan, dtype=np.float32)
+    profiles[0, [1, 6]] = [20, 10]      # protein, fiber
+    profiles[1, [0, 5]] = [500, 60]     # kcal, sugars
+    assert health_scores(profiles).tolist() == [1.0, 0.0, 0.5]
+
+
+def test_build_nutrition_scores_every_recipe(catalog):
+    score = dict(zip(catalog.names, np.asarray(catalog.nutrition_score).tolist()))
+    assert score["Bean Salad"] > score["Egg Fried Rice"] > score["Fudge"]
+    assert score["Mystery Stew"] == 0.5
+    meta = catalog.nutrition_meta
+    assert meta["catalog"] == catalog.version
+    assert meta["vocab_matched"] == 6
+    assert meta["mean_coverage"] == pytest.approx(0.75)
+
+
+def test_weighted_cache_key_follows_the_nutrition_build(catalog, fdc_json):
+    cache = ResultCache()
+    pantry = ["spinach", "sugar", "butter", "beans"]
+
+    healthy = match_recipes(pantry, catalog, cache=cache, nutrition_weight=0.8)
+    match_recipes(pantry, catalog, cache=cache, nutrition_weight=0.8)
+    assert cache.stats()["hits"] == 1
+
+    # the same table again: same scores, same build, still cached
+    build = catalog.nutrition_meta["build"]
+    assert _rebuild(catalog, fdc_json, kcal=23, protein=3, fiber=2)["build"] == build
+    match_recipes(pantry, catalog, cache=cache, nutrition_weight=0.8)
+    assert cache.stats()["hits"] == 2
+
+    # spinach turned into candy: the salad is no longer the healthy pick
+    assert _rebuild(catalog, fdc_json, kcal=900, sugars=90)["build"] != build
+    candy = match_recipes(pantry, catalog, cache=cache, nutrition_weight=0.8)
+    assert cache.stats()["hits"] == 2
+    assert candy != healthy
+    assert candy == match_recipes(pantry, catalog, nutrition_weight=0.8)
+
+    # unweighted results do not depend on nutrition
+    match_recipes(pantry, catalog, cache=cache)
+    _rebuild(catalog, fdc_json, kcal=23, protein=3, fiber=2)
+    match_recipes(pantry, catalog, cache=cache)
+    assert cache.stats()["hits"] == 3
+
+
+def test_cache_key_follows_the_catalog_version(tmp_path, catalog):
+    cache = ResultCache()
+    pantry = ["sugar", "butter"]
+    assert [r["name"] for r in match_recipes(pantry, catalog, cache=cache)] == ["Fudge"]
+
+    csv = tmp_path / "recipes.csv"
+    changed = RECIPES.assign(name=RECIPES["name"].replace("Fudge", "Toffee"))
+    changed.to_csv(csv, index=False)
+    recompiled = load_catalog(csv)
+    assert recompiled.version != catalog.version
+    assert [r["name"] for r in match_recipes(pantry, recompiled, cache=cache)] == ["Toffee"]
+    assert cache.stats()["hits"] == 0
+
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from scripts.catalog import CompiledCatalog, write_catalog
+from scripts.fuzzy import use_fuzzy
+from scripts.recipe_search import build_index, match_recipes, parse_ings
+
+RECIPES = {
+    "PB Toast": "2 slices bread, 3 tbsp peanut butter",
+    "Goat Cheese Salad": "4 oz goat cheese, 2 cups arugula",
+    "Eggplant Parm": "1 large eggplant, 1 cup marinara",
+    "Spice Cake": "1 tsp nutmeg, 2 cups flour",
+    "Pea Soup": "2 cups frozen peas, 1 onion",
+    "Porridge": "1 cup rolled oats, 2 cups milk",
+    "Omelette": "3 eggs, 1 tbsp butter",
+    "Trail Mix": "1 cup mixed nuts, 1/2 cup raisins",
+}
+
+# user ingredient -> (recipe it must find, recipe it must not)
+PAIRS = [
+    ("Peas", "Pea Soup", "PB Toast"),
+    ("Oats", "Porridge", "Goat Cheese Salad"),
+    ("Eggs", "Omelette", "Eggplant Parm"),
+    ("Nuts", "Trail Mix", "Spice Cake"),
+]
+
+
+@pytest.fixture(params=["index", "catalog", "fuzzy"])
+def backend(request, tmp_path):
+    """(df, index) arguments for match_recipes."""
+    if request.param == "index":
+        df = pd.DataFrame({
+            "display_name": list(RECIPES),
+            "ingredients_norm": [parse_ings(x) for x in RECIPES.values()],
+        })
+        return df, build_index(df)
+    out = write_catalog(
+        tmp_path / "recipes.catalog",
+        list(RECIPES),
+        [parse_ings(x) for x in RECIPES.values()],
+    )
+    catalog = CompiledCatalog(out)
+    return (use_fuzzy(catalog, 0.6) if request.param == "fuzzy" else catalog), None
+
+
+@pytest.mark.parametrize("term, hit, miss", PAIRS)
+def test_plural_term_matches_whole_words_only(backend, term, hit, miss):
+    df, index = backend
+    names = {r["name"] for r in match_recipes([term], df, quota=10, index=index)}
+    assert hit in names
+    assert miss not in names
+
+
+def test_fuzzy_still_resolves_typos(tmp_path):
+    out = write_catalog(
+        tmp_path / "recipes.catalog",
+        list(RECIPES),
+        [parse_ings(x) for x in RECIPES.values()],
+    )
+    catalog = use_fuzzy(CompiledCatalog(out), 0.6)
+    assert [r["name"] for r in match_recipes(["eggplnt"], catalog)] == ["Eggplant Parm"]
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+
+import pandas as pd
+import pytest
+
+from scripts import segments
+from scripts.catalog import catalog_lock
+from scripts.nutrition import build_nutrition
+from scripts.recipe_search import ingest_recipes, load_catalog, match_recipes
+from scripts.result_cache import ResultCache
+from scripts.segments import SegmentedCatalog, compact, open_catalog
+
+DISHES = [
+    "1 cup rice, 1 cup black beans",
+    "2 cups rice, 1 tbsp butter",
+    "1 cup rice, 1/2 cup sugar",
+    "3 eggs, 1 cup spinach",
+    "2 eggs, 1 tbsp butter",
+    "1 cup sugar, 1/2 cup butter",
+    "1 cup black beans, 1 cup spinach",
+    "1 cup rice, 2 eggs",
+]
+# large enough that a few new rows stay a delta (see segments.MERGE_RATIO)
+BASE = pd.DataFrame({
+    "id": range(1, 25),
+    "name": [f"Recipe {i}" for i in range(1, 25)],
+    "ingredients": DISHES * 3,
+})
+
+
+class KeyLog(ResultCache):
+    """A ResultCache that remembers the keys it was asked for."""
+
+    def __init__(self):
+        super().__init__()
+        self.keys = []
+
+    def get(self, key):
+        self.keys.append(key)
+        return super().get(key)
+
+
+def test_merge_rebuilding_nutrition_changes_weighted_cache_key(tmp_path, fdc_json):
+    csv = tmp_path / "recipes.csv"
+    BASE.to_csv(csv, index=False)
+    catalog = load_catalog(csv)
+    with catalog_lock(catalog.path):
+        build_nutrition(catalog, fdc_json)
+
+    # one new recipe stays a delta (scored 0.5) until the forced merge
+    ingest_recipes(csv, pd.DataFrame({"id": [30], "name": ["Recipe 30"], "ingredients": ["2 cups spinach"]}))
+    before = load_catalog(csv)
+    assert isinstance(before, SegmentedCatalog)
+    with catalog_lock(before.path):
+        after = compact(before.path, force=True)
+    assert after.version == before.version
+    assert after.nutrition_score is not None
+
+    cache = KeyLog()
+    for cat in (before, after):
+        match_recipes(["spinach"], cat, cache=cache, nutrition_weight=0.5)
+        match_recipes(["spinach"], cat, cache=cache)
+    weighted_before, plain_before, weighted_after, plain_after = cache.keys
+    assert weighted_before != weighted_after
+    assert plain_before == plain_after
+    assert cache.stats()["hits"] == 1  # the unweighted query only
+    assert match_recipes(["spinach"], after, cache=cache, nutrition_weight=0.5) == match_recipes(
+        ["spinach"], after, nutrition_weight=0.5
+    )
+
+
+# ----- incremental ingest == full recompile -----
+MORE = pd.DataFrame({
+    "id": [30, 2, 31, 31],
+    "name": ["Recipe 30", "Recipe 2", "Recipe 31", "Recipe 31"],
+    "ingredients": [
+        "2 cups spinach, 1 egg",
+        "2 cups rice, 1 tbsp butter",  # same id and content as a base row
+        "1 cup rice, 1 cup sugar",
+        "1 cup rice, 1 cup sugar",     # duplicate within the appended rows
+    ],
+})
+PANTRIES = [["rice"], ["rice", "butter"], ["spinach", "eggs"], ["sugar", "rice", "black beans"]]
+
+
+def _results(catalog):
+    return [match_recipes(p, catalog, quota=20, lo_thresh=0.0) for p in PANTRIES]
+
+
+def _recompiled(tmp_path, frame):
+    csv = tmp_path / "full" / "recipes.csv"
+    csv.parent.mkdir(exist_ok=True)
+    frame.to_csv(csv, index=False)
+    return load_catalog(csv)
+
+
+@pytest.mark.parametrize("id_column", [True, False])
+def test_appended_csv_rows_equal_a_recompile(tmp_path, id_column):
+    base, more = (BASE, MORE) if id_column else (BASE.drop(columns="id"), MORE.drop(columns="id"))
+    csv = tmp_path / "recipes.csv"
+    base.to_csv(csv, index=False)
+    load_catalog(csv)
+    more.to_csv(csv, mode="a", header=False, index=False)
+
+    full = _recompiled(tmp_path, pd.concat([base, more], ignore_index=True))
+    grown = load_catalog(csv)
+    assert isinstance(grown, SegmentedCatalog)
+    assert len(grown.to_frame()) == len(full) == len(base) + len(more)
+    assert grown.to_frame().equals(full.to_frame())
+    assert _results(grown) == _results(full)
+
+    with catalog_lock(grown.path):
+        merged = compact(grown.path, force=True)
+    assert not isinstance(merged, SegmentedCatalog)
+    assert _results(merged) == _results(full)
+
+
+def test_upsert_and_merge_equal_a_recompile(tmp_path):
+    csv = tmp_path / "recipes.csv"
+    BASE.to_csv(csv, index=False)
+    load_catalog(csv)
+    changed = pd.DataFrame({"id": [3], "name": ["Recipe 3b"], "ingredients": ["1 cup rice, 1 cup spinach"]})
+    assert ingest_recipes(csv, changed) == 1
+
+    # the replaced recipe leaves its place, the new version comes last
+    full = _recompiled(tmp_path, pd.concat([BASE[BASE["id"] != 3], changed], ignore_index=True))
+    upserted = load_catalog(csv)
+    assert isinstance(upserted, SegmentedCatalog)
+    assert upserted.to_frame().equals(full.to_frame())
+    assert [[r["name"] for r in res] for res in _results(upserted)] == [
+        [r["name"] for r in res] for res in _results(full)
+    ]
+
+    with catalog_lock(upserted.path):
+        merged = compact(upserted.path, force=True)
+    assert _results(merged) == _results(full)
+
+
+def test_mixed_appends_and_upserts_merge_into_the_base(tmp_path):
+    csv = tmp_path / "recipes.csv"
+    BASE.to_csv(csv, index=False)
+    load_catalog(csv)
+    ingest_recipes(csv, pd.DataFrame({"id": [3], "name": ["Recipe 3b"], "ingredients": ["1 cup spinach"]}))
+    MORE.iloc[:1].to_csv(csv, mode="a", header=False, index=False)
+    catalog = load_catalog(csv)
+    assert len(catalog.segments) == 3
+    expected = catalog.to_frame()
+
+    with catalog_lock(catalog.path):
+        merged = compact(catalog.path, max_segments=1)
+    assert not isinstance(merged, SegmentedCatalog)
+    assert merged.to_frame().equals(expected)
+
+
+def _merge_repeatedly(csv, rounds):
+    path = load_catalog(csv).path
+    for i in range(rounds):
+        row = {"id": [100 + i], "name": [f"New {i}"], "ingredients": ["1 cup rice"]}
+        ingest_recipes(csv, pd.DataFrame(row))
+        with catalog_lock(path):
+            compact(path, force=True)
+
+
+def test_readers_open_the_catalog_during_merges(tmp_path):
+    csv = tmp_path / "recipes.csv"
+    BASE.to_csv(csv, index=False)
+    path = load_catalog(csv).path
+
+    # merges in another process, as the app's workers would see them
+    writer = multiprocessing.get_context("spawn").Process(target=_merge_repeatedly, args=(csv, 8))
+    writer.start()
+    opened = 0
+    while writer.is_alive():
+        assert len(open_catalog(path)) >= len(BASE)
+        opened += 1
+    writer.join()
+    assert writer.exitcode == 0
+    assert opened > 0
+
+
+def test_open_catalog_waits_out_a_directory_swap(tmp_path, monkeypatch):
+    csv = tmp_path / "recipes.csv"
+    BASE.to_csv(csv, index=False)
+    path = load_catalog(csv).path
+    real, calls = segments.CompiledCatalog, []
+
+    def swapping(catalog_dir):
+        calls.append(time.monotonic())
+        if calls[-1] - calls[0] < 0.2:  # mid-swap for the first 200 ms
+            raise FileNotFoundError(catalog_dir)
+        return real(catalog_dir)
+
+    monkeypatch.setattr(segments, "CompiledCatalog", swapping)
+    assert len(segments.open_catalog(path)) == len(BASE)
+    assert len(calls) < 20  # backed off rather than spinning
+
+    with pytest.raises(FileNotFoundError):
+        segments.open_catalog(tmp_path / "missing.catalog", timeout=0.05)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pytest
+
+from scripts.benchmark import generate_catalog, make_workload
+from scripts.canonical import canonicalize_list
+from scripts.catalog import CompiledCatalog, catalog_lock
+from scripts.dietary import diet_mask
+from scripts.nutrition import build_nutrition
+from scripts.recipe_search import compile_recipes, match_recipes
+
+# staple-heavy pantries stop early; rare and unknown terms fall back
+PANTRIES = make_workload(40, seed=11) + [
+    ["salt"], ["salt", "butter"], ["lamb", "quinoa"], ["xyz"], ["salt", "xyz", "ham"],
+]
+SETTINGS = [
+    {},
+    {"quota": 1},
+    {"quota": 25, "hi_thresh": 0.5, "lo_thresh": 0.2},
+    {"quota": 1000, "lo_thresh": 0.0},
+    {"quota": 7, "hi_thresh": 1.0, "lo_thresh": 1.0},
+]
+DIETS = [[], ["vegetarian"], ["vegan", "gluten_free"]]
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory):
+    csv = generate_catalog(tmp_path_factory.mktemp("recipes") / "recipes.csv", 1500, seed=5)
+    return CompiledCatalog(compile_recipes(csv))
+
+
+@pytest.mark.parametrize("diets", DIETS)
+@pytest.mark.parametrize("settings", SETTINGS)
+def test_topk_equals_a_full_scan(catalog, settings, diets):
+    for pantry in PANTRIES:
+        full = match_recipes(pantry, catalog, diets=diets, **settings)
+        assert match_recipes(pantry, catalog, topk=True, diets=diets, **settings) == full
+
+
+@pytest.mark.parametrize("diets", DIETS)
+@pytest.mark.parametrize("budget", [1, 100, 1_000, 10**9])
+def test_topk_equals_a_full_scan_at_any_budget(catalog, monkeypatch, budget, diets):
+    # queries not handed to the vectorized path stopped early
+    fallbacks = []
+    select = catalog._select
+    monkeypatch.setattr(catalog, "_select", lambda *a: fallbacks.append(1) or select(*a))
+    diet = diet_mask(diets)
+    early = 0
+    for pantry in PANTRIES:
+        terms = sorted(set(canonicalize_list([t.lower() for t in pantry])))
+        for s in SETTINGS:
+            args = (s.get("quota", 7), s.get("hi_thresh", 0.7), s.get("lo_thresh", 0.4))
+            expected = catalog.match(terms, *args, diet=diet)
+            before = len(fallbacks)
+            assert catalog.match_topk(terms, *args, budget=budget, diet=diet) == expected
+            early += len(fallbacks) == before
+    if budget == 100:
+        # staples stop well inside it, even with the strictest diet
+        assert early > 0
+
+
+def test_topk_equals_a_full_scan_with_nutrition(tmp_path, fdc_json):
+    csv = generate_catalog(tmp_path / "recipes.csv", 300, seed=2)
+    catalog = CompiledCatalog(compile_recipes(csv))
+    with catalog_lock(catalog.path):
+        build_nutrition(catalog, fdc_json)
+    assert catalog.nutrition_score is not None
+    for pantry in PANTRIES:
+        full = match_recipes(pantry, catalog, nutrition_weight=0.4)
+        assert match_recipes(pantry, catalog, topk=True, nutrition_weight=0.4) == full